@@ -1,20 +1,29 @@
 from django.contrib import admin
-from .models import Character, Conversation, Message, UserCredit, CharacterRating
+from .models import Character, Conversation, Message, UserCredit, CreditLedgerEntry, CharacterRating, Tag, TokenUsageDaily
 
 @admin.register(Character)
 class CharacterAdmin(admin.ModelAdmin):
     list_display = ['name', 'creator', 'genre', 'status', 'total_conversations', 'created_at']
     list_filter = ['status', 'genre', 'created_at']
     search_fields = ['name', 'creator__username', 'description']
+    # 태그 연결은 tags 입력에서 자동 동기화
+    exclude = ['tag_links']
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'usage_count', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['usage_count']
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ['user', 'character', 'title', 'status', 'message_count', 'created_at']
     list_filter = ['status', 'created_at']
+    readonly_fields = ['summary_last_message_id', 'summary_updated_at']
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ['conversation', 'sender', 'content_preview', 'timestamp']
+    list_display = ['conversation', 'sender', 'content_preview', 'input_tokens', 'output_tokens', 'timestamp']
     list_filter = ['sender', 'timestamp']
     
     def content_preview(self, obj):
@@ -24,6 +33,20 @@ class MessageAdmin(admin.ModelAdmin):
 class UserCreditAdmin(admin.ModelAdmin):
     list_display = ['user', 'free_credits', 'created_at']
     
+@admin.register(CreditLedgerEntry)
+class CreditLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'kind', 'amount', 'reservation', 'conversation', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['user__username', 'memo']
+    raw_id_fields = ['user', 'reservation', 'conversation']
+
 @admin.register(CharacterRating)
 class CharacterRatingAdmin(admin.ModelAdmin):
-    list_display = ['user', 'character', 'rating', 'created_at']
\ No newline at end of file
+    list_display = ['user', 'character', 'rating', 'created_at']
+
+@admin.register(TokenUsageDaily)
+class TokenUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ['date', 'user', 'character', 'turns', 'input_tokens', 'output_tokens', 'cached_tokens']
+    list_filter = ['date']
+    search_fields = ['user__username', 'character__name']
+    raw_id_fields = ['user', 'character']
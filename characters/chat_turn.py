@@ -0,0 +1,163 @@
+"""
+대화 한 턴(사용자 메시지 -> AI 응답)의 DB 처리
+
+LLM 호출 전후로 DB 작업을 모아 왕복 횟수를 최소화하고, 트랜잭션이 LLM 호출을
+감싸지 않도록 한다.
+- 시작: 대화 + 크레딧 잔액을 한 쿼리로 조회, 크레딧 예약, 요약 이후 최근 히스토리 조회
+  (대화 요약 + 최근 메시지를 토큰 예산 안에서 프롬프트로, summaries.py)
+- (LLM 호출 - 트랜잭션 밖)
+- 완료: 짧은 트랜잭션 하나에서 사용자/AI 메시지 bulk insert, 대화/캐릭터 카운터와
+  제목을 행별 UPDATE 한 번으로 반영, 크레딧 예약 확정, 일별 토큰 사용량 upsert.
+  요약 이후 메시지가 충분히 쌓였으면 커밋 후 요약 갱신을 백그라운드로 요청
+- 실패: 예약 환불 (사용자 메시지도 저장하지 않음)
+- 같은 멱등 키의 턴이 이미 저장돼 있으면 유일 제약으로 저장이 막히고 예약을 환불한 뒤
+  DuplicateTurn 으로 먼저 저장된 응답을 돌려준다
+- 응답이 늦어 예약이 미정산 예약 환불로 먼저 환불됐으면 확정 대신 다시 차감하고,
+  잔액이 부족하면 ReservationLost 로 턴을 저장하지 않는다
+
+bulk_create 는 post_save 시그널을 보내지 않으므로 메시지 통계는
+counters.record_turn 으로 직접 반영한다.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.shortcuts import get_object_or_404
+
+from . import counters, credits, idempotency, summaries, token_usage
+from .models import Conversation, CreditLedgerEntry, Message, UserCredit
+from .services import gemini_service
+
+
+@dataclass
+class ChatTurn:
+    conversation: Conversation
+    user_message: str
+    contents: List[Dict]
+    reservation: CreditLedgerEntry
+    remaining_credits: int
+    # 이번 턴 전까지 요약되지 않은 메시지 수 (history_limit 에서 잘림)
+    unsummarized: int = 0
+    # 클라이언트 멱등 키 (사용자 메시지에 저장, idempotency.py)
+    idempotency_key: str = ''
+
+
+class ReservationLost(Exception):
+    """예약이 확정 전에 환불됐고 다시 차감할 잔액도 없음 (턴은 저장하지 않음)"""
+
+
+class DuplicateTurn(Exception):
+    """같은 멱등 키의 턴이 이미 저장됨 (이번 턴은 저장하지 않고 예약 환불)"""
+
+    def __init__(self, reply: Optional[str]):
+        super().__init__('duplicate_turn')
+        self.reply = reply
+
+
+def load_conversation(conversation_id: int, user) -> Conversation:
+    """진행 중인 대화 + 캐릭터/장르 + 사용자 크레딧 잔액(credit_balance)을 한 쿼리로 조회"""
+    return get_object_or_404(
+        Conversation.objects.select_related('character__genre').annotate(
+            credit_balance=Subquery(
+                UserCredit.objects.filter(user_id=OuterRef('user_id')).values('free_credits')[:1]
+            )
+        ),
+        id=conversation_id,
+        user=user,
+        status='active',
+    )
+
+
+def prepare_turn(conversation: Conversation, user_message: str,
+                 idempotency_key: str = '') -> Optional[ChatTurn]:
+    """크레딧 예약 후 LLM 에 보낼 chat turn 준비. 잔액 부족이면 None"""
+    cost = gemini_service.credit_cost
+    balance = getattr(conversation, 'credit_balance', None)
+    if balance is not None and balance < cost:
+        # 잔액이 확실히 부족하면 예약 UPDATE 도 보내지 않음
+        return None
+
+    reservation = credits.reserve(conversation.user_id, cost, conversation.pk)
+    if reservation is None:
+        return None
+
+    recent = summaries.recent_messages(conversation)
+    history = summaries.prompt_history(
+        gemini_service.build_persona_prompt(conversation.character),
+        conversation.summary, recent, user_message,
+    )
+
+    return ChatTurn(
+        conversation=conversation,
+        user_message=user_message,
+        contents=gemini_service.build_chat_contents(history, user_message),
+        reservation=reservation,
+        remaining_credits=reservation.balance_after,
+        unsummarized=len(recent),
+        idempotency_key=idempotency_key,
+    )
+
+
+def finish_turn(turn: ChatTurn, ai_response: str, metadata: Dict) -> List[Message]:
+    """응답 성공: 두 메시지 저장 + 통계/제목 반영 + 예약 확정을 한 트랜잭션으로"""
+    conversation = turn.conversation
+    title = None
+    if not conversation.title and conversation.message_count == 0:
+        title = Conversation.title_from(turn.user_message)
+
+    try:
+        with transaction.atomic():
+            messages = _save_turn(turn, ai_response, metadata, title)
+    except IntegrityError:
+        if not turn.idempotency_key:
+            raise
+        # 같은 키의 재전송이 먼저 저장됨: 이번 생성 결과는 버리고 예약 환불
+        credits.refund(turn.reservation)
+        raise DuplicateTurn(idempotency.stored_reply(conversation.pk, turn.idempotency_key))
+    return messages
+
+
+def _save_turn(turn: ChatTurn, ai_response: str, metadata: Dict, title: Optional[str]) -> List[Message]:
+    conversation = turn.conversation
+    messages = Message.objects.bulk_create([
+        Message(
+            conversation=conversation,
+            sender='user',
+            content=turn.user_message,
+            idempotency_key=turn.idempotency_key,
+        ),
+        Message(
+            conversation=conversation,
+            sender='character',
+            content=ai_response,
+            ai_model_used=metadata.get('ai_model_used', ''),
+            generation_time=metadata.get('generation_time'),
+            first_token_time=metadata.get('first_token_time'),
+            input_tokens=metadata.get('input_tokens'),
+            output_tokens=metadata.get('output_tokens'),
+            cached_tokens=metadata.get('cached_tokens'),
+        ),
+    ])
+    counters.record_turn(conversation, user_messages=1, other_messages=1, title=title)
+    if not credits.commit(turn.reservation):
+        # 응답이 늦어 미정산 예약 환불(refund_stale_reservations)이 먼저 돌려준 예약: 다시 차감
+        if not credits.debit(conversation.user_id, -turn.reservation.amount, conversation.pk,
+                             memo='환불된 예약 재차감'):
+            raise ReservationLost()
+    token_usage.record_usage(conversation.user_id, conversation.character_id, metadata)
+    if summaries.is_due(turn.unsummarized + len(messages)):
+        transaction.on_commit(lambda: summaries.request_summary(conversation.pk))
+    return messages
+
+
+def abort_turn(turn: ChatTurn) -> bool:
+    """응답 실패/중단: 예약 환불"""
+    return credits.refund(turn.reservation)
+
+
+aload_conversation = sync_to_async(load_conversation)
+aprepare_turn = sync_to_async(prepare_turn)
+afinish_turn = sync_to_async(finish_turn)
+aabort_turn = sync_to_async(abort_turn)
@@ -0,0 +1,213 @@
+"""
+캐릭터 페르소나 컨텍스트 캐싱 (provider-side)
+
+성격/배경 설정이 긴 캐릭터는 매 턴마다 같은 system_instruction 을 다시 보내게 된다.
+캐릭터 버전마다 페르소나를 한 번 업로드(CachedContent)해 두고, 만료되거나 캐릭터가
+수정되기 전까지 그 핸들로 모델을 만들어 재사용한다.
+캐싱을 쓸 수 없으면(최소 토큰 미달, 미지원 모델, 네트워크 오류 등) None 을 반환해
+호출 측이 일반 모델로 폴백하도록 한다.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+from .model_cache import persona_version
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiContextCacheBackend:
+    """google.generativeai caching API 래퍼"""
+
+    def create(self, model_name: str, system_instruction: str, ttl_seconds: int,
+               display_name: str):
+        from google.generativeai import caching
+        return caching.CachedContent.create(
+            model=model_name,
+            display_name=display_name,
+            system_instruction=system_instruction,
+            ttl=timedelta(seconds=ttl_seconds),
+        )
+
+    def model_from(self, handle, generation_config: Dict, safety_settings):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=handle,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+    def delete(self, handle):
+        handle.delete()
+
+
+class LocalCachedContent:
+    """로컬 스텁이 돌려주는 캐시 핸들"""
+
+    def __init__(self, name: str, model: str, system_instruction: str, ttl_seconds: int):
+        self.name = name
+        self.model = model
+        self.system_instruction = system_instruction
+        self.expire_at = time.time() + ttl_seconds
+        self.deleted = False
+
+
+class LocalContextCacheBackend:
+    """
+    오프라인/테스트용 스텁 백엔드.
+    - 업로드/삭제 내역만 기록하고 네트워크는 쓰지 않음
+    - min_chars 보다 짧은 페르소나는 provider 의 최소 토큰 제한처럼 거절
+    - model_factory(handle) 로 모델 객체 생성 방식을 주입 가능
+    """
+
+    def __init__(self, min_chars: int = 0,
+                 model_factory: Optional[Callable[[LocalCachedContent], Any]] = None):
+        self.min_chars = min_chars
+        self.model_factory = model_factory
+        self.created: list = []
+        self.deleted: list = []
+        self._seq = itertools.count(1)
+
+    def create(self, model_name: str, system_instruction: str, ttl_seconds: int,
+               display_name: str):
+        if len(system_instruction) < self.min_chars:
+            raise ValueError("cached content is too small")
+        handle = LocalCachedContent(
+            f"cachedContents/local-{next(self._seq)}", model_name,
+            system_instruction, ttl_seconds,
+        )
+        self.created.append(handle)
+        return handle
+
+    def model_from(self, handle, generation_config: Dict, safety_settings):
+        if self.model_factory is not None:
+            return self.model_factory(handle)
+        import google.generativeai as genai
+        return genai.GenerativeModel(
+            model_name=handle.model,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            system_instruction=handle.system_instruction,
+        )
+
+    def delete(self, handle):
+        handle.deleted = True
+        self.deleted.append(handle)
+
+
+class PersonaContextCache:
+    """character_id -> (persona 버전, 캐시 핸들, 모델, 만료 시각)"""
+
+    def __init__(self, backend, ttl_seconds: int = 3600, refresh_margin: int = 60,
+                 retry_after: int = 600, min_chars: int = 0, maxsize: int = 256):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.min_chars = min_chars
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # 캐싱 실패한 캐릭터 버전은 retry_after 동안 다시 시도하지 않음
+        self._unavailable: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def model_for(self, character, persona: str, model_name: str,
+                  generation_config: Dict, safety_settings) -> Optional[Any]:
+        if len(persona) < self.min_chars:
+            return None
+
+        version = persona_version(character)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(character.pk)
+            if (entry is not None and entry[0] == version
+                    and entry[3] - self.refresh_margin > now):
+                self._entries.move_to_end(character.pk)
+                return entry[2]
+            if self._unavailable.get((character.pk, version), 0) > now:
+                return None
+
+        try:
+            handle = self.backend.create(
+                model_name, persona, self.ttl_seconds,
+                display_name=f"character-{character.pk}-{version}",
+            )
+            model = self.backend.model_from(handle, generation_config, safety_settings)
+        except Exception as e:
+            logger.info(
+                "컨텍스트 캐시 사용 불가, 일반 모델로 폴백 | character=%s err=%s",
+                character.pk, e
+            )
+            with self._lock:
+                self._unavailable[(character.pk, version)] = now + self.retry_after
+            return None
+
+        logger.info("컨텍스트 캐시 생성 | character=%s handle=%s",
+                    character.pk, getattr(handle, "name", handle))
+        with self._lock:
+            stale = self._entries.pop(character.pk, None)
+            self._entries[character.pk] = (version, handle, model, now + self.ttl_seconds)
+            evicted = [stale] if stale is not None else []
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False)[1])
+        for old in evicted:
+            self._delete_handle(old[1])
+        return model
+
+    def invalidate(self, character_id: int):
+        with self._lock:
+            entry = self._entries.pop(character_id, None)
+        if entry is not None:
+            self._delete_handle(entry[1])
+
+    def invalidate_stale(self, character):
+        version = persona_version(character)
+        with self._lock:
+            entry = self._entries.get(character.pk)
+            if entry is None or entry[0] == version:
+                return
+            del self._entries[character.pk]
+        self._delete_handle(entry[1])
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._unavailable.clear()
+        for entry in entries:
+            self._delete_handle(entry[1])
+
+    def _delete_handle(self, handle):
+        # 만료되면 provider 가 어차피 정리하므로 삭제 실패는 무시
+        try:
+            self.backend.delete(handle)
+        except Exception as e:
+            logger.debug("컨텍스트 캐시 삭제 실패 | handle=%s err=%s",
+                         getattr(handle, "name", handle), e)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _build_default_cache() -> Optional[PersonaContextCache]:
+    if not getattr(settings, "GEMINI_CONTEXT_CACHE", False):
+        return None
+    if getattr(settings, "GEMINI_CONTEXT_CACHE_BACKEND", "gemini") == "local":
+        backend = LocalContextCacheBackend()
+    else:
+        backend = GeminiContextCacheBackend()
+    return PersonaContextCache(
+        backend,
+        ttl_seconds=getattr(settings, "GEMINI_CONTEXT_CACHE_TTL", 3600),
+        min_chars=getattr(settings, "GEMINI_CONTEXT_CACHE_MIN_CHARS", 0),
+    )
+
+
+# GEMINI_CONTEXT_CACHE 가 꺼져 있으면 None
+persona_context_cache: Optional[PersonaContextCache] = _build_default_cache()
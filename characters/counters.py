@@ -0,0 +1,235 @@
+"""
+대화/캐릭터 통계 카운터
+
+메시지/평점이 저장될 때마다 행 전체를 읽고-수정-저장하는 대신, 바뀐 컬럼만
+UPDATE ... SET col = col + n 으로 원자적으로 증가시킨다.
+
+COUNTER_BUFFERING 을 켜면 증가분을 메모리에 모아 두었다가 COUNTER_FLUSH_INTERVAL 초마다
+(또는 COUNTER_MAX_PENDING 건이 쌓이면) 행별로 한 번의 UPDATE 로 반영한다.
+버퍼 모드에서는 프로세스가 비정상 종료되면 마지막 구간의 증가분이 유실될 수 있으므로
+reconcile_counters 명령으로 Message/CharacterRating 기준 재계산을 돌린다.
+재계산은 웹 워커를 멈춰 각 워커의 버퍼를 비운 뒤 실행해야 한다 (reconcile_counters --workers-drained).
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def apply_increments(model, pk, deltas: Dict[str, int], touched_at=None,
+                     assign: Optional[Dict] = None) -> int:
+    """
+    한 행의 카운터 컬럼들을 한 번의 UPDATE 로 증가.
+    touched_at 이 있으면 updated_at 도 갱신하고, assign 의 컬럼은 같은 UPDATE 에서 값 지정.
+    """
+    values = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if touched_at is not None:
+        values['updated_at'] = touched_at
+    if assign:
+        values.update(assign)
+    if not values:
+        return 0
+    return model._default_manager.filter(pk=pk).update(**values)
+
+
+class CounterBuffer:
+    """(모델, pk) 별 증가분을 모아 주기적으로 반영하는 쓰기 병합 버퍼"""
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (model, pk) -> {field: delta}, (model, pk) -> 마지막 활동 시각
+        self._deltas: Dict[Tuple[type, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._touched: Dict[Tuple[type, int], object] = {}
+        self._assign: Dict[Tuple[type, int], Dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, model, pk, deltas: Dict[str, int], touched_at=None,
+            assign: Optional[Dict] = None):
+        pending = self._merge(model, pk, deltas, touched_at, assign)
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self.flush()
+
+    def _merge(self, model, pk, deltas: Dict[str, int], touched_at=None,
+               assign: Optional[Dict] = None) -> int:
+        key = (model, pk)
+        with self._lock:
+            row = self._deltas[key]
+            for field, delta in deltas.items():
+                row[field] += delta
+            if touched_at is not None:
+                self._touched[key] = max(touched_at, self._touched.get(key, touched_at))
+            if assign:
+                self._assign.setdefault(key, {}).update(assign)
+            return len(self._deltas)
+
+    def flush(self) -> int:
+        """쌓인 증가분을 반영하고 UPDATE 한 행 수 반환 (실패한 행은 버퍼로 되돌림)"""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(int))
+                touched, self._touched = self._touched, {}
+                assign, self._assign = self._assign, {}
+
+            flushed = 0
+            for (model, pk), row in deltas.items():
+                key = (model, pk)
+                try:
+                    apply_increments(model, pk, row, touched.get(key), assign.get(key))
+                    flushed += 1
+                except Exception as e:
+                    logger.warning("카운터 반영 실패, 다음 주기에 재시도 | %s pk=%s err=%s",
+                                   model.__name__, pk, e)
+                    self._merge(model, pk, row, touched.get(key), assign.get(key))
+            return flushed
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._deltas)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='counter-flush', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                # 백그라운드 스레드 전용 DB 연결 정리
+                connection.close()
+
+    def stop(self):
+        """플러시 스레드를 멈추고 남은 증가분 반영"""
+        self._stop.set()
+        self.flush()
+
+
+def _build_default_buffer() -> Optional[CounterBuffer]:
+    if not getattr(settings, 'COUNTER_BUFFERING', False):
+        return None
+    buffer = CounterBuffer(
+        flush_interval=getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5.0),
+        max_pending=getattr(settings, 'COUNTER_MAX_PENDING', 1000),
+    )
+    atexit.register(buffer.stop)
+    return buffer
+
+
+# COUNTER_BUFFERING 이 꺼져 있으면 None (즉시 반영)
+counter_buffer: Optional[CounterBuffer] = _build_default_buffer()
+
+
+def increment(model, pk, deltas: Dict[str, int], touch: bool = False,
+              assign: Optional[Dict] = None):
+    """
+    카운터 증가. 버퍼 모드면 트랜잭션 커밋 후 버퍼에 적재,
+    아니면 현재 트랜잭션 안에서 바로 UPDATE.
+    """
+    touched_at = timezone.now() if touch else None
+    if counter_buffer is None:
+        apply_increments(model, pk, deltas, touched_at, assign)
+    else:
+        transaction.on_commit(lambda: counter_buffer.add(model, pk, deltas, touched_at, assign))
+
+
+def flush():
+    """버퍼 모드일 때 쌓인 증가분 즉시 반영"""
+    if counter_buffer is not None:
+        counter_buffer.flush()
+
+
+def record_message(message):
+    """
+    메시지 1건 저장에 따른 통계 반영
+    - 대화: message_count +1, 마지막 활동 시각 갱신
+    - 캐릭터: 사용자 메시지면 total_conversations +1
+    메모리에 올라와 있는 대화/캐릭터 객체의 값도 함께 맞춰 둔다.
+    """
+    from .models import Character, Conversation, Message
+
+    increment(Conversation, message.conversation_id, {'message_count': 1}, touch=True)
+
+    conversation = None
+    if Message.conversation.is_cached(message):
+        conversation = message.conversation
+        conversation.message_count += 1
+
+    if message.sender != 'user':
+        return
+
+    if conversation is not None:
+        character_id = conversation.character_id
+    else:
+        character_id = Conversation.objects.filter(
+            pk=message.conversation_id
+        ).values_list('character_id', flat=True).first()
+    if character_id is None:
+        return
+    increment(Character, character_id, {'total_conversations': 1})
+
+    if conversation is not None and Conversation.character.is_cached(conversation):
+        conversation.character.total_conversations += 1
+
+
+def record_turn(conversation, user_messages: int, other_messages: int,
+                title: Optional[str] = None):
+    """
+    한 턴에 bulk_create 로 함께 저장한 메시지들의 통계를 행별 UPDATE 한 번씩으로 반영
+    (대화 message_count/updated_at/제목, 캐릭터 total_conversations)
+    """
+    from .models import Character, Conversation
+
+    total = user_messages + other_messages
+    increment(
+        Conversation, conversation.pk, {'message_count': total}, touch=True,
+        assign={'title': title} if title else None,
+    )
+    conversation.message_count += total
+    if title:
+        conversation.title = title
+
+    if user_messages:
+        increment(Character, conversation.character_id, {'total_conversations': user_messages})
+        if Conversation.character.is_cached(conversation):
+            conversation.character.total_conversations += user_messages
+
+
+def apply_rating_delta(rating, character_id, sum_delta: int, count_delta: int):
+    """
+    평점 1건 변경분을 캐릭터 rating_sum/rating_count 에 즉시 반영.
+    평점은 작성 직후 화면에 보여야 하므로 버퍼 모드와 무관하게 바로 UPDATE 한다.
+    """
+    from .models import Character, CharacterRating
+
+    if character_id is None or not (sum_delta or count_delta):
+        return
+    apply_increments(Character, character_id, {
+        'rating_sum': sum_delta,
+        'rating_count': count_delta,
+    })
+
+    if (CharacterRating.character.is_cached(rating)
+            and rating.character.pk == character_id):
+        rating.character.rating_sum += sum_delta
+        rating.character.rating_count += count_delta
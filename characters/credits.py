@@ -0,0 +1,194 @@
+"""
+크레딧 차감/예약/환불
+
+잔액(UserCredit.free_credits)은 "잔액이 충분할 때만" 조건부 UPDATE 한 번으로 차감해
+동시 요청에도 이중 사용이 생기지 않게 하고, 모든 변동은 CreditLedgerEntry 에 추가 기록한다.
+
+LLM 호출은 예약 -> 확정/환불 순서로 감싼다.
+- reserve(): 호출 전에 비용만큼 잔액을 잡아 둠 (부족하면 None)
+- commit(): 응답 성공 시 예약 확정 (잔액 변화 없음)
+- refund(): 실패/중단 시 예약 금액 반환
+예약 하나에 대한 정산(확정 또는 환불)은 DB 유니크 제약으로 한 번만 일어난다.
+요청 안에서 정산되지 못한 예약(워커 종료, 타임아웃 등)은 refund_stale_reservations 로
+일정 시간이 지난 뒤 환불한다 (refund_stale_reservations 관리 명령).
+
+화면 표시용 잔액은 Django 캐시에 보관하고 변동 시 무효화한다.
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CreditLedgerEntry, UserCredit
+
+logger = logging.getLogger(__name__)
+
+BALANCE_KEY = 'credit_balance:{user_id}'
+
+
+def _balance_key(user_id: int) -> str:
+    return BALANCE_KEY.format(user_id=user_id)
+
+
+def _adjust_cached_balance(user_id: int, delta: int):
+    """
+    잔액이 바뀌면 캐시 값을 지워 다음 조회 때 DB 에서 읽게 함.
+    캐시 incr/decr 는 백엔드에 따라 읽고-쓰기라 동시 변동이 겹치면 값이 틀어질 수 있음
+    """
+    if delta:
+        invalidate_balance(user_id)
+
+
+def remember_balance(user_id: int, value: int):
+    """다른 쿼리에서 함께 읽어 온 잔액을 캐시에 저장"""
+    cache.set(_balance_key(user_id), value, getattr(settings, 'CREDIT_BALANCE_CACHE_TTL', 60))
+
+
+def invalidate_balance(user_id: int):
+    cache.delete(_balance_key(user_id))
+
+
+def balance(user_id: int) -> int:
+    """표시용 잔액 (캐시 우선, 없으면 조회 후 CREDIT_BALANCE_CACHE_TTL 동안 캐시)"""
+    key = _balance_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        credit, _ = UserCredit.objects.get_or_create(user_id=user_id)
+        value = credit.free_credits
+        remember_balance(user_id, value)
+    return value
+
+
+def _take(user_id: int, amount: int) -> bool:
+    """잔액이 amount 이상일 때만 차감 (UserCredit 이 없으면 만들고 한 번 더 시도)"""
+    for _ in range(2):
+        updated = UserCredit.objects.filter(
+            user_id=user_id, free_credits__gte=amount
+        ).update(free_credits=F('free_credits') - amount, updated_at=timezone.now())
+        if updated:
+            return True
+        _, created = UserCredit.objects.get_or_create(user_id=user_id)
+        if not created:
+            return False
+    return False
+
+
+def _give(user_id: int, amount: int):
+    UserCredit.objects.filter(user_id=user_id).update(
+        free_credits=F('free_credits') + amount, updated_at=timezone.now()
+    )
+
+
+def grant(user_id: int, amount: int, memo: str = '') -> CreditLedgerEntry:
+    """크레딧 지급"""
+    with transaction.atomic():
+        UserCredit.objects.get_or_create(user_id=user_id)
+        _give(user_id, amount)
+        entry = CreditLedgerEntry.objects.create(
+            user_id=user_id, kind='grant', amount=amount, memo=memo
+        )
+    _adjust_cached_balance(user_id, amount)
+    return entry
+
+
+def debit(user_id: int, amount: int, conversation_id: Optional[int] = None,
+          memo: str = '') -> bool:
+    """즉시 차감 (예약 없이). 잔액 부족이면 False"""
+    with transaction.atomic():
+        if not _take(user_id, amount):
+            return False
+        CreditLedgerEntry.objects.create(
+            user_id=user_id, kind='debit', amount=-amount,
+            conversation_id=conversation_id, memo=memo,
+        )
+    _adjust_cached_balance(user_id, -amount)
+    return True
+
+
+def reserve(user_id: int, amount: int, conversation_id: Optional[int] = None,
+            memo: str = '') -> Optional[CreditLedgerEntry]:
+    """
+    비용만큼 잔액을 잡아 두고 예약 항목 반환 (balance_after: 예약 직후 잔액). 잔액 부족이면 None
+    """
+    with transaction.atomic():
+        if not _take(user_id, amount):
+            return None
+        entry = CreditLedgerEntry.objects.create(
+            user_id=user_id, kind='reserve', amount=-amount,
+            conversation_id=conversation_id, memo=memo,
+        )
+        # 차감한 행을 잠근 채 같은 트랜잭션에서 읽으므로 동시 예약까지 반영된 잔액
+        entry.balance_after = UserCredit.objects.filter(
+            user_id=user_id
+        ).values_list('free_credits', flat=True).get()
+    _adjust_cached_balance(user_id, -amount)
+    return entry
+
+
+def _settle(reservation: CreditLedgerEntry, kind: str) -> bool:
+    """예약 정산 항목 기록. 이미 정산된 예약이면 False"""
+    refund_amount = -reservation.amount if kind == 'refund' else 0
+    try:
+        with transaction.atomic():
+            CreditLedgerEntry.objects.create(
+                user_id=reservation.user_id,
+                kind=kind,
+                amount=refund_amount,
+                reservation=reservation,
+                conversation_id=reservation.conversation_id,
+            )
+            if refund_amount:
+                _give(reservation.user_id, refund_amount)
+    except IntegrityError:
+        logger.warning("이미 정산된 크레딧 예약 | reservation=%s kind=%s", reservation.pk, kind)
+        return False
+    _adjust_cached_balance(reservation.user_id, refund_amount)
+    return True
+
+
+def commit(reservation: CreditLedgerEntry) -> bool:
+    """예약 확정 (응답 성공)"""
+    return _settle(reservation, 'debit')
+
+
+def refund(reservation: CreditLedgerEntry) -> bool:
+    """예약 환불 (생성 실패/중단)"""
+    return _settle(reservation, 'refund')
+
+
+def refund_stale_reservations(older_than: Optional[timedelta] = None, dry_run: bool = False) -> int:
+    """
+    정산되지 않은 채 older_than 보다 오래된 예약을 환불하고 건수 반환.
+    그 사이 요청이 정산하더라도 유니크 제약으로 한쪽만 반영된다
+    """
+    if older_than is None:
+        older_than = timedelta(minutes=getattr(settings, 'CREDIT_RESERVATION_TIMEOUT_MINUTES', 15))
+    stale = CreditLedgerEntry.objects.filter(
+        kind='reserve',
+        settlements__isnull=True,
+        created_at__lt=timezone.now() - older_than,
+    ).order_by('pk')
+    if dry_run:
+        return stale.count()
+
+    refunded = 0
+    for reservation in stale.iterator():
+        if refund(reservation):
+            refunded += 1
+            logger.warning(
+                "미정산 크레딧 예약 환불 | reservation=%s user=%s", reservation.pk, reservation.user_id
+            )
+    return refunded
+
+
+abalance = sync_to_async(balance)
+adebit = sync_to_async(debit)
+areserve = sync_to_async(reserve)
+acommit = sync_to_async(commit)
+arefund = sync_to_async(refund)
@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from PIL import Image
 import os
 from .models import Character, CharacterRating
+from emotions import reference
 from emotions.models import Genre
 
 class CharacterCreateForm(forms.ModelForm):
@@ -61,8 +62,12 @@ class CharacterCreateForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         
-        # 장르 선택지
-        self.fields['genre'].queryset = Genre.objects.all().order_by('name')
+        # 장르 선택지 (렌더링은 기준 데이터 스냅샷으로, 제출값 검증은 queryset 으로)
+        genre_field = self.fields['genre']
+        genre_field.queryset = Genre.objects.all().order_by('name')
+        genre_field.choices = [('', genre_field.empty_label)] + [
+            (genre.pk, str(genre)) for genre in reference.snapshot().genres
+        ]
         
         # 필수 필드
         for field_name in ['name', 'genre', 'description', 'personality']:
@@ -0,0 +1,91 @@
+"""
+메시지 전송 멱등 키 (Idempotency-Key 헤더)
+
+더블클릭/네트워크 재시도로 같은 메시지가 두 번 들어와도 LLM 호출, 크레딧 차감,
+메시지 저장이 한 번만 일어나게 한다. 클라이언트는 전송마다 키를 하나 만들고
+재시도할 때 같은 키를 다시 보낸다.
+- claim: 공유 캐시에 cache.add 로 키를 선점 ('pending'). 이미 있으면
+  처리 중('pending') 또는 완료('done', 저장된 응답) 상태를 반환
+- complete: 턴이 저장되면 응답을 IDEMPOTENCY_KEY_TTL 동안 보관 (재시도는 이 값을 그대로 받음)
+- release: 생성 실패/크레딧 부족이면 키를 풀어 같은 키로 다시 시도할 수 있게 함
+- 캐시가 비워졌거나 프로세스별 캐시라 선점이 겹치면 Message 의
+  (conversation, idempotency_key) 유일 제약이 두 번째 저장을 막는다 (chat_turn.DuplicateTurn)
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Message
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.:-]{8,64}$')
+CACHE_KEY = 'chat_idempotency:{user_id}:{conversation_id}:{key}'
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class InvalidKey(ValueError):
+    pass
+
+
+def request_key(request) -> str:
+    """요청 헤더의 멱등 키 (없으면 '', 형식이 틀리면 InvalidKey)"""
+    key = request.META.get(HEADER, '').strip()
+    if key and not KEY_PATTERN.match(key):
+        raise InvalidKey(key)
+    return key
+
+
+def _cache_key(user_id: int, conversation_id: int, key: str) -> str:
+    return CACHE_KEY.format(user_id=user_id, conversation_id=conversation_id, key=key)
+
+
+def claim(user_id: int, conversation_id: int, key: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    (상태, 저장된 응답) 반환. 선점에 성공하면 (None, None).
+    선점 표시는 IDEMPOTENCY_PENDING_TTL 뒤에 풀리므로 처리 중 프로세스가 죽어도 재시도 가능
+    """
+    cache_key = _cache_key(user_id, conversation_id, key)
+    pending_ttl = getattr(settings, 'IDEMPOTENCY_PENDING_TTL', 120)
+    if cache.add(cache_key, {'state': PENDING}, pending_ttl):
+        return None, None
+    entry = cache.get(cache_key)
+    if entry is None:
+        # 그 사이 풀림 (실패 후 release): 한 번 더 선점 시도
+        if cache.add(cache_key, {'state': PENDING}, pending_ttl):
+            return None, None
+        return PENDING, None
+    return entry['state'], entry.get('result')
+
+
+def complete(user_id: int, conversation_id: int, key: str, result: Dict):
+    cache.set(
+        _cache_key(user_id, conversation_id, key),
+        {'state': DONE, 'result': result},
+        getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400),
+    )
+
+
+def release(user_id: int, conversation_id: int, key: str):
+    cache.delete(_cache_key(user_id, conversation_id, key))
+
+
+def stored_reply(conversation_id: int, key: str) -> Optional[str]:
+    """같은 키로 이미 저장된 턴의 AI 응답 (유일 제약에 걸렸을 때)"""
+    user_message = Message.objects.filter(
+        conversation_id=conversation_id, idempotency_key=key
+    ).values_list('id', flat=True).first()
+    if user_message is None:
+        return None
+    return Message.objects.filter(
+        conversation_id=conversation_id, sender='character', id__gt=user_message
+    ).order_by('id').values_list('content', flat=True).first()
+
+
+aclaim = sync_to_async(claim)
+acomplete = sync_to_async(complete)
+arelease = sync_to_async(release)
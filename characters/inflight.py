@@ -0,0 +1,100 @@
+"""
+진행 중인 동일 LLM 호출 합치기 (single-flight, 프로세스 단위)
+
+같은 프롬프트(모델 + 페르소나 + chat turn)의 생성이 이미 진행 중이면 새로 호출하지 않고
+그 결과를 함께 받는다. 결과를 캐시하지는 않는다 (호출이 끝나면 키를 비움).
+동기/비동기 호출이 같은 키를 공유할 수 있도록 concurrent.futures.Future 를 쓰고,
+비동기 쪽은 asyncio.wrap_future 로 기다린다 (요청마다 이벤트 루프가 달라도 동작).
+호출하던 쪽이 취소되면 기다리던 쪽 중 하나가 이어서 호출한다 (취소를 다른 요청에 넘기지 않음).
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+def call_key(model_name: str, persona: str, contents: List[Dict]) -> str:
+    payload = json.dumps([model_name, persona, contents], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _LeaderGone(Exception):
+    """호출하던 쪽이 취소되어 결과 없이 끝남 (기다리던 쪽 하나가 이어서 호출)"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """(공유 Future, 직접 호출해야 하는지)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            # 실행 중 상태로 두어 기다리는 쪽의 취소가 공유 Future 로 번지지 않게
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: str, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(결과, 다른 호출의 결과를 받았는지)"""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result(), True
+                except _LeaderGone:
+                    continue
+            try:
+                result = fn()
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                # 취소/인터럽트는 기다리던 쪽에 넘기지 않음
+                self._finish(key, future, error=_LeaderGone())
+                raise
+            self._finish(key, future, result)
+            return result, False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        do 의 비동기 버전. 기다리는 쪽은 shield 로 감싼 자기 몫의 Future 를 기다리므로
+        한 요청이 끊겨(CancelledError) 취소되어도 같은 키의 다른 요청은 그대로 결과를 받는다
+        """
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return await asyncio.shield(asyncio.wrap_future(future)), True
+                except _LeaderGone:
+                    continue
+            try:
+                result = await fn()
+            except Exception as e:
+                self._finish(key, future, error=e)
+                raise
+            except BaseException:
+                self._finish(key, future, error=_LeaderGone())
+                raise
+            self._finish(key, future, result)
+            return result, False
+
+    def __len__(self):
+        return len(self._calls)
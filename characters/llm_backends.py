@@ -0,0 +1,383 @@
+"""
+LLM 백엔드 인터페이스
+
+GeminiChatService 는 크레딧/히스토리/재시도 같은 대화 흐름만 담당하고,
+실제 생성 호출은 LLMBackend 구현체에 위임한다.
+- GeminiBackend: google.generativeai (모델 캐시 + 선택적 컨텍스트 캐싱)
+- StubBackend: 네트워크 없이 동작하는 결정적 스텁 (부하 테스트/벤치마크용)
+
+settings.LLM_BACKEND 로 선택 ('gemini' | 'stub' | 클래스 dotted path).
+contents 는 [{"role": "user"|"model", "parts": [str, ...]}, ...] 형식의 chat turn 목록.
+생성 메서드에 TokenUsage 를 넘기면 백엔드가 입력/출력/캐시 토큰 수를 채운다
+(Gemini 는 응답의 usage_metadata, 스텁은 로컬 추정).
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Protocol
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .model_cache import character_model_cache
+from .context_cache import persona_context_cache
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """로컬 토큰 추정 (한글은 글자당 약 1토큰, 그 외는 4글자당 약 1토큰)"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + math.ceil((len(text) - non_ascii) / 4)
+
+
+def contents_text(contents: List[Dict]) -> str:
+    return "\n".join(str(part) for turn in contents for part in turn["parts"])
+
+
+@dataclass
+class TokenUsage:
+    """생성 호출 한 번의 토큰 수 (input_tokens 는 cached_tokens 를 포함)"""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+    def fill_from_metadata(self, metadata) -> bool:
+        """Gemini usage_metadata 로 채움 (없으면 False)"""
+        if metadata is None:
+            return False
+        self.input_tokens = getattr(metadata, "prompt_token_count", 0) or 0
+        self.output_tokens = getattr(metadata, "candidates_token_count", 0) or 0
+        self.cached_tokens = getattr(metadata, "cached_content_token_count", 0) or 0
+        return True
+
+    def estimate(self, system_instruction: str, contents: List[Dict], output: str):
+        """로컬 추정으로 채움 (usage_metadata 가 없는 백엔드/응답용)"""
+        self.input_tokens = estimate_tokens(system_instruction) + estimate_tokens(contents_text(contents))
+        self.output_tokens = estimate_tokens(output)
+        self.cached_tokens = 0
+
+    def as_meta(self) -> Dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+class LLMBackend(Protocol):
+    """생성 백엔드가 구현해야 하는 인터페이스"""
+
+    model_name: str
+
+    def generate(self, character, system_instruction: str, contents: List[Dict],
+                 usage: Optional[TokenUsage] = None) -> str:
+        """한 번의 생성 호출 (재시도는 호출 측 책임)"""
+        ...
+
+    async def agenerate(self, character, system_instruction: str, contents: List[Dict],
+                        usage: Optional[TokenUsage] = None) -> str:
+        ...
+
+    def stream(self, character, system_instruction: str, contents: List[Dict],
+               usage: Optional[TokenUsage] = None) -> Iterator[str]:
+        """부분 텍스트를 순서대로 yield (usage 는 스트림이 끝난 뒤 채워짐)"""
+        ...
+
+    def count_tokens(self, character, system_instruction: str, contents: List[Dict]) -> int:
+        ...
+
+    def complete(self, system_instruction: str, contents: List[Dict]) -> str:
+        """캐릭터 페르소나 없이 하는 보조 생성 (대화 요약 등)"""
+        ...
+
+
+def _get_env(name: str, default: Optional[str] = None) -> str:
+    val = os.getenv(name, default)
+    if val is None:
+        raise ValueError(f"환경변수 {name}가 설정되지 않았습니다.")
+    return val
+
+
+class GeminiBackend:
+    """
+    Gemini 백엔드
+    - 모델명은 환경변수 GEMINI_MODEL 로 고정 (예: 'models/gemini-2.5-flash')
+    - 캐릭터별 모델 캐시, 선택적 컨텍스트 캐싱 (GEMINI_CONTEXT_CACHE)
+    """
+
+    def __init__(self):
+        import google.generativeai as genai
+        self._genai = genai
+
+        api_key = _get_env("GEMINI_API_KEY")
+        genai.configure(api_key=api_key)
+
+        # ✅ 프로덕션: 모델명 고정 (필수)
+        self.model_name = _get_env("GEMINI_MODEL", "models/gemini-2.0-flash")
+
+        self.generation_config = {
+            "temperature": 0.9,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 1024,
+        }
+        self.safety_settings = self._build_safety_settings()
+        # 보조 생성용 모델 (지시문 -> 모델, 지시문은 몇 개 안 되는 고정 문자열)
+        self._instruction_models: Dict[str, object] = {}
+
+    def _build_safety_settings(self):
+        try:
+            from google.generativeai.types import HarmCategory, HarmBlockThreshold
+            return [
+                {"category": HarmCategory.HARM_CATEGORY_HARASSMENT,
+                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
+                {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
+                {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
+                {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
+            ]
+        except Exception:
+            return [
+                {"category": "HARM_CATEGORY_HARASSMENT",
+                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_HATE_SPEECH",
+                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+            ]
+
+    def _model_for(self, character, system_instruction: str):
+        """
+        캐릭터 버전별로 캐시된 GenerativeModel 반환.
+        - 컨텍스트 캐싱 모드면 업로드된 페르소나 핸들 기반 모델을 우선 사용
+        """
+        if persona_context_cache is not None:
+            model = persona_context_cache.model_for(
+                character,
+                system_instruction,
+                self.model_name,
+                self.generation_config,
+                self.safety_settings,
+            )
+            if model is not None:
+                return model
+
+        return character_model_cache.get_or_create(
+            character,
+            lambda: self._genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                system_instruction=system_instruction,
+            ),
+        )
+
+    @staticmethod
+    def _record_usage(usage: Optional[TokenUsage], metadata, system_instruction: str,
+                      contents: List[Dict], text: str):
+        if usage is not None and not usage.fill_from_metadata(metadata):
+            usage.estimate(system_instruction, contents, text)
+
+    def generate(self, character, system_instruction: str, contents: List[Dict],
+                 usage: Optional[TokenUsage] = None) -> str:
+        resp = self._model_for(character, system_instruction).generate_content(contents)
+        text = (getattr(resp, "text", None) or "").strip()
+        self._record_usage(usage, getattr(resp, "usage_metadata", None), system_instruction, contents, text)
+        return text
+
+    async def agenerate(self, character, system_instruction: str, contents: List[Dict],
+                        usage: Optional[TokenUsage] = None) -> str:
+        # 컨텍스트 캐싱 모드의 첫 호출은 페르소나 업로드(동기 네트워크 호출)라 이벤트 루프 밖에서
+        model = await asyncio.to_thread(self._model_for, character, system_instruction)
+        resp = await model.generate_content_async(contents)
+        text = (getattr(resp, "text", None) or "").strip()
+        self._record_usage(usage, getattr(resp, "usage_metadata", None), system_instruction, contents, text)
+        return text
+
+    def stream(self, character, system_instruction: str, contents: List[Dict],
+               usage: Optional[TokenUsage] = None) -> Iterator[str]:
+        model = self._model_for(character, system_instruction)
+        metadata = None
+        parts: List[str] = []
+        for chunk in model.generate_content(contents, stream=True):
+            # 사용량은 마지막 청크에 누적값으로 들어옴
+            metadata = getattr(chunk, "usage_metadata", None) or metadata
+            text = getattr(chunk, "text", None) or ""
+            if text:
+                parts.append(text)
+                yield text
+        self._record_usage(usage, metadata, system_instruction, contents, "".join(parts))
+
+    def count_tokens(self, character, system_instruction: str, contents: List[Dict]) -> int:
+        model = self._model_for(character, system_instruction)
+        return model.count_tokens(contents).total_tokens
+
+    def complete(self, system_instruction: str, contents: List[Dict]) -> str:
+        model = self._instruction_models.get(system_instruction)
+        if model is None:
+            model = self._genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                system_instruction=system_instruction,
+            )
+            self._instruction_models[system_instruction] = model
+        resp = model.generate_content(contents)
+        return (getattr(resp, "text", None) or "").strip()
+
+
+class StubBackendError(RuntimeError):
+    """스텁이 주입하는 장애 (google api_core 예외처럼 code 에 HTTP 상태를 담아 재시도/차단 경로를 태움)"""
+
+    def __init__(self, message: str, code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+class StubBackend:
+    """
+    오프라인 결정적 스텁 백엔드.
+    - 응답 텍스트는 (페르소나, 마지막 사용자 메시지) 해시로 결정 → 같은 입력이면 같은 출력
+    - latency: 'fixed' | 'uniform' | 'normal' | 'lognormal' 분포 (ms)
+    - error_rate / rate_limit_rate 확률로 503/429 오류 주입
+    - 스트리밍은 first_token_ms 후 chunk_delay_ms 간격으로 chunk_chars 글자씩 전송
+    """
+
+    model_name = "stub"
+
+    SENTENCES = [
+        "그랬군요, 오늘 하루 정말 고생 많았어요.",
+        "천천히 이야기해 주셔도 괜찮아요.",
+        "그 마음 충분히 이해해요.",
+        "제가 옆에서 계속 들어 드릴게요.",
+        "조금 쉬어 가는 것도 용기예요.",
+        "다음엔 어떤 일이 있었는지 궁금해요.",
+        "생각보다 잘 해내고 계신 거예요.",
+        "함께 방법을 찾아봐요.",
+    ]
+
+    def __init__(self, latency: str = "lognormal", latency_ms: float = 800.0,
+                 latency_spread: float = 0.5, first_token_ms: float = 250.0,
+                 chunk_delay_ms: float = 40.0, chunk_chars: int = 8,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 sentences: int = 3, seed: Optional[int] = None):
+        self.latency = latency
+        self.latency_ms = float(latency_ms)
+        self.latency_spread = float(latency_spread)
+        self.first_token_ms = float(first_token_ms)
+        self.chunk_delay_ms = float(chunk_delay_ms)
+        self.chunk_chars = max(1, int(chunk_chars))
+        self.error_rate = float(error_rate)
+        self.rate_limit_rate = float(rate_limit_rate)
+        self.sentences = max(1, int(sentences))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # --- 분포/장애 ---
+    def _sample_latency(self) -> float:
+        """지연시간 샘플 (초)"""
+        with self._lock:
+            if self.latency == "fixed":
+                ms = self.latency_ms
+            elif self.latency == "uniform":
+                spread = self.latency_ms * self.latency_spread
+                ms = self._rng.uniform(self.latency_ms - spread, self.latency_ms + spread)
+            elif self.latency == "normal":
+                ms = self._rng.gauss(self.latency_ms, self.latency_ms * self.latency_spread)
+            else:
+                # latency_ms 를 중앙값으로 하는 로그정규 분포
+                ms = self._rng.lognormvariate(math.log(self.latency_ms), self.latency_spread)
+        return max(0.0, ms) / 1000.0
+
+    def _maybe_fail(self):
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            raise StubBackendError("429 rate limit exceeded (stub)", code=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise StubBackendError("503 service unavailable (stub)", code=503)
+
+    # --- 응답 ---
+    def _reply(self, system_instruction: str, contents: List[Dict]) -> str:
+        last_user = ""
+        for turn in reversed(contents):
+            if turn["role"] == "user":
+                last_user = str(turn["parts"][-1])
+                break
+        digest = hashlib.sha256(
+            f"{system_instruction}\x1f{last_user}".encode("utf-8")
+        ).digest()
+        count = min(self.sentences, len(self.SENTENCES))
+        return " ".join(random.Random(digest).sample(self.SENTENCES, count))
+
+    def generate(self, character, system_instruction: str, contents: List[Dict],
+                 usage: Optional[TokenUsage] = None) -> str:
+        time.sleep(self._sample_latency())
+        self._maybe_fail()
+        text = self._reply(system_instruction, contents)
+        if usage is not None:
+            usage.estimate(system_instruction, contents, text)
+        return text
+
+    async def agenerate(self, character, system_instruction: str, contents: List[Dict],
+                        usage: Optional[TokenUsage] = None) -> str:
+        await asyncio.sleep(self._sample_latency())
+        self._maybe_fail()
+        text = self._reply(system_instruction, contents)
+        if usage is not None:
+            usage.estimate(system_instruction, contents, text)
+        return text
+
+    def stream(self, character, system_instruction: str, contents: List[Dict],
+               usage: Optional[TokenUsage] = None) -> Iterator[str]:
+        time.sleep(self.first_token_ms / 1000.0)
+        self._maybe_fail()
+        text = self._reply(system_instruction, contents)
+        for i in range(0, len(text), self.chunk_chars):
+            if i:
+                time.sleep(self.chunk_delay_ms / 1000.0)
+            yield text[i:i + self.chunk_chars]
+        if usage is not None:
+            usage.estimate(system_instruction, contents, text)
+
+    def count_tokens(self, character, system_instruction: str, contents: List[Dict]) -> int:
+        return estimate_tokens(system_instruction) + estimate_tokens(contents_text(contents))
+
+    def complete(self, system_instruction: str, contents: List[Dict]) -> str:
+        # 요약 흉내: 입력의 앞부분을 잘라 반환 (결정적)
+        time.sleep(self._sample_latency())
+        self._maybe_fail()
+        return " ".join(contents_text(contents).split())[:200]
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "stub": StubBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, **options) -> LLMBackend:
+    """settings.LLM_BACKEND (또는 name) 에 해당하는 백엔드 생성"""
+    name = name or getattr(settings, "LLM_BACKEND", "gemini")
+    if name in BACKENDS:
+        backend_class = BACKENDS[name]
+    else:
+        backend_class = import_string(name)
+
+    if backend_class is StubBackend and not options:
+        options = dict(getattr(settings, "LLM_STUB_OPTIONS", {}))
+    return backend_class(**options)
@@ -0,0 +1,324 @@
+# characters/management/commands/benchmark_chat.py
+import json
+import math
+import platform
+import queue
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from characters import credits
+from characters.llm_backends import StubBackend
+from characters.models import Character, Conversation, UserCredit
+from characters.services import gemini_service
+from emotions.models import Emotion, Genre
+
+
+ENDPOINTS = ['send_message', 'conversation_view', 'character_list', 'recommended_characters']
+BENCH_PREFIX = 'bench_'
+
+
+def percentile(values, pct):
+    """nearest-rank 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class Command(BaseCommand):
+    help = '스텁 LLM 백엔드로 주요 채팅/목록 엔드포인트의 지연시간, 처리량, 쿼리 수를 측정합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='시드할 사용자 수')
+        parser.add_argument('--characters', type=int, default=50, help='시드할 캐릭터 수')
+        parser.add_argument('--conversations', type=int, default=2, help='사용자당 대화 수')
+        parser.add_argument('--requests', type=int, default=200, help='엔드포인트별 요청 수')
+        parser.add_argument('--concurrency', type=int, default=8, help='동시 요청 수')
+        parser.add_argument(
+            '--endpoints',
+            type=str,
+            default=','.join(ENDPOINTS),
+            help=f'측정할 엔드포인트 (쉼표 구분, 기본: {",".join(ENDPOINTS)})',
+        )
+        parser.add_argument('--llm-latency-ms', type=float, default=50.0, help='스텁 LLM 지연시간 중앙값(ms)')
+        parser.add_argument('--llm-error-rate', type=float, default=0.0, help='스텁 LLM 오류율 (0~1)')
+        parser.add_argument('--seed', type=int, default=42, help='시드 데이터/요청 순서/스텁 난수 시드')
+        parser.add_argument('--output', type=str, help='결과 JSON 파일 경로 (기본: 표준출력)')
+        parser.add_argument('--compare', type=str, help='이전 결과 JSON 과 p50/p95/쿼리 수 비교')
+        parser.add_argument('--keep', action='store_true', help='측정 후 시드 데이터를 삭제하지 않습니다')
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'알 수 없는 엔드포인트: {", ".join(sorted(unknown))}')
+
+        self.rng = random.Random(options['seed'])
+
+        # 실제 Gemini 호출이 나가지 않도록 스텁으로 교체
+        original_backend = gemini_service.backend
+        original_initialised = gemini_service._initialised
+        gemini_service.backend = StubBackend(
+            latency='lognormal',
+            latency_ms=options['llm_latency_ms'],
+            latency_spread=0.3,
+            error_rate=options['llm_error_rate'],
+            seed=options['seed'],
+        )
+        gemini_service._initialised = False
+
+        setup_test_environment()
+        self.created_refs = []
+        try:
+            self.stderr.write('시드 데이터를 생성합니다...')
+            fixture = self.seed(options)
+
+            results = {}
+            for name in endpoints:
+                self.stderr.write(f'측정 중: {name}')
+                results[name] = self.run_endpoint(name, fixture, options)
+        finally:
+            teardown_test_environment()
+            gemini_service.backend = original_backend
+            gemini_service._initialised = original_initialised
+            if not options['keep']:
+                self.cleanup()
+
+        report = {
+            'meta': self.build_meta(options, endpoints),
+            'endpoints': results,
+        }
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload)
+            self.stderr.write(self.style.SUCCESS(f'결과 저장: {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    # -----------------------------
+    # 시드 데이터
+    # -----------------------------
+    def seed(self, options):
+        genre = Genre.objects.order_by('id').first()
+        if genre is None:
+            genre = Genre.objects.create(name=f'{BENCH_PREFIX}genre', description='benchmark')
+            self.created_refs.append(genre)
+
+        emotion = Emotion.objects.filter(is_active=True).order_by('id').first()
+        if emotion is None:
+            emotion = Emotion.objects.create(name=f'{BENCH_PREFIX}emotion', emoji='🙂')
+            self.created_refs.append(emotion)
+
+        users = []
+        for i in range(options['users']):
+            user, _ = User.objects.get_or_create(
+                username=f'{BENCH_PREFIX}user_{i}',
+                defaults={'email': f'{BENCH_PREFIX}user_{i}@example.com'},
+            )
+            users.append(user)
+        # 측정 중 크레딧 부족이 나지 않도록 넉넉히
+        UserCredit.objects.filter(user__in=users).update(free_credits=10 ** 6)
+        for user in users:
+            credits.invalidate_balance(user.pk)
+
+        creator = users[0]
+        characters = []
+        for i in range(options['characters']):
+            character, _ = Character.objects.get_or_create(
+                creator=creator,
+                name=f'{BENCH_PREFIX}char_{i}',
+                defaults={
+                    'genre': genre,
+                    'description': f'벤치마크 캐릭터 {i} 위로와 공감',
+                    'personality': '따뜻하고 공감 능력이 뛰어난 성격',
+                    'background_story': '작은 상담센터를 운영하며 희망을 전하는 인물',
+                    'speaking_style': '부드럽고 차분한 존댓말',
+                    'tags': '위로, 치유, 따뜻함',
+                    'visibility': 'public',
+                    'status': 'active',
+                },
+            )
+            characters.append(character)
+
+        conversations = {}
+        for user in users:
+            picks = self.rng.sample(characters, min(options['conversations'], len(characters)))
+            conversations[user.pk] = [
+                Conversation.objects.get_or_create(
+                    user=user, character=character, status='active'
+                )[0].pk
+                for character in picks
+            ]
+
+        return {
+            'users': users,
+            'genre': genre,
+            'emotion': emotion,
+            'conversations': conversations,
+        }
+
+    def cleanup(self):
+        # 사용자 삭제 시 캐릭터/대화/메시지/크레딧은 CASCADE 로 함께 삭제
+        User.objects.filter(username__startswith=f'{BENCH_PREFIX}user_').delete()
+        for obj in self.created_refs:
+            obj.delete()
+
+    # -----------------------------
+    # 측정
+    # -----------------------------
+    def build_request(self, name, user, fixture):
+        """(method, path, body) 반환"""
+        if name == 'send_message':
+            conversation_id = self.rng.choice(fixture['conversations'][user.pk])
+            path = reverse('characters:send_message', args=[conversation_id])
+            message = f'벤치마크 메시지 {self.rng.randint(0, 10 ** 6)}'
+            return 'post', path, json.dumps({'message': message})
+        if name == 'conversation_view':
+            conversation_id = self.rng.choice(fixture['conversations'][user.pk])
+            return 'get', reverse('characters:conversation', args=[conversation_id]), None
+        if name == 'character_list':
+            return 'get', reverse('characters:character_list'), None
+        return 'get', (
+            f"{reverse('characters:recommended_characters')}"
+            f"?emotion={fixture['emotion'].pk}&genre={fixture['genre'].pk}&sort=recommended"
+        ), None
+
+    def run_endpoint(self, name, fixture, options):
+        users = fixture['users']
+        jobs = queue.Queue()
+        for i in range(options['requests']):
+            user = users[i % len(users)]
+            jobs.put((user, self.build_request(name, user, fixture)))
+
+        samples = []
+        samples_lock = threading.Lock()
+
+        def worker():
+            clients = {}
+            try:
+                while True:
+                    try:
+                        user, (method, path, body) = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    client = clients.get(user.pk)
+                    if client is None:
+                        client = Client()
+                        client.force_login(user)
+                        clients[user.pk] = client
+
+                    ok = True
+                    t0 = time.perf_counter()
+                    with CaptureQueriesContext(connection) as ctx:
+                        try:
+                            if method == 'post':
+                                response = client.post(
+                                    path, data=body, content_type='application/json', secure=True
+                                )
+                            else:
+                                response = client.get(path, secure=True)
+                            if response.streaming:
+                                b''.join(response.streaming_content)
+                            elif response['Content-Type'].startswith('application/json'):
+                                ok = json.loads(response.content).get('success', True)
+                            ok = ok and response.status_code < 400
+                        except Exception:
+                            ok = False
+                    elapsed_ms = (time.perf_counter() - t0) * 1000
+                    with samples_lock:
+                        samples.append((elapsed_ms, len(ctx.captured_queries), ok))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(max(1, options['concurrency']))]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        latencies = [s[0] for s in samples]
+        queries = [s[1] for s in samples]
+        errors = sum(1 for s in samples if not s[2])
+        return {
+            'requests': len(samples),
+            'errors': errors,
+            'concurrency': options['concurrency'],
+            'throughput_rps': round(len(samples) / wall, 2) if wall else None,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'mean': round(sum(latencies) / len(latencies), 2),
+                'max': round(max(latencies), 2),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'p95': percentile(queries, 95),
+                'max': max(queries),
+            },
+        }
+
+    # -----------------------------
+    # 결과
+    # -----------------------------
+    def build_meta(self, options, endpoints):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except Exception:
+            commit = None
+
+        return {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'endpoints': endpoints,
+            'options': {
+                key: options[key] for key in (
+                    'users', 'characters', 'conversations', 'requests', 'concurrency',
+                    'llm_latency_ms', 'llm_error_rate', 'seed',
+                )
+            },
+        }
+
+    def compare(self, report, baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        self.stderr.write(
+            f'\n비교 기준: {baseline["meta"].get("commit")} → 현재: {report["meta"].get("commit")}'
+        )
+        for name, current in report['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(name)
+            if not before:
+                continue
+            parts = []
+            for key in ('p50', 'p95'):
+                old, new = before['latency_ms'][key], current['latency_ms'][key]
+                change = (new - old) / old * 100 if old else 0.0
+                parts.append(f'{key} {old:.1f}→{new:.1f}ms ({change:+.0f}%)')
+            parts.append(f'queries {before["queries"]["mean"]}→{current["queries"]["mean"]}')
+            self.stderr.write(f'  {name}: ' + ', '.join(parts))
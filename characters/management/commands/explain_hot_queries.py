@@ -0,0 +1,68 @@
+# characters/management/commands/explain_hot_queries.py
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from characters.models import Character, Conversation, Message
+from emotions.models import EmotionKeyword, UserEmotionEntry
+
+# 전체 테이블 스캔으로 보는 실행 계획 패턴 (DB 벤더별)
+FULL_SCAN_PATTERNS = {
+    # SQLite: "SCAN table" (인덱스를 타면 "SCAN table USING INDEX ..." / "SEARCH ...")
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)'),
+    # PostgreSQL: "Seq Scan on table"
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = '자주 실행되는 조회 쿼리의 실행 계획(EXPLAIN)을 확인하고, 전체 스캔이 있으면 실패합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='모든 쿼리의 실행 계획을 출력합니다')
+
+    def hot_queries(self):
+        """(이름, queryset) 목록. 값 자체는 실행 계획에 영향이 없으므로 임의 ID 사용"""
+        today = date.today()
+        public = Character.objects.filter(status='active', visibility='public')
+        return [
+            ('진행 중인 대화 찾기 (start_conversation, character_detail)',
+             Conversation.objects.filter(user_id=1, character_id=1, status='active')[:1]),
+            ('대화 히스토리 (최근 메시지)',
+             Message.objects.filter(conversation_id=1).order_by('-timestamp', '-id')[:5]),
+            ('대화 화면 메시지 목록',
+             Message.objects.filter(conversation_id=1).order_by('timestamp', 'id')),
+            ('공개 캐릭터 목록 (인기순)',
+             public.order_by('-total_conversations', '-created_at')[:12]),
+            ('공개 캐릭터 목록 (장르 필터)',
+             public.filter(genre_id=1).order_by('-total_conversations', '-created_at')[:12]),
+            ('감정 캘린더 (월 범위)',
+             UserEmotionEntry.objects.filter(
+                 user_id=1, date__gte=today.replace(day=1), date__lt=today
+             ).order_by('date')),
+            ('감정 키워드 (가중치순)',
+             EmotionKeyword.objects.filter(emotion_id=1).order_by('-weight', 'keyword')),
+        ]
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'지원하지 않는 DB 입니다: {connection.vendor}')
+
+        failures = []
+        for name, qs in self.hot_queries():
+            plan = qs.explain()
+            scanned = sorted(set(pattern.findall(plan)))
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'✗ {name}: 전체 스캔 ({", ".join(scanned)})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+            if scanned or options['verbose_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'전체 스캔 쿼리 {len(failures)}개: {", ".join(failures)}')
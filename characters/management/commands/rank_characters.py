@@ -0,0 +1,104 @@
+# characters/management/commands/rank_characters.py
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from characters.models import Character
+from characters.ranking import BatchScorer, CandidateFeatures
+from characters.recommendations import max_total_conversations, user_genre_preferences
+from emotions.models import Emotion, Genre
+
+
+class Command(BaseCommand):
+    help = '감정 기준으로 캐릭터 전체(또는 장르)의 추천 순위를 배치 계산합니다 (가중치 실험용)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emotion', type=str, required=True, help='감정 이름 또는 ID')
+        parser.add_argument('--genre', type=str, help='장르 이름 또는 ID (생략 시 전체 장르)')
+        parser.add_argument('--user', type=str, help='개인화 기준 사용자명 (생략 시 비로그인 기준)')
+        parser.add_argument('--top', type=int, default=20, help='출력할 상위 캐릭터 수')
+        parser.add_argument(
+            '--weights',
+            type=str,
+            help='가중치 덮어쓰기 (예: keyword=0.5,preference=0.2,rating=0.2,popularity=0.1)',
+        )
+        parser.add_argument('--all', action='store_true', help='비공개/비활성 캐릭터도 포함합니다')
+        parser.add_argument('--json', action='store_true', help='결과를 JSON 으로 출력합니다')
+
+    def handle(self, *args, **options):
+        emotion = self.lookup(Emotion, options['emotion'])
+
+        characters_qs = Character.objects.all()
+        if not options['all']:
+            characters_qs = characters_qs.filter(status='active', visibility='public')
+        if options.get('genre'):
+            characters_qs = characters_qs.filter(genre=self.lookup(Genre, options['genre']))
+
+        preferences = None
+        if options.get('user'):
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'사용자 "{options["user"]}"을 찾을 수 없습니다.')
+            preferences = user_genre_preferences(user)
+
+        try:
+            scorer = BatchScorer(self.parse_weights(options.get('weights')))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        t0 = time.perf_counter()
+        features = CandidateFeatures.load(characters_qs, emotion)
+        max_conversations = max_total_conversations()
+        t1 = time.perf_counter()
+        ranked = scorer.rank(features, options['top'], preferences, max_conversations)
+        t2 = time.perf_counter()
+
+        names = dict(
+            Character.objects.filter(pk__in=[pk for pk, _ in ranked]).values_list('pk', 'name')
+        )
+        result = {
+            'emotion': emotion.name,
+            'weights': scorer.weights,
+            'candidates': len(features),
+            'load_ms': round((t1 - t0) * 1000, 2),
+            'score_ms': round((t2 - t1) * 1000, 2),
+            'ranking': [
+                {'id': pk, 'name': names.get(pk, ''), 'score': round(score, 4)}
+                for pk, score in ranked
+            ],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(
+            f'{emotion.name} | 후보 {result["candidates"]}명 | '
+            f'적재 {result["load_ms"]}ms, 계산 {result["score_ms"]}ms'
+        )
+        for rank, row in enumerate(result['ranking'], start=1):
+            self.stdout.write(f'{rank:>3}. {row["name"]} (#{row["id"]})  {row["score"]:.4f}')
+
+    def lookup(self, model, value):
+        field = 'pk' if value.isdigit() else 'name'
+        try:
+            return model.objects.get(**{field: value})
+        except model.DoesNotExist:
+            raise CommandError(f'{model._meta.verbose_name} "{value}"을 찾을 수 없습니다.')
+
+    def parse_weights(self, raw):
+        if not raw:
+            return None
+        weights = {}
+        for part in raw.split(','):
+            key, sep, value = part.partition('=')
+            if not sep:
+                raise CommandError(f'가중치 형식이 올바르지 않습니다: {part}')
+            try:
+                weights[key.strip()] = float(value)
+            except ValueError:
+                raise CommandError(f'가중치 값이 숫자가 아닙니다: {part}')
+        return weights
@@ -0,0 +1,38 @@
+# characters/management/commands/rebuild_recommendation_scores.py
+from django.core.management.base import BaseCommand
+
+from characters.models import CharacterEmotionScore
+from characters.recommendations import rebuild_scores
+from emotions.models import Emotion
+
+
+class Command(BaseCommand):
+    help = '감정별 캐릭터 키워드 매칭 점수(추천 정렬용)를 다시 계산합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--emotion',
+            type=str,
+            help='특정 감정의 점수만 다시 계산합니다 (감정 이름)',
+        )
+
+    def handle(self, *args, **options):
+        emotion_ids = None
+        if options.get('emotion'):
+            emotion_ids = list(
+                Emotion.objects.filter(name=options['emotion']).values_list('pk', flat=True)
+            )
+            if not emotion_ids:
+                self.stdout.write(
+                    self.style.ERROR(f'감정 "{options["emotion"]}"을 찾을 수 없습니다.')
+                )
+                return
+
+        count = rebuild_scores(emotion_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'추천 점수 재계산 완료: 감정 {count}개, '
+                f'점수 {CharacterEmotionScore.objects.count()}건'
+            )
+        )
@@ -0,0 +1,28 @@
+# characters/management/commands/rebuild_search_index.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from characters.search import backend_for, rebuild
+
+
+class Command(BaseCommand):
+    help = '캐릭터 전문 검색 색인(characters_search)을 처음부터 다시 만듭니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='한 번에 색인할 캐릭터 수')
+
+    def handle(self, *args, **options):
+        if backend_for() is None:
+            self.stdout.write(self.style.WARNING(
+                f'{connection.vendor} 는 전문 검색 색인을 지원하지 않습니다 (icontains 검색 사용).'
+            ))
+            return
+
+        t0 = time.perf_counter()
+        count = rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f'캐릭터 {count}명 색인 완료 ({elapsed:.2f}초)'
+        ))
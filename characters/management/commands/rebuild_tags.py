@@ -0,0 +1,15 @@
+# characters/management/commands/rebuild_tags.py
+from django.core.management.base import BaseCommand
+
+from characters.tagging import rebuild_tag_links
+
+
+class Command(BaseCommand):
+    help = '모든 캐릭터의 tags 입력으로 정규화 태그 연결과 태그별 사용 수를 다시 계산합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='한 번에 처리할 캐릭터 수')
+
+    def handle(self, *args, **options):
+        count = rebuild_tag_links(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'캐릭터 {count}명의 태그를 다시 연결했습니다.'))
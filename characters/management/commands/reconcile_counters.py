@@ -0,0 +1,95 @@
+# characters/management/commands/reconcile_counters.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from characters.models import Character, CharacterRating, Conversation, Message
+
+
+def _aggregate_subquery(queryset, group_field, aggregate):
+    """OuterRef('pk') 로 묶은 집계 서브쿼리 (행이 없으면 0)"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{group_field: OuterRef('pk')})
+            .order_by()
+            .values(group_field)
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Message/CharacterRating 기준으로 대화/캐릭터 통계 카운터를 다시 계산합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='수정하지 않고 어긋난 행 수만 출력합니다',
+        )
+        parser.add_argument(
+            '--workers-drained',
+            action='store_true',
+            help='COUNTER_BUFFERING 사용 시, 웹 워커를 멈춰 버퍼를 모두 반영했음을 확인합니다',
+        )
+
+    def handle(self, *args, **options):
+        # 버퍼 모드에서는 웹 워커마다 아직 반영하지 않은 증가분을 들고 있다 (이 프로세스의 버퍼는 비어 있음).
+        # 그 상태로 재계산하면 나중에 워커가 반영하는 증가분이 재계산 결과에 더해져 과다 집계되므로
+        # 워커를 멈춰(종료 시 남은 증가분 반영) 버퍼를 비운 뒤에만 실행한다
+        if (getattr(settings, 'COUNTER_BUFFERING', False)
+                and not options['dry_run'] and not options['workers_drained']):
+            raise CommandError(
+                'COUNTER_BUFFERING 이 켜져 있습니다. 웹 워커를 멈춰 버퍼를 비운 뒤 '
+                '--workers-drained 를 붙여 다시 실행하세요.'
+            )
+
+        # 대화별 메시지 수
+        message_count = _aggregate_subquery(Message.objects.all(), 'conversation', Count('pk'))
+        # 캐릭터별 사용자 메시지 수 (메시지 저장 시 증가 규칙과 동일)
+        user_message_count = _aggregate_subquery(
+            Message.objects.filter(sender='user'), 'conversation__character', Count('pk')
+        )
+        # 캐릭터별 평점 합계/개수
+        rating_sum = _aggregate_subquery(CharacterRating.objects.all(), 'character', Sum('rating'))
+        rating_count = _aggregate_subquery(CharacterRating.objects.all(), 'character', Count('pk'))
+
+        stale_conversations = Conversation.objects.filter(~Q(message_count=message_count))
+        stale_conversation_counts = Character.objects.filter(
+            ~Q(total_conversations=user_message_count)
+        )
+        stale_ratings = Character.objects.filter(
+            ~Q(rating_sum=rating_sum) | ~Q(rating_count=rating_count)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'어긋난 대화 메시지 수: {stale_conversations.count()}개, '
+                f'어긋난 캐릭터 대화 수: {stale_conversation_counts.count()}개, '
+                f'어긋난 캐릭터 평점: {stale_ratings.count()}개'
+            )
+            return
+
+        with transaction.atomic():
+            conversations_fixed = Conversation.objects.filter(
+                pk__in=stale_conversations.values('pk')
+            ).update(message_count=message_count)
+            conversation_counts_fixed = Character.objects.filter(
+                pk__in=stale_conversation_counts.values('pk')
+            ).update(total_conversations=user_message_count)
+            ratings_fixed = Character.objects.filter(
+                pk__in=stale_ratings.values('pk')
+            ).update(rating_sum=rating_sum, rating_count=rating_count)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'카운터 재계산 완료: 대화 메시지 수 {conversations_fixed}개, '
+                f'캐릭터 대화 수 {conversation_counts_fixed}개, '
+                f'캐릭터 평점 {ratings_fixed}개 수정'
+            )
+        )
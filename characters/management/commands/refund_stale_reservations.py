@@ -0,0 +1,32 @@
+# characters/management/commands/refund_stale_reservations.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from characters import credits
+
+
+class Command(BaseCommand):
+    help = '확정/환불되지 않은 채 오래된 크레딧 예약을 환불합니다 (워커 종료/타임아웃으로 남은 예약, 주기 실행용)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            default=getattr(settings, 'CREDIT_RESERVATION_TIMEOUT_MINUTES', 15),
+            help='이 시간(분)보다 오래된 예약만 환불합니다',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='환불하지 않고 대상 예약 수만 출력합니다',
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(minutes=options['minutes'])
+        count = credits.refund_stale_reservations(older_than, dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{options["minutes"]}분 넘게 정산되지 않은 예약: {count}건')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'미정산 예약 {count}건을 환불했습니다.'))
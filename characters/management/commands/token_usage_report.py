@@ -0,0 +1,60 @@
+# characters/management/commands/token_usage_report.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from characters.models import Character, TokenUsageDaily
+from characters.services import gemini_service
+from characters.token_usage import persona_tokens
+
+
+class Command(BaseCommand):
+    help = '기간별 캐릭터 토큰 사용량과 페르소나 추정 토큰을 출력합니다 (턴당 입력 토큰이 큰 순)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='집계 기간 (오늘 포함 일 수)')
+        parser.add_argument('--top', type=int, default=20, help='출력할 상위 캐릭터 수')
+
+    def handle(self, *args, **options):
+        since = timezone.localdate() - timedelta(days=max(1, options['days']) - 1)
+        rows = list(
+            TokenUsageDaily.objects.filter(date__gte=since)
+            .values('character')
+            .annotate(
+                turns=Sum('turns'),
+                input_tokens=Sum('input_tokens'),
+                output_tokens=Sum('output_tokens'),
+                cached_tokens=Sum('cached_tokens'),
+            )
+        )
+        if not rows:
+            self.stdout.write(f'{since} 이후 기록된 토큰 사용량이 없습니다.')
+            return
+
+        characters = Character.objects.select_related('genre').in_bulk([r['character'] for r in rows])
+        for row in rows:
+            row['avg_input'] = row['input_tokens'] / row['turns'] if row['turns'] else 0
+        rows.sort(key=lambda r: r['avg_input'], reverse=True)
+
+        total_in = sum(r['input_tokens'] for r in rows)
+        total_out = sum(r['output_tokens'] for r in rows)
+        total_turns = sum(r['turns'] for r in rows)
+        self.stdout.write(
+            f'{since} ~ 오늘: 생성 {total_turns}회, 입력 {total_in} / 출력 {total_out} 토큰'
+        )
+        self.stdout.write(
+            f'{"캐릭터":<20} {"턴":>6} {"턴당 입력":>9} {"턴당 출력":>9} {"캐시율":>6} {"페르소나":>8}'
+        )
+        for row in rows[:options['top']]:
+            character = characters.get(row['character'])
+            if character is None:
+                continue
+            turns = row['turns'] or 1
+            cached_ratio = row['cached_tokens'] / row['input_tokens'] if row['input_tokens'] else 0
+            persona = persona_tokens(gemini_service.build_persona_prompt(character))
+            self.stdout.write(
+                f'{character.name[:20]:<20} {row["turns"]:>6} {row["avg_input"]:>9.0f} '
+                f'{row["output_tokens"] / turns:>9.0f} {cached_ratio:>6.0%} {persona:>8}'
+            )
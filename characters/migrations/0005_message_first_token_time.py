@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0004_alter_usercredit_free_credits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='first_token_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='첫 토큰 시간(초)'),
+        ),
+    ]
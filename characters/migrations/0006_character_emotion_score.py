@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_scores(apps, schema_editor):
+    from characters.recommendations import TEXT_FIELDS, character_text, keyword_match_score
+
+    Character = apps.get_model('characters', 'Character')
+    EmotionKeyword = apps.get_model('emotions', 'EmotionKeyword')
+    CharacterEmotionScore = apps.get_model('characters', 'CharacterEmotionScore')
+
+    keywords = {}
+    for emotion_id, keyword, weight in EmotionKeyword.objects.values_list('emotion_id', 'keyword', 'weight'):
+        keywords.setdefault(emotion_id, []).append((keyword, weight))
+    if not keywords:
+        return
+
+    batch = []
+    for pk, *values in Character.objects.values_list('pk', *TEXT_FIELDS).iterator():
+        text = character_text(values)
+        for emotion_id, emotion_keywords in keywords.items():
+            batch.append(CharacterEmotionScore(
+                emotion_id=emotion_id,
+                character_id=pk,
+                keyword_score=keyword_match_score(text, emotion_keywords),
+            ))
+        if len(batch) >= 1000:
+            CharacterEmotionScore.objects.bulk_create(batch)
+            batch = []
+    CharacterEmotionScore.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0005_message_first_token_time'),
+        ('emotions', '0002_emotionkeyword'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacterEmotionScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword_score', models.FloatField(default=0.0, verbose_name='키워드 매칭 점수')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='계산일')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emotion_scores', to='characters.character', verbose_name='캐릭터')),
+                ('emotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='character_scores', to='emotions.emotion', verbose_name='감정')),
+            ],
+            options={
+                'verbose_name': '캐릭터 감정 점수',
+                'verbose_name_plural': '캐릭터 감정 점수들',
+                'indexes': [models.Index(fields=['emotion', '-keyword_score'], name='char_emotion_score_idx')],
+                'unique_together': {('emotion', 'character')},
+            },
+        ),
+        migrations.RunPython(populate_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """기존 잔액을 원장 첫 항목(지급)으로 이월"""
+    UserCredit = apps.get_model('characters', 'UserCredit')
+    CreditLedgerEntry = apps.get_model('characters', 'CreditLedgerEntry')
+    CreditLedgerEntry.objects.bulk_create(
+        [
+            CreditLedgerEntry(user_id=user_id, kind='grant', amount=free_credits, memo='기존 잔액 이월')
+            for user_id, free_credits in UserCredit.objects.values_list('user_id', 'free_credits').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0006_character_emotion_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('grant', '지급'), ('reserve', '예약'), ('debit', '차감'), ('refund', '환불')], max_length=10, verbose_name='구분')),
+                ('amount', models.IntegerField(verbose_name='변동량')),
+                ('memo', models.CharField(blank=True, max_length=100, verbose_name='메모')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='일시')),
+                ('conversation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='characters.conversation', verbose_name='대화')),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='settlements', to='characters.creditledgerentry', verbose_name='예약')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_entries', to=settings.AUTH_USER_MODEL, verbose_name='사용자')),
+            ],
+            options={
+                'verbose_name': '크레딧 원장',
+                'verbose_name_plural': '크레딧 원장',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='credit_ledger_user_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reservation__isnull', False)), fields=('reservation',), name='credit_ledger_single_settlement')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
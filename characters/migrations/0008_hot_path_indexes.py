@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0007_credit_ledger'),
+        ('emotions', '0003_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(condition=models.Q(('status', 'active'), ('visibility', 'public')), fields=['-total_conversations', '-created_at'], name='char_public_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(condition=models.Q(('status', 'active'), ('visibility', 'public')), fields=['genre', '-total_conversations', '-created_at'], name='char_public_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['user', 'character', '-updated_at'], name='conv_active_user_char_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conv_time_idx'),
+        ),
+    ]
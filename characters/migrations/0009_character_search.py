@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:30
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from characters.search import INDEXED_FIELDS, backend_for, index_rows
+
+    backend = backend_for(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        backend.create(cursor)
+
+    Character = apps.get_model('characters', 'Character')
+    batch = []
+    for row in Character.objects.order_by().values_list('pk', *INDEXED_FIELDS).iterator():
+        batch.append(row)
+        if len(batch) >= 1000:
+            index_rows(batch, connection=schema_editor.connection)
+            batch = []
+    index_rows(batch, connection=schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from characters.search import backend_for
+
+    backend = backend_for(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        backend.drop(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
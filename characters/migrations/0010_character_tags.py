@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:32
+
+from django.db import migrations, models
+
+
+def populate_tag_links(apps, schema_editor):
+    from characters.text import parse_tags
+
+    Character = apps.get_model('characters', 'Character')
+    Tag = apps.get_model('characters', 'Tag')
+    CharacterTag = Character.tag_links.through
+
+    parsed = [(pk, parse_tags(raw)) for pk, raw in Character.objects.values_list('pk', 'tags').iterator()]
+    usage = {}
+    for _, names in parsed:
+        for name in names:
+            usage[name] = usage.get(name, 0) + 1
+    if not usage:
+        return
+
+    Tag.objects.bulk_create(
+        [Tag(name=name, usage_count=count) for name, count in usage.items()], batch_size=1000
+    )
+    tag_ids = dict(Tag.objects.values_list('name', 'pk'))
+    CharacterTag.objects.bulk_create(
+        [CharacterTag(character_id=pk, tag_id=tag_ids[name]) for pk, names in parsed for name in names],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0009_character_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='태그')),
+                ('usage_count', models.PositiveIntegerField(default=0, verbose_name='사용 캐릭터 수')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='생성일')),
+            ],
+            options={
+                'verbose_name': '태그',
+                'verbose_name_plural': '태그들',
+                'ordering': ['-usage_count', 'name'],
+                'indexes': [models.Index(fields=['-usage_count', 'name'], name='tag_popular_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='tag_links',
+            field=models.ManyToManyField(blank=True, related_name='characters', to='characters.tag', verbose_name='태그 목록'),
+        ),
+        migrations.RunPython(populate_tag_links, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0010_character_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, verbose_name='대화 요약'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_last_message_id',
+            field=models.BigIntegerField(default=0, verbose_name='요약된 마지막 메시지 ID'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='요약 갱신일'),
+        ),
+    ]
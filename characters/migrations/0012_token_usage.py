@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0011_conversation_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='cached_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='캐시 토큰'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='input_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='입력 토큰'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='output_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='출력 토큰'),
+        ),
+        migrations.CreateModel(
+            name='TokenUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='일자')),
+                ('turns', models.PositiveIntegerField(default=0, verbose_name='생성 횟수')),
+                ('input_tokens', models.PositiveBigIntegerField(default=0, verbose_name='입력 토큰')),
+                ('output_tokens', models.PositiveBigIntegerField(default=0, verbose_name='출력 토큰')),
+                ('cached_tokens', models.PositiveBigIntegerField(default=0, verbose_name='캐시 토큰')),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_usage', to='characters.character', verbose_name='캐릭터')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_usage', to=settings.AUTH_USER_MODEL, verbose_name='사용자')),
+            ],
+            options={
+                'verbose_name': '일별 토큰 사용량',
+                'verbose_name_plural': '일별 토큰 사용량',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['character', 'date'], name='token_usage_char_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'user', 'character'), name='token_usage_daily_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0012_token_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='idempotency_key',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='멱등 키'),
+        ),
+        migrations.AddConstraint(
+            model_name='message',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key', ''), _negated=True), fields=('conversation', 'idempotency_key'), name='message_idempotency_unique'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+"""
+캐릭터별 생성 모델 캐시
+
+페르소나(이름/장르/성격/배경/말투/지침)는 캐릭터가 수정되기 전까지 변하지 않으므로
+캐릭터 버전당 한 번만 모델 객체를 만들어 LRU로 재사용한다.
+대화 히스토리는 system_instruction 에 넣지 않고 chat turn 으로 전달한다.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from django.conf import settings
+
+
+def persona_version(character) -> str:
+    """페르소나를 구성하는 필드로부터 버전 문자열 계산 (통계 필드 변경에는 영향 없음)"""
+    source = "\x1f".join([
+        character.name or "",
+        str(character.genre_id or ""),
+        character.personality or "",
+        character.background_story or "",
+        character.speaking_style or "",
+    ])
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+class CharacterModelCache:
+    """character_id -> (persona 버전, 모델 객체) 의 스레드 안전한 LRU"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, character, factory: Callable[[], Any]) -> Any:
+        version = persona_version(character)
+        with self._lock:
+            entry = self._entries.get(character.pk)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(character.pk)
+                return entry[1]
+
+        # 모델 생성은 락 밖에서 (동시에 만들어져도 마지막 것이 남을 뿐 문제 없음)
+        value = factory()
+        with self._lock:
+            self._entries[character.pk] = (version, value)
+            self._entries.move_to_end(character.pk)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, character_id: int):
+        with self._lock:
+            self._entries.pop(character_id, None)
+
+    def invalidate_stale(self, character):
+        """저장된 버전이 현재 페르소나와 다를 때만 제거"""
+        version = persona_version(character)
+        with self._lock:
+            entry = self._entries.get(character.pk)
+            if entry is not None and entry[0] != version:
+                del self._entries[character.pk]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+character_model_cache = CharacterModelCache(
+    maxsize=getattr(settings, "GEMINI_MODEL_CACHE_SIZE", 128)
+)
@@ -3,7 +3,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from emotions.models import Genre
+from emotions.models import Genre, EmotionKeyword
 import uuid
 import os
 
@@ -15,6 +15,24 @@ def character_image_path(instance, filename):
     return f'character_images/{instance.creator.id}/{filename}'
 
 
+class Tag(models.Model):
+    """정규화된 캐릭터 태그 (text.normalize_tag 기준으로 하나씩)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="태그")
+    usage_count = models.PositiveIntegerField(default=0, verbose_name="사용 캐릭터 수")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="생성일")
+
+    class Meta:
+        verbose_name = "태그"
+        verbose_name_plural = "태그들"
+        ordering = ['-usage_count', 'name']
+        indexes = [
+            models.Index(fields=['-usage_count', 'name'], name='tag_popular_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.name} ({self.usage_count})"
+
+
 class Character(models.Model):
     """AI 캐릭터 모델"""
     
@@ -42,6 +60,10 @@ class Character(models.Model):
     # 장르 및 태그
     genre = models.ForeignKey(Genre, on_delete=models.CASCADE, verbose_name="장르")
     tags = models.CharField(max_length=200, verbose_name="태그들", help_text="쉼표로 구분")
+    # tags 입력을 정규화해 연결한 태그 (태그 필터/집계용, 저장 시그널로 동기화)
+    tag_links = models.ManyToManyField(
+        Tag, blank=True, related_name='characters', verbose_name="태그 목록"
+    )
     
     # 이미지
     character_image = models.ImageField(
@@ -78,6 +100,19 @@ class Character(models.Model):
         verbose_name = "캐릭터"
         verbose_name_plural = "캐릭터들"
         ordering = ['-created_at']
+        indexes = [
+            # 공개 캐릭터 목록 (인기순, 장르 필터)
+            models.Index(
+                fields=['-total_conversations', '-created_at'],
+                condition=models.Q(status='active', visibility='public'),
+                name='char_public_popular_idx',
+            ),
+            models.Index(
+                fields=['genre', '-total_conversations', '-created_at'],
+                condition=models.Q(status='active', visibility='public'),
+                name='char_public_genre_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} (by {self.creator.username})"
@@ -93,6 +128,21 @@ class Character(models.Model):
         """태그 리스트 반환"""
         return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 추천 점수 재계산 여부 판단용 (키워드 매칭 대상 텍스트 스냅샷)
+        instance._loaded_text = instance.text_snapshot()
+        # 태그 동기화 여부 판단용
+        instance._loaded_tags = instance.__dict__.get('tags')
+        return instance
+
+    def text_snapshot(self):
+        """키워드 매칭 대상 텍스트 필드 값 (deferred 필드는 None)"""
+        from .recommendations import TEXT_FIELDS
+        loaded = self.__dict__
+        return tuple(loaded.get(field) for field in TEXT_FIELDS)
+
 
 class Conversation(models.Model):
     """대화 세션 모델"""
@@ -117,6 +167,11 @@ class Conversation(models.Model):
     
     # 통계
     message_count = models.IntegerField(default=0, verbose_name="메시지 수")
+
+    # 롤링 요약: summary_last_message_id 까지의 메시지를 접어 둔 요약 (summaries.py)
+    summary = models.TextField(blank=True, verbose_name="대화 요약")
+    summary_last_message_id = models.BigIntegerField(default=0, verbose_name="요약된 마지막 메시지 ID")
+    summary_updated_at = models.DateTimeField(null=True, blank=True, verbose_name="요약 갱신일")
     
     # 시간 정보
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="시작일")
@@ -127,18 +182,39 @@ class Conversation(models.Model):
         verbose_name = "대화"
         verbose_name_plural = "대화들"
         ordering = ['-updated_at']
+        indexes = [
+            # 사용자-캐릭터의 진행 중인 대화 찾기
+            models.Index(
+                fields=['user', 'character', '-updated_at'],
+                condition=models.Q(status='active'),
+                name='conv_active_user_char_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username}님과 {self.character.name}의 대화"
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 장르 선호도 캐시 무효화 여부 판단용
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    @staticmethod
+    def title_from(message: str) -> str:
+        """첫 사용자 메시지로 만드는 대화 제목"""
+        content = message[:30]
+        return f"{content}..." if len(message) > 30 else content
+
     def auto_generate_title(self):
         """첫 메시지를 기반으로 제목 자동 생성"""
         if not self.title:
             first_message = self.messages.filter(sender='user').first()
             if first_message:
-                content = first_message.content[:30]
-                self.title = f"{content}..." if len(first_message.content) > 30 else content
-                self.save()
+                self.title = self.title_from(first_message.content)
+                # 카운터 컬럼을 덮어쓰지 않도록 제목만 저장
+                self.save(update_fields=['title', 'updated_at'])
 
 
 class Message(models.Model):
@@ -162,6 +238,13 @@ class Message(models.Model):
     # AI 관련 메타데이터 (선택사항)
     ai_model_used = models.CharField(max_length=50, blank=True, verbose_name="사용된 AI 모델")
     generation_time = models.FloatField(null=True, blank=True, verbose_name="생성 시간(초)")
+    first_token_time = models.FloatField(null=True, blank=True, verbose_name="첫 토큰 시간(초)")
+    # 이 응답을 만든 호출의 토큰 수 (입력은 캐시 토큰 포함)
+    input_tokens = models.PositiveIntegerField(null=True, blank=True, verbose_name="입력 토큰")
+    output_tokens = models.PositiveIntegerField(null=True, blank=True, verbose_name="출력 토큰")
+    cached_tokens = models.PositiveIntegerField(null=True, blank=True, verbose_name="캐시 토큰")
+    # 클라이언트가 보낸 Idempotency-Key (사용자 메시지에만, 재전송 시 같은 턴이 두 번 저장되지 않게)
+    idempotency_key = models.CharField(max_length=64, blank=True, default='', verbose_name="멱등 키")
     
     # 시간 정보
     timestamp = models.DateTimeField(auto_now_add=True, verbose_name="전송 시간")
@@ -170,11 +253,59 @@ class Message(models.Model):
         verbose_name = "메시지"
         verbose_name_plural = "메시지들"
         ordering = ['timestamp']
+        indexes = [
+            # 대화 히스토리 (시간순/최근순)
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conv_time_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['conversation', 'idempotency_key'],
+                condition=~models.Q(idempotency_key=''),
+                name='message_idempotency_unique',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_sender_display()}: {self.content[:50]}..."
 
 
+class TokenUsageDaily(models.Model):
+    """사용자 x 캐릭터 x 일자별 LLM 토큰 사용량 (턴마다 upsert 로 누적, token_usage.py)"""
+
+    date = models.DateField(verbose_name="일자")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='token_usage',
+        verbose_name="사용자"
+    )
+    character = models.ForeignKey(
+        Character,
+        on_delete=models.CASCADE,
+        related_name='token_usage',
+        verbose_name="캐릭터"
+    )
+    turns = models.PositiveIntegerField(default=0, verbose_name="생성 횟수")
+    input_tokens = models.PositiveBigIntegerField(default=0, verbose_name="입력 토큰")
+    output_tokens = models.PositiveBigIntegerField(default=0, verbose_name="출력 토큰")
+    cached_tokens = models.PositiveBigIntegerField(default=0, verbose_name="캐시 토큰")
+
+    class Meta:
+        verbose_name = "일별 토큰 사용량"
+        verbose_name_plural = "일별 토큰 사용량"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'user', 'character'], name='token_usage_daily_unique'),
+        ]
+        indexes = [
+            # 캐릭터별 기간 집계
+            models.Index(fields=['character', 'date'], name='token_usage_char_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.user_id}/{self.character_id}: {self.input_tokens}+{self.output_tokens}"
+
+
 # 개발용 간단한 크레딧 시스템 (결제 시스템 없이)
 class UserCredit(models.Model):
     """사용자 크레딧 모델 (개발용 간소화 버전)"""
@@ -199,14 +330,82 @@ class UserCredit(models.Model):
         return self.free_credits
     
     def use_credits(self, amount):
-        """크레딧 사용"""
-        if self.free_credits >= amount:
+        """크레딧 사용 (잔액 조건부 UPDATE, 원장 기록)"""
+        from .credits import debit
+        if debit(self.user_id, amount):
+            self.free_credits -= amount
+            return True
+        return False
+
+    async def ause_credits(self, amount):
+        """크레딧 사용 (async)"""
+        from .credits import adebit
+        if await adebit(self.user_id, amount):
             self.free_credits -= amount
-            self.save()
             return True
         return False
 
 
+class CreditLedgerEntry(models.Model):
+    """
+    크레딧 원장 (추가 전용)
+    amount 는 free_credits 변화량: 지급 +n, 예약 -n, 예약 확정 0, 예약 환불 +n, 즉시 차감 -n
+    """
+
+    KIND_CHOICES = [
+        ('grant', '지급'),
+        ('reserve', '예약'),
+        ('debit', '차감'),
+        ('refund', '환불'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='credit_entries',
+        verbose_name="사용자"
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="구분")
+    amount = models.IntegerField(verbose_name="변동량")
+    # 확정/환불 항목이 가리키는 예약 (예약 하나당 정산은 한 번만)
+    reservation = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='settlements',
+        verbose_name="예약"
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="대화"
+    )
+    memo = models.CharField(max_length=100, blank=True, verbose_name="메모")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="일시")
+
+    class Meta:
+        verbose_name = "크레딧 원장"
+        verbose_name_plural = "크레딧 원장"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='credit_ledger_user_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reservation'],
+                condition=models.Q(reservation__isnull=False),
+                name='credit_ledger_single_settlement',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.get_kind_display()} {self.amount:+d}"
+
+
 class CharacterRating(models.Model):
     """캐릭터 평점 모델"""
     
@@ -230,37 +429,198 @@ class CharacterRating(models.Model):
     def __str__(self):
         return f"{self.character.name}: {self.rating}점 ({self.user.username})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 평점 증분 계산용 (저장 시점의 DB 값)
+        loaded = instance.__dict__
+        instance._loaded_rating = (loaded.get('character_id'), loaded.get('rating'))
+        return instance
+
+
+class CharacterEmotionScore(models.Model):
+    """감정별 캐릭터 키워드 매칭 점수 (추천 정렬용 사전 계산 테이블)"""
+
+    emotion = models.ForeignKey(
+        'emotions.Emotion',
+        on_delete=models.CASCADE,
+        related_name='character_scores',
+        verbose_name="감정"
+    )
+    character = models.ForeignKey(
+        Character,
+        on_delete=models.CASCADE,
+        related_name='emotion_scores',
+        verbose_name="캐릭터"
+    )
+    keyword_score = models.FloatField(default=0.0, verbose_name="키워드 매칭 점수")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="계산일")
+
+    class Meta:
+        verbose_name = "캐릭터 감정 점수"
+        verbose_name_plural = "캐릭터 감정 점수들"
+        unique_together = ['emotion', 'character']
+        indexes = [
+            models.Index(fields=['emotion', '-keyword_score'], name='char_emotion_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id} / {self.emotion_id}: {self.keyword_score:.2f}"
+
 
 # Signal을 통한 자동 생성
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
 def create_user_credit(sender, instance, created, **kwargs):
     """사용자 생성 시 크레딧 객체 자동 생성"""
     if created:
-        UserCredit.objects.create(user=instance)
+        credit = UserCredit.objects.create(user=instance)
+        CreditLedgerEntry.objects.create(
+            user=instance, kind='grant', amount=credit.free_credits, memo='가입 지급'
+        )
+
+@receiver(post_save, sender=UserCredit)
+def refresh_credit_balance(sender, instance, **kwargs):
+    """관리자 화면 등에서 잔액을 직접 수정하면 캐시된 잔액 무효화"""
+    from .credits import invalidate_balance
+    invalidate_balance(instance.user_id)
 
 @receiver(post_save, sender=CharacterRating)
-def update_character_rating(sender, instance, **kwargs):
-    """평점 저장 시 캐릭터의 평균 평점 업데이트"""
-    character = instance.character
-    ratings = CharacterRating.objects.filter(character=character)
-    
-    character.rating_sum = sum(rating.rating for rating in ratings)
-    character.rating_count = ratings.count()
-    character.save()
+def update_character_rating(sender, instance, created, **kwargs):
+    """평점 저장 시 이전 값과의 차이만큼 캐릭터 평점 합계/개수를 원자적으로 반영"""
+    from .counters import apply_rating_delta
+    old_character_id, old_rating = getattr(instance, '_loaded_rating', (None, None))
+
+    if created or old_character_id is None:
+        apply_rating_delta(instance, instance.character_id, instance.rating, 1)
+    elif old_character_id != instance.character_id:
+        apply_rating_delta(instance, old_character_id, -old_rating, -1)
+        apply_rating_delta(instance, instance.character_id, instance.rating, 1)
+    else:
+        apply_rating_delta(instance, instance.character_id, instance.rating - old_rating, 0)
+
+    instance._loaded_rating = (instance.character_id, instance.rating)
+
+
+@receiver(post_delete, sender=CharacterRating)
+def remove_character_rating(sender, instance, **kwargs):
+    """평점 삭제 시 캐릭터 평점 합계/개수 차감"""
+    from .counters import apply_rating_delta
+    character_id, rating = getattr(
+        instance, '_loaded_rating', (instance.character_id, instance.rating)
+    )
+    apply_rating_delta(instance, character_id, -rating, -1)
 
 @receiver(post_save, sender=Message)
 def update_conversation_stats(sender, instance, created, **kwargs):
-    """메시지 생성 시 대화 통계 업데이트"""
+    """메시지 생성 시 대화/캐릭터 통계를 원자적으로 증가"""
     if created:
-        conversation = instance.conversation
-        conversation.message_count += 1
-        conversation.save()
-        
-        # 캐릭터 대화 수 업데이트
-        if instance.sender == 'user':
-            conversation.character.total_conversations += 1
-            conversation.character.save()
+        from .counters import record_message
+        record_message(instance)
+
+
+@receiver(post_save, sender=Character)
+def rescore_character_emotions(sender, instance, created, **kwargs):
+    """캐릭터 텍스트가 바뀐 경우에만 감정 키워드 점수 재계산 (통계 갱신 저장은 무시)"""
+    from .recommendations import TEXT_FIELDS, rescore_character
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(TEXT_FIELDS):
+        return
+    if not created and instance.text_snapshot() == getattr(instance, '_loaded_text', None):
+        return
+    rescore_character(instance)
+    instance._loaded_text = instance.text_snapshot()
+
+
+@receiver(post_save, sender=Character)
+def sync_character_tag_links(sender, instance, created, **kwargs):
+    """태그 입력이 바뀐 경우에만 정규화 태그 연결/사용 수 갱신"""
+    from .tagging import sync_character_tags
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    if not created and instance.tags == getattr(instance, '_loaded_tags', None):
+        return
+    sync_character_tags(instance)
+    instance._loaded_tags = instance.tags
+
+
+@receiver(pre_delete, sender=Character)
+def release_character_tags(sender, instance, **kwargs):
+    """캐릭터 삭제 전 연결된 태그의 사용 수 감소 (연결 행은 CASCADE 로 삭제됨)"""
+    from .tagging import release_tags
+    release_tags(instance)
+
+
+@receiver(post_save, sender=Character)
+def index_character_search(sender, instance, **kwargs):
+    """이름/태그/설명이 저장되면 검색 색인 갱신 (통계 갱신 저장은 무시)"""
+    from .search import INDEXED_FIELDS, index_character
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    index_character(instance)
+
+
+@receiver(post_save, sender=Character)
+def invalidate_character_model(sender, instance, **kwargs):
+    """캐릭터 설정이 바뀌면 캐시된 생성 모델/컨텍스트 캐시 제거 (통계 갱신 저장은 무시)"""
+    from .model_cache import character_model_cache
+    from .context_cache import persona_context_cache
+    character_model_cache.invalidate_stale(instance)
+    if persona_context_cache is not None:
+        persona_context_cache.invalidate_stale(instance)
+
+
+@receiver(post_delete, sender=Character)
+def unindex_character_search(sender, instance, **kwargs):
+    """캐릭터 삭제 시 검색 색인에서 제거"""
+    from .search import remove_character
+    remove_character(instance.pk)
+
+
+@receiver(post_delete, sender=Character)
+def drop_character_model(sender, instance, **kwargs):
+    """캐릭터 삭제 시 캐시된 생성 모델/컨텍스트 캐시 제거"""
+    from .model_cache import character_model_cache
+    from .context_cache import persona_context_cache
+    character_model_cache.invalidate(instance.pk)
+    if persona_context_cache is not None:
+        persona_context_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Genre)
+def clear_character_models(sender, instance, created, **kwargs):
+    """장르명은 페르소나에 포함되므로 장르 수정 시 전체 모델 캐시 비움"""
+    if not created:
+        from .model_cache import character_model_cache
+        from .context_cache import persona_context_cache
+        character_model_cache.clear()
+        if persona_context_cache is not None:
+            persona_context_cache.clear()
+
+
+@receiver(post_save, sender=EmotionKeyword)
+@receiver(post_delete, sender=EmotionKeyword)
+def rescore_emotion_characters(sender, instance, **kwargs):
+    """감정 키워드 추가/수정/삭제 시 해당 감정의 캐릭터 점수 재계산 (커밋 후 감정별 한 번)"""
+    from .recommendations import schedule_rescore
+    schedule_rescore(instance.emotion_id)
+
+
+@receiver(post_save, sender=Conversation)
+def invalidate_user_preferences(sender, instance, created, **kwargs):
+    """새 대화가 생기거나 대화 상태가 바뀌면 사용자 장르 선호도 캐시 무효화"""
+    if created or instance.status != getattr(instance, '_loaded_status', None):
+        from .preferences import invalidate_genre_affinity
+        invalidate_genre_affinity(instance.user_id)
+        instance._loaded_status = instance.status
+
 
+@receiver(post_delete, sender=Conversation)
+def drop_user_preferences(sender, instance, **kwargs):
+    from .preferences import invalidate_genre_affinity
+    invalidate_genre_affinity(instance.user_id)
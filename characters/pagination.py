@@ -0,0 +1,176 @@
+"""
+키셋(커서) 페이지네이션
+
+OFFSET 대신 "마지막으로 본 행의 정렬 키 이후"를 WHERE 조건으로 조회한다.
+깊은 페이지도 인덱스 범위 스캔 한 번이면 되고, 전체 개수(COUNT(*)) 쿼리가 필요 없다.
+
+- ordering 은 마지막 키가 유일해야 한다 (예: ('-total_conversations', '-created_at', '-id'))
+- 커서는 기준 행의 정렬 키 값 + 방향(next/prev)을 JSON -> urlsafe base64 로 만든 문자열
+- 잘못된 커서는 첫 페이지로 취급 (Paginator.get_page 와 같은 관대한 동작)
+- null 허용 필드는 NULL 을 가장 작은 값으로 정렬한다 (DB 마다 다른 NULL 위치를 명시적으로 고정)
+"""
+import base64
+import datetime
+import decimal
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+
+CURSOR_PARAM = 'cursor'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    # DjangoJSONEncoder 는 마이크로초를 잘라내므로 동등 비교가 깨짐 -> isoformat 그대로
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'커서에 넣을 수 없는 값: {value!r}')
+
+
+def encode_cursor(values: Sequence[Any], direction: str) -> str:
+    payload = json.dumps({'v': list(values), 'd': direction}, default=_json_default,
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[List[Any], str]:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+@dataclass
+class KeysetPage:
+    """한 페이지 (템플릿에서 page_obj 처럼 사용)"""
+
+    object_list: List[Any]
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """정렬 키 기반 페이지네이터"""
+
+    def __init__(self, queryset, ordering: Sequence[str], per_page: int):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.keys = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def _model_field(self, name: str):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _to_python(self, name: str, value):
+        """JSON 으로 왕복한 값을 모델 필드 타입으로 (annotation 은 그대로)"""
+        model_field = self._model_field(name)
+        if model_field is None or value is None:
+            return value
+        try:
+            return model_field.to_python(value)
+        except ValidationError:
+            raise InvalidCursor(value)
+
+    def _nullable(self, name: str) -> bool:
+        model_field = self._model_field(name)
+        return model_field is not None and model_field.null
+
+    def _order_by(self, forward: bool) -> list:
+        order = []
+        for name, desc in zip(self.keys, self.descending):
+            if forward != desc:
+                order.append(F(name).asc(nulls_first=True) if self._nullable(name) else name)
+            else:
+                order.append(F(name).desc(nulls_last=True) if self._nullable(name) else f'-{name}')
+        return order
+
+    def _compare(self, name: str, op: str, value) -> Q:
+        """정렬 순서상 value 보다 작은(lt)/큰(gt) 행 조건 (NULL 은 가장 작은 값)"""
+        if value is None:
+            # NULL 보다 작은 값은 없고, NULL 이 아닌 값은 모두 NULL 보다 큼
+            return Q(**{f'{name}__isnull': False}) if op == 'gt' else Q(pk__in=[])
+        condition = Q(**{f'{name}__{op}': value})
+        if op == 'lt' and self._nullable(name):
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def _beyond(self, values: Sequence[Any], forward: bool) -> Q:
+        """기준 행보다 정렬 순서상 뒤(forward) 또는 앞에 있는 행 조건"""
+        condition = Q()
+        equal = Q()
+        for name, desc, value in zip(self.keys, self.descending, values):
+            op = 'lt' if desc == forward else 'gt'
+            condition |= equal & self._compare(name, op, value)
+            equal &= Q(**{f'{name}__isnull': True} if value is None else {name: value})
+        return condition
+
+    def _key(self, obj) -> List[Any]:
+        if isinstance(obj, dict):
+            return [obj[name] for name in self.keys]
+        return [getattr(obj, name) for name in self.keys]
+
+    def page(self, cursor: Optional[str] = None) -> KeysetPage:
+        values, direction = None, 'next'
+        if cursor:
+            try:
+                raw, direction = decode_cursor(cursor)
+                if len(raw) != len(self.keys):
+                    raise InvalidCursor(cursor)
+                values = [self._to_python(name, v) for name, v in zip(self.keys, raw)]
+            except InvalidCursor:
+                values, direction = None, 'next'
+
+        forward = direction == 'next'
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._beyond(values, forward))
+        qs = qs.order_by(*self._order_by(forward))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        has_next = has_more if forward else values is not None
+        has_previous = values is not None if forward else has_more
+        return KeysetPage(
+            object_list=rows,
+            next_cursor=encode_cursor(self._key(rows[-1]), 'next') if rows and has_next else None,
+            previous_cursor=encode_cursor(self._key(rows[0]), 'prev') if rows and has_previous else None,
+        )
@@ -0,0 +1,45 @@
+"""
+사용자 장르 선호도(affinity) 프로필 캐시
+
+사용자별 genre_id -> 선호도(활성 대화 중 해당 장르 비율) 벡터를 한 번 계산해
+Django 캐시에 USER_PREFERENCE_CACHE_TTL 동안 보관한다.
+대화가 새로 생기거나 상태가 바뀌거나 삭제되면 시그널로 즉시 무효화한다.
+감정별 장르 추천과 캐릭터 추천이 같은 프로필을 사용한다.
+"""
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from hungry_jackie.cache import get_or_compute
+
+from .recommendations import NO_HISTORY_PREFERENCE, user_genre_preferences
+
+CACHE_KEY = 'user_genre_affinity:{user_id}'
+
+
+def _cache_key(user_id: int) -> str:
+    return CACHE_KEY.format(user_id=user_id)
+
+
+def genre_affinity(user) -> Dict[int, float]:
+    """사용자의 장르 선호도 벡터 (대화 이력이 없으면 빈 dict, 비로그인도 빈 dict)"""
+    if not user.is_authenticated:
+        return {}
+    return get_or_compute(
+        _cache_key(user.pk),
+        lambda: user_genre_preferences(user),
+        getattr(settings, 'USER_PREFERENCE_CACHE_TTL', 600),
+    )
+
+
+def genre_preference(user, genre_id: int) -> float:
+    """특정 장르 선호도 (대화 이력이 없으면 중간값)"""
+    affinity = genre_affinity(user)
+    if not affinity:
+        return NO_HISTORY_PREFERENCE
+    return affinity.get(genre_id, 0.0)
+
+
+def invalidate_genre_affinity(user_id: int):
+    cache.delete(_cache_key(user_id))
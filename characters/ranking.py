@@ -0,0 +1,124 @@
+"""
+추천 점수 배치 계산 (NumPy)
+
+후보 캐릭터 전체의 특성 컬럼(키워드 점수, 평균 평점, 대화 수, 장르)을 한 번의 쿼리로
+배열에 올리고, 가중합과 상위 k 선택(argpartition)을 벡터 연산으로 처리한다.
+장르 전체를 한 번에 순위 매기거나 가중치를 바꿔 가며 오프라인 실험할 때 사용.
+(목록 페이지의 페이지네이션 정렬은 recommendations.rank_by_recommendation 이 DB에서 처리)
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .recommendations import (
+    NO_HISTORY_PREFERENCE,
+    average_rating_expression,
+    keyword_score_annotation,
+    max_total_conversations,
+    recommendation_weights,
+)
+
+
+@dataclass
+class CandidateFeatures:
+    """후보 캐릭터 특성 컬럼 (모든 배열은 같은 순서/길이)"""
+
+    ids: np.ndarray
+    genre_ids: np.ndarray
+    keyword: np.ndarray
+    rating: np.ndarray
+    conversations: np.ndarray
+    created: np.ndarray  # 동점 정렬용 (timestamp)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, characters_qs, emotion) -> 'CandidateFeatures':
+        """queryset 의 후보들을 한 번의 쿼리로 적재"""
+        rows = list(
+            keyword_score_annotation(characters_qs, emotion)
+            .annotate(average_rating_value=average_rating_expression())
+            .order_by()
+            .values_list(
+                'pk', 'genre_id', 'keyword_score', 'average_rating_value',
+                'total_conversations', 'created_at',
+            )
+        )
+        if not rows:
+            empty = np.empty(0)
+            return cls(empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty, empty)
+
+        ids, genre_ids, keyword, rating, conversations, created = zip(*rows)
+        return cls(
+            ids=np.fromiter(ids, dtype=np.int64, count=len(rows)),
+            genre_ids=np.fromiter(genre_ids, dtype=np.int64, count=len(rows)),
+            keyword=np.fromiter(keyword, dtype=np.float64, count=len(rows)),
+            rating=np.fromiter(rating, dtype=np.float64, count=len(rows)),
+            conversations=np.fromiter(conversations, dtype=np.float64, count=len(rows)),
+            created=np.fromiter((c.timestamp() for c in created), dtype=np.float64, count=len(rows)),
+        )
+
+
+class BatchScorer:
+    """가중치를 고정한 벡터화 추천 점수 계산기"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = recommendation_weights(weights)
+
+    def preference_column(self, features: CandidateFeatures,
+                          preferences: Optional[Dict[int, float]]) -> np.ndarray:
+        """genre_id -> 선호도 dict 를 후보별 배열로 (이력이 없으면 중간값, 비로그인은 0)"""
+        if preferences is None:
+            return np.zeros(len(features))
+        if not preferences:
+            return np.full(len(features), NO_HISTORY_PREFERENCE)
+        genres, inverse = np.unique(features.genre_ids, return_inverse=True)
+        per_genre = np.array([preferences.get(int(g), 0.0) for g in genres], dtype=np.float64)
+        return per_genre[inverse]
+
+    def score(self, features: CandidateFeatures,
+              preferences: Optional[Dict[int, float]] = None,
+              max_conversations: Optional[float] = None) -> np.ndarray:
+        """
+        후보별 추천 점수 배열.
+        preferences: user_genre_preferences() 결과 (None 이면 비로그인 취급)
+        max_conversations: 인기도 정규화 기준 (None 이면 전체 캐릭터 최대값 조회)
+        """
+        if max_conversations is None:
+            max_conversations = max_total_conversations()
+        w = self.weights
+        return (
+            features.keyword * w['keyword']
+            + self.preference_column(features, preferences) * w['preference']
+            + features.rating / 5.0 * w['rating']
+            + features.conversations / float(max_conversations or 1) * w['popularity']
+        )
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, created: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        점수 상위 k 개 인덱스 (내림차순). argpartition 으로 O(n) 선택 후 k 개만 정렬.
+        created 가 있으면 동점은 최신순.
+        """
+        n = len(scores)
+        if k <= 0 or n == 0:
+            return np.empty(0, dtype=np.int64)
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(n)
+        if created is None:
+            order = np.argsort(-scores[candidates], kind='stable')
+        else:
+            order = np.lexsort((-created[candidates], -scores[candidates]))
+        return candidates[order]
+
+    def rank(self, features: CandidateFeatures, k: int,
+             preferences: Optional[Dict[int, float]] = None,
+             max_conversations: Optional[float] = None) -> List[Tuple[int, float]]:
+        """상위 k 개의 (character_id, 점수)"""
+        scores = self.score(features, preferences, max_conversations)
+        top = self.top_k(scores, k, features.created)
+        return [(int(features.ids[i]), float(scores[i])) for i in top]
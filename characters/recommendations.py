@@ -0,0 +1,279 @@
+"""
+감정-장르 기반 캐릭터 추천 점수
+
+추천 점수 = 키워드 매칭 40% + 사용자 선호도 30% + 평점 20% + 인기도 10%
+(가중치는 settings.RECOMMENDATION_WEIGHTS 로 변경 가능)
+
+키워드 매칭 점수는 (감정, 캐릭터) 단위로 CharacterEmotionScore 테이블에 미리 계산해 두고
+캐릭터 텍스트나 감정 키워드가 바뀔 때만 갱신한다. 추천 정렬은 이 테이블을 조인한
+단일 쿼리(정렬 + LIMIT/OFFSET)로 처리한다.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FilteredRelation, FloatField, Max, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.utils import timezone
+
+from emotions.keyword_matcher import KeywordMatcher, emotion_matchers
+from hungry_jackie.cache import get_or_compute
+from emotions.models import EmotionKeyword
+
+from .text import normalize
+
+DEFAULT_WEIGHTS = {
+    'keyword': 0.4,
+    'preference': 0.3,
+    'rating': 0.2,
+    'popularity': 0.1,
+}
+
+# 키워드 매칭 대상 텍스트 필드
+TEXT_FIELDS = ('description', 'personality', 'background_story', 'speaking_style', 'tags')
+
+RESCORE_BATCH_SIZE = 1000
+
+# 대화 이력이 없는 사용자의 장르 선호도 (중간값)
+NO_HISTORY_PREFERENCE = 0.5
+
+
+def recommendation_weights(overrides: Optional[dict] = None) -> dict:
+    """기본 가중치 <- settings.RECOMMENDATION_WEIGHTS <- overrides 순으로 병합"""
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(getattr(settings, 'RECOMMENDATION_WEIGHTS', {}))
+    if overrides:
+        weights.update(overrides)
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"알 수 없는 추천 가중치: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def character_text(values: Sequence[Optional[str]]) -> str:
+    """TEXT_FIELDS 순서의 값들을 매칭용 정규화 텍스트로 결합"""
+    return normalize(' '.join(v or '' for v in values))
+
+
+def keyword_match_score(text: str, keywords: Iterable[Tuple[str, float]]) -> float:
+    """(키워드, 가중치) 목록에 대한 0-1 정규화 매칭 점수"""
+    return KeywordMatcher(keywords).score(text)
+
+
+def calculate_keyword_match_score(character, emotion) -> float:
+    """감정 키워드 매칭 점수 계산 (요청 시점 계산용, 캐시된 매처 사용)"""
+    text = character_text([getattr(character, f) for f in TEXT_FIELDS])
+    return emotion_matchers.get(emotion.pk).score(text)
+
+
+# -----------------------------
+# 점수 테이블 갱신
+# -----------------------------
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_rescoring():
+    """
+    블록 안에서 발생한 키워드 변경은 모아 두었다가 블록 종료 시 감정별로 한 번만 재계산.
+    (setup_emotion_keywords 처럼 키워드를 대량으로 저장할 때 사용)
+    """
+    outer = getattr(_deferred, 'emotion_ids', None)
+    if outer is not None:
+        yield
+        return
+
+    _deferred.emotion_ids = set()
+    try:
+        yield
+        pending = _deferred.emotion_ids
+    finally:
+        _deferred.emotion_ids = None
+    for emotion_id in sorted(pending):
+        rescore_emotion(emotion_id)
+
+
+def schedule_rescore(emotion_id: int):
+    """
+    키워드 변경에 따른 감정 재계산을 트랜잭션 커밋 후로 미룸.
+    같은 트랜잭션(관리자 인라인 저장 등)에서 여러 키워드가 바뀌어도 감정별로 한 번만 재계산
+    """
+    pending = getattr(_deferred, 'emotion_ids', None)
+    if pending is not None:
+        pending.add(emotion_id)
+        return
+    scheduled = getattr(_deferred, 'scheduled', None)
+    if scheduled is None:
+        scheduled = _deferred.scheduled = set()
+    scheduled.add(emotion_id)
+    # 변경마다 콜백을 걸지만 처음 실행되는 콜백이 모아 둔 감정을 모두 처리하고 나머지는 빈 집합을 봄
+    # (롤백돼 남은 감정은 다음 커밋 때 함께 재계산)
+    transaction.on_commit(_run_scheduled_rescores)
+
+
+def _run_scheduled_rescores():
+    scheduled = getattr(_deferred, 'scheduled', None) or set()
+    _deferred.scheduled = set()
+    for emotion_id in sorted(scheduled):
+        rescore_emotion(emotion_id)
+
+
+def _upsert_scores(rows: List[Tuple[int, int, float]]):
+    from .models import CharacterEmotionScore
+
+    if not rows:
+        return
+    now = timezone.now()
+    CharacterEmotionScore.objects.bulk_create(
+        [
+            CharacterEmotionScore(
+                emotion_id=emotion_id, character_id=character_id,
+                keyword_score=score, updated_at=now,
+            )
+            for emotion_id, character_id, score in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['emotion', 'character'],
+        update_fields=['keyword_score', 'updated_at'],
+    )
+
+
+def rescore_character(character):
+    """캐릭터 한 명의 모든 감정 점수 갱신"""
+    text = character_text([getattr(character, f) for f in TEXT_FIELDS])
+    emotion_ids = EmotionKeyword.objects.values_list('emotion_id', flat=True).distinct()
+    rows = [
+        (emotion_id, character.pk, matcher.score(text))
+        for emotion_id, matcher in emotion_matchers.get_many(emotion_ids).items()
+    ]
+    _upsert_scores(rows)
+
+
+def rescore_emotion(emotion_id: int):
+    """감정 하나에 대해 전체 캐릭터 점수 갱신 (키워드 변경 시)"""
+    from .models import Character, CharacterEmotionScore
+
+    pending = getattr(_deferred, 'emotion_ids', None)
+    if pending is not None:
+        pending.add(emotion_id)
+        return
+
+    matcher = emotion_matchers.get(emotion_id)
+    if not len(matcher):
+        CharacterEmotionScore.objects.filter(emotion_id=emotion_id).delete()
+        return
+
+    batch: List[Tuple[int, int, float]] = []
+    rows = Character.objects.values_list('pk', *TEXT_FIELDS).iterator(chunk_size=RESCORE_BATCH_SIZE)
+    for pk, *values in rows:
+        batch.append((emotion_id, pk, matcher.score(character_text(values))))
+        if len(batch) >= RESCORE_BATCH_SIZE:
+            _upsert_scores(batch)
+            batch = []
+    _upsert_scores(batch)
+
+
+def rebuild_scores(emotion_ids: Optional[Iterable[int]] = None) -> int:
+    """점수 테이블 전체(또는 지정 감정) 재계산, 처리한 감정 수 반환"""
+    from emotions.models import Emotion
+
+    qs = Emotion.objects.all()
+    if emotion_ids is not None:
+        qs = qs.filter(pk__in=list(emotion_ids))
+    count = 0
+    for emotion_id in qs.values_list('pk', flat=True):
+        rescore_emotion(emotion_id)
+        count += 1
+    return count
+
+
+# -----------------------------
+# 정렬
+# -----------------------------
+def calculate_user_preference_score(genre_id: int, user) -> float:
+    """사용자 선호도 점수: 활성 대화 중 같은 장르 대화 비율 (캐시된 선호도 프로필 사용)"""
+    from .preferences import genre_preference
+    return genre_preference(user, genre_id)
+
+
+def user_genre_preferences(user) -> dict:
+    """
+    genre_id -> 선호도 (활성 대화 중 해당 장르 비율). 한 번의 GROUP BY 쿼리.
+    대화가 없으면 빈 dict (호출 측에서 NO_HISTORY_PREFERENCE 사용)
+    """
+    from .models import Conversation
+
+    counts = dict(
+        Conversation.objects.filter(user=user, status='active')
+        .values_list('character__genre_id')
+        .annotate(n=Count('id'))
+        .values_list('character__genre_id', 'n')
+    )
+    total = sum(counts.values())
+    if total == 0:
+        return {}
+    return {genre_id: n / total for genre_id, n in counts.items()}
+
+
+def average_rating_expression():
+    """Character.average_rating 과 같은 값 (소수 첫째 자리 반올림, 평점 없으면 0)"""
+    return Case(
+        When(rating_count=0, then=Value(0.0)),
+        default=Round(
+            Cast('rating_sum', FloatField()) / Cast('rating_count', FloatField()), 1
+        ),
+        output_field=FloatField(),
+    )
+
+
+def keyword_score_annotation(characters_qs, emotion):
+    """해당 감정의 사전 계산 키워드 점수를 keyword_score 로 LEFT JOIN (없으면 0)"""
+    return characters_qs.annotate(
+        matched_score=FilteredRelation(
+            'emotion_scores', condition=Q(emotion_scores__emotion=emotion)
+        ),
+    ).annotate(
+        keyword_score=Coalesce(F('matched_score__keyword_score'), Value(0.0)),
+    )
+
+
+def max_total_conversations() -> int:
+    """인기도 정규화 기준 (최소 1)"""
+    from .models import Character
+    return Character.objects.aggregate(
+        max_conv=Max('total_conversations')
+    )['max_conv'] or 1
+
+
+def cached_max_total_conversations() -> int:
+    """요청 경로용 인기도 정규화 기준 (전체 집계를 LISTING_CACHE_TTL 동안 공유)"""
+    return get_or_compute(
+        'max_total_conversations',
+        max_total_conversations,
+        getattr(settings, 'LISTING_CACHE_TTL', 30),
+    )
+
+
+def rank_by_recommendation(characters_qs, emotion, genre, user, weights: Optional[dict] = None):
+    """
+    추천 점수로 정렬된 queryset 반환 (recommendation_score, keyword_score 주석 포함).
+    후보는 모두 같은 장르이므로 사용자 선호도는 상수 항으로 한 번만 계산한다.
+    """
+    weights = recommendation_weights(weights)
+
+    preference_score = 0.0
+    if user.is_authenticated:
+        preference_score = calculate_user_preference_score(genre.pk, user)
+
+    max_conversations = cached_max_total_conversations()
+
+    return keyword_score_annotation(characters_qs, emotion).annotate(
+        recommendation_score=(
+            F('keyword_score') * weights['keyword']
+            + Value(preference_score * weights['preference'])
+            + average_rating_expression() / 5.0 * weights['rating']
+            + Cast('total_conversations', FloatField()) / float(max_conversations) * weights['popularity']
+        ),
+    ).order_by('-recommendation_score', '-created_at', '-pk')
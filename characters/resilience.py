@@ -0,0 +1,235 @@
+"""
+LLM 호출 보호: 오류 분류 + 서킷 브레이커 + 동시 호출 상한(AIMD)
+
+프로바이더 장애 때 요청마다 재시도 일정을 다 채우며 워커가 묶이지 않도록
+GeminiChatService 의 모든 업스트림 호출을 감싼다 (프로세스 단위, 모든 요청이 공유).
+- classify: 예외의 HTTP 상태 코드(google api_core 예외의 code, StubBackendError.code)와
+  예외 타입으로 rate_limited / transient / permanent 구분. 재시도는 앞의 둘만
+- CircuitBreaker: transient 오류가 연속 failure_threshold 번이면 열림(open) -> cooldown 동안
+  호출 없이 CircuitOpen. cooldown 뒤 half-open 에서 시험 호출 probes 개만 보내
+  성공하면 닫고, 실패하면 다시 연다. rate_limited/permanent 는 세지 않음
+- AIMDLimiter: 동시에 나가 있는 호출 수 상한. 지연 목표 안에 성공하면 상한을 조금씩 늘리고
+  (+1/limit), 429 나 지연 목표 초과면 절반으로 줄임. 자리가 안 나면 queue_timeout 뒤 Overloaded
+
+CircuitOpen / Overloaded 는 LLMUnavailable 이고, 뷰는 이때 크레딧을 환불하고 안내 응답을 보낸다.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = 'rate_limited'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+RETRIABLE = (RATE_LIMITED, TRANSIENT)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 상태 코드 속성이 없는 예외는 메시지 앞의 HTTP 상태로 판단 (예: "503 Service Unavailable")
+STATUS_PATTERN = re.compile(r'^\s*([45]\d\d)\b')
+# 빈 자리를 기다리는 비동기 호출의 확인 간격(초)
+POLL_INTERVAL = 0.05
+
+
+class LLMUnavailable(RuntimeError):
+    """업스트림 호출을 보내지 않고 바로 실패 (retry_after 초 뒤 다시 시도)"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class Overloaded(LLMUnavailable):
+    pass
+
+
+def status_code(err: Exception) -> Optional[int]:
+    code = getattr(err, 'code', None)
+    if isinstance(code, int):
+        return int(code)
+    match = STATUS_PATTERN.match(str(err))
+    return int(match.group(1)) if match else None
+
+
+def classify(err: Exception) -> str:
+    """업스트림 오류 종류 (rate_limited / transient / permanent)"""
+    if isinstance(err, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return TRANSIENT
+    code = status_code(err)
+    if code == 429:
+        return RATE_LIMITED
+    if code is not None and (code >= 500 or code == 408):
+        return TRANSIENT
+    # 그 밖의 4xx(잘못된 요청, 인증, 안전 필터 등)와 알 수 없는 예외는 다시 보내도 같음
+    return PERMANENT
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, probes: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.probes = max(1, probes)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._refresh(time.monotonic())
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._refresh(time.monotonic()) != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def allow(self):
+        """호출해도 되면 그대로, 아니면 CircuitOpen (half-open 이면 시험 호출 자리 하나 차지)"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._refresh(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return
+            retry_after = max(0.0, self._opened_at + self.cooldown - now) if state == OPEN else 1.0
+        raise CircuitOpen('circuit_open', retry_after=retry_after)
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._probing = 0
+
+    def record_success(self):
+        """
+        half-open 시험 호출 성공이면 닫고, 닫힌 상태면 연속 실패 수 초기화.
+        열린 상태의 성공(열리기 전에 시작된 느린 호출)은 cooldown 을 끊지 않도록 무시
+        """
+        with self._lock:
+            state = self._refresh(time.monotonic())
+            if state == HALF_OPEN:
+                logger.warning("LLM 서킷 닫힘 (시험 호출 성공)")
+                self._state = CLOSED
+                self._failures = 0
+            elif state == CLOSED:
+                self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._refresh(now)
+            if state == HALF_OPEN:
+                self._open(now)
+                logger.warning("LLM 서킷 다시 열림 (시험 호출 실패) | cooldown=%.0fs", self.cooldown)
+            elif state == CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open(now)
+                    logger.warning(
+                        "LLM 서킷 열림 | failures=%d cooldown=%.0fs", self._failures, self.cooldown
+                    )
+
+    def record_neutral(self):
+        """성공도 장애도 아닌 결과 (429, 잘못된 요청): half-open 시험 자리만 돌려줌"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = max(0, self._probing - 1)
+
+    def record(self, kind: Optional[str]):
+        if kind is None:
+            self.record_success()
+        elif kind == TRANSIENT:
+            self.record_failure()
+        else:
+            self.record_neutral()
+
+
+class AIMDLimiter:
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 latency_target: float = 8.0, backoff: float = 0.5, queue_timeout: float = 2.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._inflight = 0
+        # 한 번의 혼잡에 여러 호출이 겹쳐 상한이 연달아 줄지 않게 (줄인 뒤 latency_target 동안은 유지)
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _try_acquire(self) -> bool:
+        with self._cond:
+            if self._inflight < int(self._limit):
+                self._inflight += 1
+                return True
+            return False
+
+    def _overloaded(self):
+        logger.warning("LLM 동시 호출 상한 초과 | limit=%d inflight=%d", self.limit, self._inflight)
+        return Overloaded('overloaded', retry_after=self.queue_timeout)
+
+    def acquire(self, timeout: Optional[float] = None):
+        """자리가 날 때까지 최대 timeout 초 대기, 안 나면 Overloaded"""
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        with self._cond:
+            while self._inflight >= int(self._limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._overloaded()
+                self._cond.wait(remaining)
+            self._inflight += 1
+
+    async def aacquire(self, timeout: Optional[float] = None):
+        """acquire 의 비동기 버전 (이벤트 루프를 막지 않도록 짧게 확인하며 대기)"""
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                raise self._overloaded()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def release(self, latency: Optional[float], kind: Optional[str]):
+        """호출 종료: 결과(kind=None 이면 성공)와 지연시간으로 상한 조정"""
+        with self._cond:
+            self._inflight = max(0, self._inflight - 1)
+            now = time.monotonic()
+            congested = kind == RATE_LIMITED or (latency is not None and latency > self.latency_target)
+            if congested:
+                if now - self._last_decrease >= self.latency_target:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    logger.warning(
+                        "LLM 동시 호출 상한 감소 | limit=%d kind=%s latency=%s",
+                        self.limit, kind, None if latency is None else round(latency, 2),
+                    )
+            elif kind is None:
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._cond.notify()
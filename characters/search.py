@@ -0,0 +1,229 @@
+"""
+캐릭터 전문 검색 (full-text search)
+
+name/tags/description 을 검색 전용 인덱스 테이블(characters_search)에 따로 두고
+LIKE '%q%' 전체 스캔 대신 역색인으로 찾는다.
+- SQLite: FTS5 가상 테이블 (rowid = 캐릭터 id), bm25 로 순위
+- PostgreSQL: tsvector 컬럼 + GIN 인덱스, ts_rank 로 순위
+- 그 외 DB: 기존 icontains 검색으로 대체
+
+한국어는 형태소 분석 없이 쓰기 위해 단어를 음절 2-gram 으로 쪼개 색인한다 (text.ngram_text).
+("안녕하세요" -> "안녕 녕하 하세 세요") 검색어도 같은 방식으로 쪼개고 단어별로
+연속된 2-gram 구문(phrase)을 요구하므로 부분 문자열 검색과 같은 결과가 된다.
+한 글자 검색어만 있으면 2-gram 으로 찾을 수 없어 icontains 로 대체한다.
+
+인덱스는 Character 저장/삭제 시그널로 동기화하고, rebuild_search_index 명령으로 재구축한다.
+"""
+from typing import Iterable, List, Tuple
+
+from django.db import connection as default_connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .text import ngram_text, query_ngrams
+
+SEARCH_TABLE = 'characters_search'
+# 검색 대상 필드 (컬럼 순서 = 가중치 순서: 이름 > 태그 > 설명)
+INDEXED_FIELDS = ('name', 'tags', 'description')
+
+
+def _outer_pk() -> str:
+    from .models import Character
+    return f'"{Character._meta.db_table}"."{Character._meta.pk.column}"'
+
+
+class SQLiteSearchBackend:
+    """FTS5 가상 테이블"""
+
+    # bm25 컬럼 가중치 (INDEXED_FIELDS 순서)
+    COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5({', '.join(INDEXED_FIELDS)}, tokenize='unicode61')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def delete(self, cursor, ids: List[int]):
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', ids)
+
+    def upsert(self, cursor, rows: List[Tuple]):
+        self.delete(cursor, [row[0] for row in rows])
+        columns = ', '.join(INDEXED_FIELDS)
+        placeholders = ', '.join(['%s'] * (len(INDEXED_FIELDS) + 1))
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})', rows
+        )
+
+    def match_expression(self, phrases: List[List[str]]) -> str:
+        return ' AND '.join('"' + ' '.join(grams) + '"' for grams in phrases)
+
+    def id_subquery(self, expression: str) -> Tuple[str, List]:
+        return f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression]
+
+    def rank_subquery(self, expression: str) -> Tuple[str, List]:
+        # bm25 는 낮을수록 관련도가 높으므로 부호를 뒤집어 "높을수록 좋음"으로 맞춤
+        weights = ', '.join(str(w) for w in self.COLUMN_WEIGHTS)
+        return (
+            f'SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {_outer_pk()}',
+            [expression],
+        )
+
+
+class PostgreSQLSearchBackend:
+    """tsvector + GIN 인덱스 ('simple' 설정: 2-gram 을 그대로 lexeme 으로 사용)"""
+
+    # INDEXED_FIELDS 순서의 tsvector 가중치
+    FIELD_WEIGHTS = ('A', 'B', 'C')
+
+    def create(self, cursor):
+        from .models import Character
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            f'character_id integer PRIMARY KEY '
+            f'REFERENCES {Character._meta.db_table} (id) ON DELETE CASCADE, '
+            f'document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx '
+            f'ON {SEARCH_TABLE} USING GIN (document)'
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    def delete(self, cursor, ids: List[int]):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE character_id = ANY(%s)', [list(ids)])
+
+    def upsert(self, cursor, rows: List[Tuple]):
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in self.FIELD_WEIGHTS
+        )
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (character_id, document) VALUES (%s, {document}) '
+            f'ON CONFLICT (character_id) DO UPDATE SET document = EXCLUDED.document',
+            rows,
+        )
+
+    def match_expression(self, phrases: List[List[str]]) -> str:
+        return ' & '.join(
+            '(' + ' <-> '.join(f"'{gram}'" for gram in grams) + ')' for grams in phrases
+        )
+
+    def id_subquery(self, expression: str) -> Tuple[str, List]:
+        return (
+            f"SELECT character_id FROM {SEARCH_TABLE} "
+            f"WHERE document @@ to_tsquery('simple', %s)",
+            [expression],
+        )
+
+    def rank_subquery(self, expression: str) -> Tuple[str, List]:
+        return (
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE character_id = {_outer_pk()}",
+            [expression],
+        )
+
+
+_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def backend_for(connection=None):
+    """DB 벤더별 검색 백엔드 (지원하지 않으면 None)"""
+    backend_class = _BACKENDS.get((connection or default_connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def _index_row(pk, values) -> Tuple:
+    return (pk, *(ngram_text(value) for value in values))
+
+
+def index_rows(rows: Iterable[Tuple], connection=None):
+    """(pk, name, tags, description) 행들을 색인 (있으면 교체)"""
+    connection = connection or default_connection
+    backend = backend_for(connection)
+    rows = [_index_row(pk, values) for pk, *values in rows]
+    if backend is None or not rows:
+        return
+    with connection.cursor() as cursor:
+        backend.upsert(cursor, rows)
+
+
+def index_character(character):
+    """캐릭터 한 명 색인 (저장 시그널용)"""
+    index_rows([(character.pk, *(getattr(character, f) for f in INDEXED_FIELDS))])
+
+
+def remove_character(character_id: int):
+    backend = backend_for()
+    if backend is None:
+        return
+    with default_connection.cursor() as cursor:
+        backend.delete(cursor, [character_id])
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    """색인 전체 재구축. 색인한 캐릭터 수 반환"""
+    from .models import Character
+
+    backend = backend_for()
+    if backend is None:
+        return 0
+
+    count = 0
+    # 재구축 중에도 검색이 빈 결과를 내지 않도록 한 트랜잭션으로 교체
+    with transaction.atomic():
+        with default_connection.cursor() as cursor:
+            backend.create(cursor)
+            backend.clear(cursor)
+
+        rows = Character.objects.order_by().values_list('pk', *INDEXED_FIELDS)
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                index_rows(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            index_rows(batch)
+            count += len(batch)
+    return count
+
+
+def search(queryset, query: str) -> Tuple[object, bool]:
+    """
+    캐릭터 queryset 을 검색어로 거르기.
+    (queryset, ranked) 반환: ranked 이면 search_rank(높을수록 관련) 주석이 붙어 있음.
+    색인을 쓸 수 없으면 icontains 로 거르고 ranked=False.
+    """
+    phrases = query_ngrams(query)
+    backend = backend_for()
+    if backend is None or not phrases:
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query)
+        ), False
+
+    expression = backend.match_expression(phrases)
+    ids_sql, ids_params = backend.id_subquery(expression)
+    rank_sql, rank_params = backend.rank_subquery(expression)
+    return queryset.filter(pk__in=RawSQL(ids_sql, ids_params)).annotate(
+        search_rank=RawSQL(rank_sql, rank_params)
+    ), True
+
@@ -1,91 +1,158 @@
-import os
 import time
-import math
+import random
+import asyncio
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
-import google.generativeai as genai
 from django.conf import settings
-from .models import Character, Conversation, Message, UserCredit
+from . import resilience
+from .models import Character
+from .inflight import SingleFlight, call_key
+from .llm_backends import LLMBackend, TokenUsage, get_backend
 
 logger = logging.getLogger(__name__)
 
 
-def _get_env(name: str, default: Optional[str] = None) -> str:
-    val = os.getenv(name, default)
-    if val is None:
-        raise ValueError(f"환경변수 {name}가 설정되지 않았습니다.")
-    return val
-
-
 class GeminiChatService:
     """
-    Gemini 기반 캐릭터 대화 서비스 (Prod-ready)
-    - 모델명은 환경변수 GEMINI_MODEL 로 고정 (예: 'models/gemini-2.5-flash')
+    캐릭터 대화 서비스 (Prod-ready)
+    - 생성 호출은 LLM 백엔드에 위임 (settings.LLM_BACKEND, 기본 Gemini)
     - 재시도/백오프
     - 지연 초기화
+    - 히스토리는 chat turn 으로 전달
+    - 크레딧 예약/정산과 메시지 저장은 하지 않음 (chat_turn.py)
     """
 
-    _initialised = False
-
-    def __init__(self):
+    def __init__(self, backend: Optional[LLMBackend] = None):
         # 지연 초기화를 위해 여기서는 플래그만
+        self.backend: Optional[LLMBackend] = backend
         self.model_name: Optional[str] = None
         self.credit_cost = 1
-
-        self.generation_config = {
-            "temperature": 0.9,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1024,
-        }
-        self.safety_settings = self._build_safety_settings()
+        self._initialised = False
+        # 진행 중인 동일 생성 호출 합치기 (LLM_COALESCE_INFLIGHT)
+        self.inflight = SingleFlight()
+        # 프로바이더 장애/과부하 때 바로 실패하도록 모든 요청이 공유 (resilience.py)
+        self.breaker = resilience.CircuitBreaker(
+            failure_threshold=getattr(settings, 'LLM_BREAKER_FAILURES', 5),
+            cooldown=getattr(settings, 'LLM_BREAKER_COOLDOWN', 30),
+        )
+        self.limiter = resilience.AIMDLimiter(
+            initial=getattr(settings, 'LLM_CONCURRENCY_INITIAL', 8),
+            min_limit=getattr(settings, 'LLM_CONCURRENCY_MIN', 1),
+            max_limit=getattr(settings, 'LLM_CONCURRENCY_MAX', 64),
+            latency_target=getattr(settings, 'LLM_LATENCY_TARGET', 8.0),
+            queue_timeout=getattr(settings, 'LLM_QUEUE_TIMEOUT', 2.0),
+        )
 
     def _lazy_init(self):
         if self._initialised:
             return
-        api_key = _get_env("GEMINI_API_KEY")
-        genai.configure(api_key=api_key)
-
-        # ✅ 프로덕션: 모델명 고정 (필수)
-        # 예: export GEMINI_MODEL="models/gemini-2.5-flash"
-        self.model_name = _get_env("GEMINI_MODEL", "models/gemini-2.0-flash")
+        if self.backend is None:
+            self.backend = get_backend()
+        self.model_name = self.backend.model_name
 
-        self.__class__._initialised = True
+        self._initialised = True
         logger.info("GeminiChatService 초기화 완료 | model=%s", self.model_name)
 
-    def _build_safety_settings(self):
-        try:
-            from google.generativeai.types import HarmCategory, HarmBlockThreshold
-            return [
-                {"category": HarmCategory.HARM_CATEGORY_HARASSMENT,
-                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
-                {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
-                {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
-                {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                 "threshold": HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE},
-            ]
-        except Exception:
-            return [
-                {"category": "HARM_CATEGORY_HARASSMENT",
-                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH",
-                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                 "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            ]
-
     # -----------------------------
-    # 백오프 재시도 유틸
+    # 업스트림 호출 보호 + 백오프 재시도
     # -----------------------------
-    def _retry_generate(self, model, user_message: str, max_attempts: int = 3) -> str:
+    @staticmethod
+    def _backoff_seconds(attempt: int, kind: str = resilience.TRANSIENT) -> float:
+        # 지수 백오프 + 지터 (429 는 더 길게, 최대 2s/4s 정도)
+        base, cap = (0.5, 4.0) if kind == resilience.RATE_LIMITED else (0.2, 2.0)
+        delay = min(cap, base * (2 ** (attempt - 1)))
+        return random.uniform(delay / 2, delay)
+
+    def is_available(self) -> bool:
+        """서킷이 열려 있지 않으면 True (열려 있으면 크레딧 예약 전에 바로 안내 응답)"""
+        return self.breaker.state != resilience.OPEN
+
+    def retry_after(self) -> float:
+        return self.breaker.retry_after()
+
+    def _call_upstream(self, call):
+        """서킷 확인 + 동시 호출 자리 확보 후 호출, 결과를 브레이커/리미터에 반영"""
+        self.breaker.allow()
+        try:
+            self.limiter.acquire()
+        except resilience.Overloaded:
+            self.breaker.record_neutral()
+            raise
+        t0 = time.monotonic()
+        kind = None
+        cancelled = False
+        try:
+            return call()
+        except Exception as e:
+            kind = resilience.classify(e)
+            raise
+        except BaseException:
+            # 취소(클라이언트 연결 끊김 등)는 성공도 장애도 아님: 지연시간도 세지 않음
+            kind, cancelled = resilience.PERMANENT, True
+            raise
+        finally:
+            self.limiter.release(None if cancelled else time.monotonic() - t0, kind)
+            self.breaker.record(kind)
+
+    async def _acall_upstream(self, call):
+        """_call_upstream 의 비동기 버전 (call 은 코루틴 함수)"""
+        self.breaker.allow()
+        try:
+            await self.limiter.aacquire()
+        except resilience.Overloaded:
+            self.breaker.record_neutral()
+            raise
+        t0 = time.monotonic()
+        kind = None
+        cancelled = False
+        try:
+            return await call()
+        except Exception as e:
+            kind = resilience.classify(e)
+            raise
+        except BaseException:
+            # 취소(클라이언트 연결 끊김 등)는 성공도 장애도 아님: 지연시간도 세지 않음
+            kind, cancelled = resilience.PERMANENT, True
+            raise
+        finally:
+            self.limiter.release(None if cancelled else time.monotonic() - t0, kind)
+            self.breaker.record(kind)
+
+    def _stream_upstream(self, character: Character, contents: List[Dict],
+                         usage: Optional[TokenUsage]) -> Iterator[str]:
+        """스트리밍 호출 보호 (지연시간은 첫 청크 기준, 자리는 스트림이 끝날 때 반납)"""
+        self.breaker.allow()
+        try:
+            self.limiter.acquire()
+        except resilience.Overloaded:
+            self.breaker.record_neutral()
+            raise
+        t0 = time.monotonic()
+        latency = None
+        kind = None
+        try:
+            persona = self.build_persona_prompt(character)
+            for text in self.backend.stream(character, persona, contents, usage=usage):
+                if latency is None:
+                    latency = time.monotonic() - t0
+                yield text
+        except Exception as e:
+            kind = resilience.classify(e)
+            raise
+        finally:
+            if latency is None and kind is None:
+                # 첫 청크 전에 끊겼거나 빈 응답: 성공으로 세지 않음 (상한/서킷 그대로)
+                kind = resilience.PERMANENT
+            self.limiter.release(latency, kind)
+            self.breaker.record(kind)
+
+    def _retry_generate(self, character: Character, contents: List[Dict],
+                        max_attempts: int = 3, usage: Optional[TokenUsage] = None) -> str:
         """
         간단한 지수 백오프 재시도.
-        - 429/5xx/일시 예외에서만 재시도.
+        - 429/5xx/타임아웃에서만 재시도 (resilience.classify)
+        - 서킷이 열렸거나 동시 호출 자리가 없으면 재시도 없이 LLMUnavailable
         """
         attempt = 0
         last_err = None
@@ -93,41 +160,108 @@ class GeminiChatService:
             attempt += 1
             t0 = time.time()
             try:
-                resp = model.generate_content(user_message)
-                text = (getattr(resp, "text", None) or "").strip()
+                text = self._call_upstream(lambda: self.backend.generate(
+                    character, self.build_persona_prompt(character), contents, usage=usage
+                ))
                 if text:
                     # 관측성: 시도 횟수와 지연시간 기록
                     logger.info(
-                        "Gemini gen ok | attempt=%d latency=%.2fs",
-                        attempt, time.time() - t0
+                        "LLM gen ok | model=%s attempt=%d latency=%.2fs",
+                        self.model_name, attempt, time.time() - t0
                     )
                     return text
                 raise RuntimeError("empty_response")
+            except resilience.LLMUnavailable:
+                raise
             except Exception as e:
                 last_err = e
-                emsg = str(e).lower()
-                retriable = any(x in emsg for x in [
-                    "429", "rate", "quota", "timeout", "temporar", "unavailable", "5"
-                ])
+                kind = resilience.classify(e)
                 logger.warning(
-                    "Gemini gen fail | attempt=%d retriable=%s err=%s",
-                    attempt, retriable, e
+                    "LLM gen fail | model=%s attempt=%d kind=%s err=%s",
+                    self.model_name, attempt, kind, e
                 )
-                if not retriable or attempt >= max_attempts:
+                if kind not in resilience.RETRIABLE or attempt >= max_attempts:
                     break
-                # 지수 백오프 (최대 2s 정도)
-                sleep_s = min(2.0, 0.2 * (2 ** (attempt - 1)))
-                time.sleep(sleep_s)
+                time.sleep(self._backoff_seconds(attempt, kind))
         # 최종 실패
         raise last_err or RuntimeError("generation_failed")
 
+    async def _aretry_generate(self, character: Character, contents: List[Dict],
+                               max_attempts: int = 3, usage: Optional[TokenUsage] = None) -> str:
+        """
+        _retry_generate 의 비동기 버전.
+        - 대기 중에는 이벤트 루프를 양보하므로 워커를 점유하지 않음
+        """
+        attempt = 0
+        last_err = None
+        while attempt < max_attempts:
+            attempt += 1
+            t0 = time.time()
+            try:
+                text = await self._acall_upstream(lambda: self.backend.agenerate(
+                    character, self.build_persona_prompt(character), contents, usage=usage
+                ))
+                if text:
+                    logger.info(
+                        "LLM async gen ok | model=%s attempt=%d latency=%.2fs",
+                        self.model_name, attempt, time.time() - t0
+                    )
+                    return text
+                raise RuntimeError("empty_response")
+            except resilience.LLMUnavailable:
+                raise
+            except Exception as e:
+                last_err = e
+                kind = resilience.classify(e)
+                logger.warning(
+                    "LLM async gen fail | model=%s attempt=%d kind=%s err=%s",
+                    self.model_name, attempt, kind, e
+                )
+                if kind not in resilience.RETRIABLE or attempt >= max_attempts:
+                    break
+                await asyncio.sleep(self._backoff_seconds(attempt, kind))
+        raise last_err or RuntimeError("generation_failed")
+
+    def _retry_stream(self, character: Character, contents: List[Dict],
+                      max_attempts: int = 3, usage: Optional[TokenUsage] = None) -> Iterator[str]:
+        """
+        스트리밍 생성 + 재시도.
+        - 첫 청크를 받기 전에 실패한 경우에만 재시도 (이미 보낸 텍스트는 되돌릴 수 없음)
+        """
+        attempt = 0
+        last_err = None
+        while attempt < max_attempts:
+            attempt += 1
+            emitted = False
+            try:
+                for text in self._stream_upstream(character, contents, usage):
+                    if text:
+                        emitted = True
+                        yield text
+                if emitted:
+                    return
+                raise RuntimeError("empty_response")
+            except resilience.LLMUnavailable:
+                raise
+            except Exception as e:
+                last_err = e
+                kind = resilience.classify(e)
+                retriable = not emitted and kind in resilience.RETRIABLE
+                logger.warning(
+                    "LLM stream fail | model=%s attempt=%d emitted=%s kind=%s err=%s",
+                    self.model_name, attempt, emitted, kind, e
+                )
+                if not retriable or attempt >= max_attempts:
+                    break
+                time.sleep(self._backoff_seconds(attempt, kind))
+        raise last_err or RuntimeError("generation_failed")
+
     # -----------------------------
     # 프롬프트
     # -----------------------------
-    def build_character_prompt(
-        self, character: Character, conversation_history: Optional[List[Dict]] = None
-    ) -> str:
-        prompt = f"""당신은 '{character.name}'이라는 캐릭터입니다.
+    def build_persona_prompt(self, character: Character) -> str:
+        """캐릭터 고정 설정 (모델의 system_instruction 으로 캐릭터 버전당 한 번만 생성)"""
+        return f"""당신은 '{character.name}'이라는 캐릭터입니다.
 
 캐릭터 설정:
 - 이름: {character.name}
@@ -144,67 +278,137 @@ class GeminiChatService:
 5. 부적절한 내용이나 개인정보를 요구하지 마세요.
 6. 답변은 2-4문장으로 간결하게 해주세요.
 """
-        if conversation_history:
-            prompt += "\n최근 대화:\n"
-            for msg in conversation_history[-3:]:
-                sender = "사용자" if msg["sender"] == "user" else character.name
-                prompt += f"{sender}: {msg['content']}\n"
-        return prompt
+
+    @staticmethod
+    def build_chat_contents(history: List[Dict], user_message: str) -> List[Dict]:
+        """
+        히스토리를 Gemini chat turn 목록으로 변환.
+        - 같은 역할이 연속되면 합치고, 첫 턴은 항상 user 가 되도록 정리
+        - 현재 사용자 메시지가 히스토리 마지막에 없으면 덧붙임
+        """
+        turns: List[Dict] = []
+        for msg in history:
+            if msg["sender"] == "user":
+                role = "user"
+            elif msg["sender"] == "character":
+                role = "model"
+            else:
+                continue
+            if not turns and role == "model":
+                continue
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["parts"].append(msg["content"])
+            else:
+                turns.append({"role": role, "parts": [msg["content"]]})
+
+        if not (turns and turns[-1]["role"] == "user"
+                and turns[-1]["parts"][-1] == user_message):
+            if turns and turns[-1]["role"] == "user":
+                turns[-1]["parts"].append(user_message)
+            else:
+                turns.append({"role": "user", "parts": [user_message]})
+        return turns
 
     # -----------------------------
     # 생성 호출
     # -----------------------------
-    def generate_response(
-        self, conversation: Conversation, user_message: str
-    ) -> Tuple[str, Dict]:
+    def count_tokens(self, character: Character, contents: List[Dict]) -> int:
+        """페르소나 + 대화의 입력 토큰 수 (백엔드 기준)"""
         self._lazy_init()
+        return self.backend.count_tokens(
+            character, self.build_persona_prompt(character), contents
+        )
 
-        try:
-            # 크레딧 확인
-            user_credit, _ = UserCredit.objects.get_or_create(user=conversation.user)
-            if user_credit.total_credits < self.credit_cost:
-                return ("크레딧이 부족합니다. 관리자에게 문의하세요.",
-                        {"error": "insufficient_credits", "credits_needed": self.credit_cost})
-
-            # 최근 메시지 정리
-            recent_qs = conversation.messages.order_by("-timestamp")[:6]
-            history = [{"sender": m.sender, "content": m.content}
-                       for m in reversed(list(recent_qs))]
-
-            system_prompt = self.build_character_prompt(conversation.character, history)
-
-            model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings,
-                system_instruction=system_prompt,
-            )
+    def _meta(self, latency: float, **extra) -> Dict:
+        meta = {
+            "ai_model_used": self.model_name,
+            "generation_time": round(latency, 2),
+            "credits_used": self.credit_cost,
+        }
+        meta.update(extra)
+        return meta
 
-            t0 = time.time()
-            text = self._retry_generate(model, user_message, max_attempts=3)
-            latency = time.time() - t0
+    # -----------------------------
+    # 생성 (크레딧/DB 와 무관, 실패 시 예외)
+    # -----------------------------
+    def _coalesce_key(self, character: Character, contents: List[Dict]) -> Optional[str]:
+        if not getattr(settings, 'LLM_COALESCE_INFLIGHT', True):
+            return None
+        return call_key(self.model_name, self.build_persona_prompt(character), contents)
 
-            # 크레딧 차감(실패해도 응답은 반환)
-            try:
-                user_credit.use_credits(self.credit_cost)
-            except Exception as ce:
-                logger.error("크레딧 차감 실패: %s", ce)
+    @staticmethod
+    def _shared_usage(usage_meta: Dict, shared: bool) -> Dict:
+        """다른 요청의 호출 결과를 받은 경우 토큰은 0 으로 (업스트림 호출은 한 번만 집계)"""
+        if not shared:
+            return usage_meta
+        return dict({field: 0 for field in usage_meta}, coalesced=True)
 
-            meta = {
-                "ai_model_used": self.model_name,
-                "generation_time": round(latency, 2),
-                "credits_used": self.credit_cost,
-            }
-            return text, meta
+    def generate_text(self, character: Character, contents: List[Dict]) -> Tuple[str, Dict]:
+        """준비된 chat turn 으로 응답 생성 -> (text, meta). 같은 호출이 진행 중이면 결과를 공유"""
+        self._lazy_init()
+        t0 = time.time()
 
-        except Exception as e:
-            # 사용자 메시지는 일반화, 내부는 상세 로깅
-            logger.error(
-                "Gemini API 오류 | model=%s | err=%s",
-                self.model_name, e, exc_info=True
-            )
-            return ("죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요.",
-                    {"error": "api_error", "error_message": str(e)})
+        def call():
+            usage = TokenUsage()
+            text = self._retry_generate(character, contents, max_attempts=3, usage=usage)
+            return text, usage.as_meta()
+
+        key = self._coalesce_key(character, contents)
+        if key is None:
+            (text, usage_meta), shared = call(), False
+        else:
+            (text, usage_meta), shared = self.inflight.do(key, call)
+        return text, self._meta(time.time() - t0, **self._shared_usage(usage_meta, shared))
+
+    async def agenerate_text(self, character: Character, contents: List[Dict]) -> Tuple[str, Dict]:
+        """generate_text 의 비동기 버전"""
+        self._lazy_init()
+        t0 = time.time()
+
+        async def call():
+            usage = TokenUsage()
+            text = await self._aretry_generate(character, contents, max_attempts=3, usage=usage)
+            return text, usage.as_meta()
+
+        key = self._coalesce_key(character, contents)
+        if key is None:
+            (text, usage_meta), shared = await call(), False
+        else:
+            (text, usage_meta), shared = await self.inflight.ado(key, call)
+        return text, self._meta(time.time() - t0, **self._shared_usage(usage_meta, shared))
+
+    def complete_text(self, system_instruction: str, contents: List[Dict]) -> str:
+        """페르소나 없는 보조 생성 (대화 요약 등, 재시도 없음)"""
+        self._lazy_init()
+        return self._call_upstream(lambda: self.backend.complete(system_instruction, contents))
+
+    def stream_text(self, character: Character, contents: List[Dict]) -> Iterator[Dict]:
+        """
+        {"type": "chunk", "text": ...} 를 부분 텍스트마다 yield 하고
+        마지막에 {"type": "done", "text": 전체 응답, "meta": ...} 를 yield
+        """
+        self._lazy_init()
+        t0 = time.time()
+        first_token_time = None
+        parts: List[str] = []
+        usage = TokenUsage()
+        for text in self._retry_stream(character, contents, max_attempts=3, usage=usage):
+            if first_token_time is None:
+                first_token_time = time.time() - t0
+            parts.append(text)
+            yield {"type": "chunk", "text": text}
+        latency = time.time() - t0
+
+        logger.info(
+            "LLM stream ok | model=%s ttft=%.2fs latency=%.2fs",
+            self.model_name, first_token_time or 0.0, latency
+        )
+        yield {
+            "type": "done",
+            "text": "".join(parts).strip(),
+            "meta": self._meta(latency, first_token_time=round(first_token_time or latency, 2),
+                               **usage.as_meta()),
+        }
 
     # -----------------------------
     # 입력 검증
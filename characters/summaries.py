@@ -0,0 +1,171 @@
+"""
+대화 롤링 요약 + 프롬프트 토큰 예산
+
+긴 대화에서 히스토리를 늘리지 않고 맥락을 유지하기 위해 오래된 메시지를 요약으로 접는다.
+- 프롬프트 = [이전 대화 요약] + 요약 이후의 최근 메시지 + 이번 사용자 메시지
+  (페르소나 포함 CONVERSATION_PROMPT_TOKEN_BUDGET 을 넘으면 가장 오래된 메시지부터 뺌, token_usage.PromptBudgeter)
+- 요약 이후 메시지가 최근 창(RECENT_WINDOW) + K 턴(CONVERSATION_SUMMARY_INTERVAL) 이상 쌓이면
+  커밋 후 백그라운드 스레드에서 요약을 갱신 (이전 요약 + 창 밖 메시지 -> 새 요약)
+- 요약 저장은 summary_last_message_id 가 그대로일 때만 하는 조건부 UPDATE 라서
+  같은 대화의 요약이 동시에 두 번 계산돼도 하나만 반영된다
+
+토큰 수는 llm_backends.estimate_tokens 로 로컬 추정한다 (API 호출 없음).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Conversation
+from .token_usage import PromptBudgeter
+
+logger = logging.getLogger(__name__)
+
+# 요약하지 않고 그대로 보내는 최근 메시지 수 (이번 사용자 메시지 제외)
+RECENT_WINDOW = 5
+# 요약 한 번에 접는 최대 메시지 수
+MAX_FOLD_MESSAGES = 60
+
+SUMMARY_PREFIX = '[이전 대화 요약]\n'
+SUMMARY_INSTRUCTION = (
+    '당신은 캐릭터 채팅의 대화 기록을 요약하는 도우미입니다. '
+    '이전 요약과 새 대화를 합쳐 하나의 요약으로 다시 써 주세요. '
+    '사용자에 대해 알게 된 사실, 사용자의 감정과 고민, 약속하거나 이어가기로 한 이야기를 '
+    '우선으로 남기고, 인사말이나 반복되는 표현은 빼세요. '
+    '한국어 평서문으로 {max_chars}자 이내로 작성하세요.'
+)
+
+
+def summary_interval() -> int:
+    """요약을 갱신하는 간격 (턴 수, 1턴 = 사용자 + 캐릭터 메시지)"""
+    return max(1, getattr(settings, 'CONVERSATION_SUMMARY_INTERVAL', 5))
+
+
+def history_limit() -> int:
+    """프롬프트용으로 읽는 요약 이후 메시지 최대 수 (요약이 밀려도 이 이상 늘지 않음)"""
+    return RECENT_WINDOW + 2 * summary_interval()
+
+
+def recent_messages(conversation: Conversation) -> List[Tuple[str, str]]:
+    """요약 이후의 최근 메시지 (sender, content) 목록, 오래된 순. 쿼리 1번"""
+    rows = conversation.messages.filter(
+        id__gt=conversation.summary_last_message_id
+    ).order_by('-timestamp', '-id').values_list('sender', 'content')[:history_limit()]
+    return list(reversed(rows))
+
+
+def prompt_history(persona: str, summary: str, recent: Sequence[Tuple[str, str]], user_message: str,
+                   budget: Optional[int] = None) -> List[Dict]:
+    """
+    요약 + 최근 메시지를 build_chat_contents 에 넘길 히스토리로 구성.
+    페르소나까지 합친 추정 토큰이 예산을 넘으면 오래된 메시지부터 뺀다 (요약 자리를 먼저 확보).
+    요약까지 넣을 자리가 없으면 요약도 뺀다 (이번 메시지는 항상 포함)
+    """
+    summary_turn = SUMMARY_PREFIX + summary if summary else ''
+    history, _ = PromptBudgeter(budget).fit(persona, recent, user_message, summary_turn)
+    return history
+
+
+def is_due(unsummarized: int) -> bool:
+    """요약 이후 메시지 수로 요약 갱신이 필요한지"""
+    return unsummarized >= RECENT_WINDOW + 2 * summary_interval()
+
+
+def _transcript(character_name: str, rows: Sequence[Tuple[int, str, str]]) -> str:
+    lines = []
+    for _, sender, content in rows:
+        speaker = '사용자' if sender == 'user' else character_name
+        lines.append(f'{speaker}: {content}')
+    return '\n'.join(lines)
+
+
+def summarize_conversation(conversation_id: int) -> bool:
+    """창 밖 메시지를 요약에 접어 저장. 갱신했으면 True"""
+    from .services import gemini_service
+
+    conversation = Conversation.objects.select_related('character').get(pk=conversation_id)
+    unsummarized = conversation.messages.filter(id__gt=conversation.summary_last_message_id)
+    # 최근 창 바로 앞 메시지까지만 접음 (창 안의 메시지는 프롬프트에 그대로 들어감)
+    boundary = list(
+        unsummarized.order_by('-timestamp', '-id').values_list('id', flat=True)[RECENT_WINDOW:RECENT_WINDOW + 1]
+    )
+    if not boundary:
+        return False
+    # 요약이 오래 밀렸어도 한 번에 접는 양은 제한 (남은 것은 다음 요청에서)
+    fold = list(
+        unsummarized.filter(id__lte=boundary[0]).order_by('timestamp', 'id')
+        .values_list('id', 'sender', 'content')[:MAX_FOLD_MESSAGES]
+    )
+
+    max_chars = getattr(settings, 'CONVERSATION_SUMMARY_MAX_CHARS', 600)
+    parts = []
+    if conversation.summary:
+        parts.append(f'이전 요약:\n{conversation.summary}')
+    parts.append(f'새 대화:\n{_transcript(conversation.character.name, fold)}')
+    summary = gemini_service.complete_text(
+        SUMMARY_INSTRUCTION.format(max_chars=max_chars),
+        [{'role': 'user', 'parts': ['\n\n'.join(parts)]}],
+    )[:max_chars]
+    if not summary:
+        return False
+
+    updated = Conversation.objects.filter(
+        pk=conversation_id,
+        summary_last_message_id=conversation.summary_last_message_id,
+    ).update(
+        summary=summary,
+        summary_last_message_id=fold[-1][0],
+        summary_updated_at=timezone.now(),
+    )
+    return bool(updated)
+
+
+class SummaryScheduler:
+    """대화별 요약 작업을 백그라운드 스레드에서 실행 (같은 대화는 동시에 하나만)"""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, conversation_id: int) -> bool:
+        with self._lock:
+            if conversation_id in self._inflight:
+                return False
+            self._inflight.add(conversation_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='conversation-summary'
+                )
+        self._executor.submit(self._run, conversation_id)
+        return True
+
+    def _run(self, conversation_id: int):
+        try:
+            summarize_conversation(conversation_id)
+        except Exception as e:
+            # 실패해도 다음 턴에 다시 예약됨 (그동안 프롬프트는 최근 메시지 한도 안에서 유지)
+            logger.warning("대화 요약 실패 | conversation=%s err=%s", conversation_id, e)
+        finally:
+            with self._lock:
+                self._inflight.discard(conversation_id)
+            # 백그라운드 스레드 전용 DB 연결 정리
+            connection.close()
+
+
+summary_scheduler = SummaryScheduler(
+    workers=getattr(settings, 'CONVERSATION_SUMMARY_WORKERS', 2)
+)
+
+
+def request_summary(conversation_id: int):
+    """요약 갱신 요청 (CONVERSATION_SUMMARY_ASYNC 가 꺼져 있으면 바로 실행)"""
+    if getattr(settings, 'CONVERSATION_SUMMARY_ASYNC', True):
+        summary_scheduler.schedule(conversation_id)
+    else:
+        summarize_conversation(conversation_id)
@@ -0,0 +1,116 @@
+"""
+캐릭터 태그 정규화 / 태그 필터
+
+Character.tags(쉼표로 구분된 입력)는 그대로 두고, 정규화한 태그를 Tag 테이블에 한 행씩
+두어 Character.tag_links 로 연결한다. 태그 필터는 tags__icontains 부분 문자열 스캔 대신
+Tag.name 유니크 인덱스 -> 연결 테이블 인덱스 조회가 되고, "힐링"이 "힐링캠프"에 걸리지 않는다.
+Tag.usage_count 는 연결 추가/삭제 시 조건부 UPDATE 로 함께 증감한다.
+"""
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from hungry_jackie.cache import get_or_compute
+
+from .models import Character, Tag
+from .text import normalize_tag, parse_tags
+
+CharacterTag = Character.tag_links.through
+
+
+def _ensure_tags(names: List[str]) -> dict:
+    """이름 -> Tag id (없는 태그는 만들어서)"""
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def _adjust_usage(tag_ids: Iterable[int], delta: int):
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    qs = Tag.objects.filter(pk__in=tag_ids)
+    if delta < 0:
+        qs = qs.filter(usage_count__gte=-delta)
+    qs.update(usage_count=F('usage_count') + delta)
+
+
+def sync_character_tags(character) -> List[str]:
+    """character.tags 입력에 맞춰 태그 연결/사용 수 갱신. 정규화된 태그 목록 반환"""
+    names = parse_tags(character.tags)
+    with transaction.atomic():
+        wanted = set(_ensure_tags(names).values())
+        current = set(
+            CharacterTag.objects.filter(character_id=character.pk).values_list('tag_id', flat=True)
+        )
+        added, removed = wanted - current, current - wanted
+        if removed:
+            CharacterTag.objects.filter(character_id=character.pk, tag_id__in=removed).delete()
+            _adjust_usage(removed, -1)
+        if added:
+            CharacterTag.objects.bulk_create(
+                [CharacterTag(character_id=character.pk, tag_id=tag_id) for tag_id in added],
+                ignore_conflicts=True,
+            )
+            _adjust_usage(added, 1)
+    return names
+
+
+def release_tags(character):
+    """캐릭터 삭제 전 연결된 태그들의 사용 수 감소"""
+    _adjust_usage(
+        CharacterTag.objects.filter(character_id=character.pk).values_list('tag_id', flat=True), -1
+    )
+
+
+def filter_by_tag(queryset, tag: str):
+    """정확히 해당 태그가 달린 캐릭터만 (정규화 후 비교)"""
+    name = normalize_tag(tag)
+    if not name:
+        return queryset
+    return queryset.filter(tag_links__name=name)
+
+
+def popular_tags(limit: int = 20) -> List[Tag]:
+    """사용 수가 많은 태그 (목록 화면용, LISTING_CACHE_TTL 동안 캐시)"""
+    return get_or_compute(
+        f'popular_tags:{limit}',
+        lambda: list(Tag.objects.filter(usage_count__gt=0).order_by('-usage_count', 'name')[:limit]),
+        getattr(settings, 'LISTING_CACHE_TTL', 30),
+    )
+
+
+def _link_batch(batch: List[tuple]):
+    tag_ids = _ensure_tags(sorted({name for _, names in batch for name in names}))
+    CharacterTag.objects.bulk_create(
+        [CharacterTag(character_id=pk, tag_id=tag_ids[name]) for pk, names in batch for name in names],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_tag_links(batch_size: int = 1000) -> int:
+    """모든 캐릭터의 태그 연결과 사용 수를 tags 입력 기준으로 다시 계산. 처리한 캐릭터 수 반환"""
+    count = 0
+    with transaction.atomic():
+        CharacterTag.objects.all().delete()
+        batch = []
+        rows = Character.objects.order_by().values_list('pk', 'tags')
+        for pk, raw in rows.iterator(chunk_size=batch_size):
+            batch.append((pk, parse_tags(raw)))
+            if len(batch) >= batch_size:
+                _link_batch(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            _link_batch(batch)
+            count += len(batch)
+
+        usage = CharacterTag.objects.filter(tag_id=OuterRef('pk')).order_by().values('tag_id')
+        Tag.objects.update(usage_count=Coalesce(
+            Subquery(usage.annotate(n=Count('pk')).values('n')), 0
+        ))
+    return count
@@ -0,0 +1,67 @@
+# characters/templatetags/fragment_cache.py
+"""
+버전 키 기반 템플릿 조각 캐시
+
+    {% load fragment_cache %}
+    {% fragment_cache character_card ch|fragment_version %} ... {% endfragment_cache %}
+    {% fragment_cache character_header character|fragment_version character.creator|creator_version %} ...
+
+- fragment_version: 캐릭터 수정 시각(updated_at) + 카운터(대화 수, 평점) 값.
+  내용이 바뀌면 키가 바뀌므로 무효화 없이 새 조각을 만든다 (옛 조각은 TTL 후 정리)
+- creator_version: 만든 사람 프로필 수정 시각. 닉네임을 보여주는 조각은 이 값도 키에 넣는다
+  (뷰에서 select_related('creator__profile') 로 함께 읽어 추가 쿼리 없음)
+- 유지 시간은 FRAGMENT_CACHE_TTL (지터 적용)
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.cache import CacheNode
+
+from hungry_jackie.cache import jittered
+
+register = template.Library()
+
+
+class _FragmentTTL:
+    """CacheNode 의 만료 시간 변수 자리에 넣는 설정값 (렌더링마다 지터)"""
+
+    var = 'FRAGMENT_CACHE_TTL'
+
+    def resolve(self, context):
+        return int(jittered(getattr(settings, 'FRAGMENT_CACHE_TTL', 600)))
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(f"'{tokens[0]}' 태그에는 조각 이름이 필요합니다.")
+    return CacheNode(
+        nodelist,
+        _FragmentTTL(),
+        tokens[1],
+        [parser.compile_filter(t) for t in tokens[2:]],
+        None,
+    )
+
+
+@register.filter
+def fragment_version(character, scope='all') -> str:
+    """
+    캐릭터 조각 캐시 버전 (내용 또는 카운터가 바뀌면 달라짐).
+    scope='content' 면 카운터를 빼서 대화가 늘어도 본문 조각은 그대로 재사용
+    """
+    parts = [character.pk, character.updated_at.timestamp() if character.updated_at else 0]
+    if scope != 'content':
+        parts += [character.total_conversations, character.rating_count, character.rating_sum]
+    return '.'.join(str(v) for v in parts)
+
+
+@register.filter
+def creator_version(user) -> str:
+    """만든 사람 프로필 버전 (닉네임이 바뀌면 달라짐, 프로필이 없으면 '0')"""
+    profile = getattr(user, 'profile', None)
+    if profile is None or profile.updated_at is None:
+        return '0'
+    return str(profile.updated_at.timestamp())
@@ -1,3 +1,1118 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from emotions.models import Genre
+
+from .llm_backends import StubBackend
+from .models import (
+    Character, CharacterRating, Conversation, CreditLedgerEntry, Message, TokenUsageDaily, UserCredit,
+)
+from . import chat_turn, counters, credits, idempotency, resilience, summaries
+from .context_cache import LocalContextCacheBackend, PersonaContextCache
+from .inflight import SingleFlight
+from .pagination import KeysetPaginator, encode_cursor
+from .search import SEARCH_TABLE, search
+from .services import GeminiChatService, gemini_service
+from .token_usage import PromptBudgeter
+
+# 테스트는 실행마다 비어 있는 프로세스 메모리 캐시를 쓴다
+# (기본 DB 캐시의 쿼리가 쿼리 수 측정에 섞이거나 스레드 테스트의 SQLite 잠금을 늘리지 않게)
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hungry-jackie-tests',
+    }
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SendMessageQueryCountTests(TestCase):
+    """메시지 전송 한 턴의 DB 왕복 횟수 (턴이 길어져도 고정)"""
+
+    # 세션 2 + 대화/잔액 1 + 크레딧 예약(트랜잭션 경계 2, UPDATE, INSERT, 예약 후 잔액 SELECT) 5
+    # + 히스토리 1 + 완료 트랜잭션(경계 2, 메시지 INSERT, 대화 UPDATE, 캐릭터 UPDATE,
+    #   예약 확정 SAVEPOINT 2 + INSERT, 일별 토큰 사용량 upsert) 9
+    # (TestCase 안에서는 트랜잭션 경계가 SAVEPOINT/RELEASE 로 실행됨)
+    EXPECTED_QUERIES = 18
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('chatter', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.character = Character.objects.create(
+            name='하루', creator=cls.user, description='설명', personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=genre, tags='위로',
+        )
+
+    def setUp(self):
+        # 잔액/멱등 키 캐시가 이전 테스트의 (롤백된) 값을 들고 있지 않도록
+        cache.clear()
+        self.original_backend = gemini_service.backend
+        self.original_initialised = gemini_service._initialised
+        gemini_service.backend = StubBackend(
+            latency='fixed', latency_ms=0, first_token_ms=0, chunk_delay_ms=0, seed=1
+        )
+        gemini_service._initialised = False
+        self.conversation = Conversation.objects.create(user=self.user, character=self.character)
+        self.client.force_login(self.user)
+        self.url = reverse('characters:send_message', args=[self.conversation.pk])
+
+    def tearDown(self):
+        gemini_service.backend = self.original_backend
+        gemini_service._initialised = self.original_initialised
+
+    def send(self, message):
+        return self.client.post(
+            self.url, json.dumps({'message': message}),
+            content_type='application/json', secure=True,
+        ).json()
+
+    def test_turn_query_count_is_constant(self):
+        self.send('안녕하세요')
+        for message in ('오늘 좀 힘들었어요', '고마워요'):
+            with self.assertNumQueries(self.EXPECTED_QUERIES):
+                data = self.send(message)
+            self.assertTrue(data['success'])
+
+    def test_turn_persists_messages_counters_and_credits(self):
+        data = self.send('첫 메시지입니다')
+        self.assertTrue(data['success'])
+
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual(conversation.message_count, 2)
+        self.assertEqual(conversation.title, '첫 메시지입니다')
+        self.assertEqual(
+            list(conversation.messages.order_by('timestamp', 'id').values_list('sender', flat=True)),
+            ['user', 'character'],
+        )
+        self.assertEqual(Character.objects.get(pk=self.character.pk).total_conversations, 1)
+
+        credit = UserCredit.objects.get(user=self.user)
+        self.assertEqual(data['remaining_credits'], credit.free_credits)
+        self.assertTrue(CreditLedgerEntry.objects.filter(user=self.user, kind='debit').exists())
+
+        reply = conversation.messages.get(sender='character')
+        self.assertGreater(reply.input_tokens, 0)
+        self.assertGreater(reply.output_tokens, 0)
+        usage = TokenUsageDaily.objects.get(user=self.user, character=self.character)
+        self.assertEqual(usage.turns, 1)
+        self.assertEqual(usage.input_tokens, reply.input_tokens)
+        self.assertEqual(usage.output_tokens, reply.output_tokens)
+
+    def test_remaining_credits_reflect_concurrent_reservations(self):
+        conversation = chat_turn.load_conversation(self.conversation.pk, self.user)
+        loaded = conversation.credit_balance
+        # 대화를 읽은 뒤 같은 사용자의 다른 전송이 먼저 예약
+        credits.reserve(self.user.pk, 1, self.conversation.pk)
+
+        turn = chat_turn.prepare_turn(conversation, '안녕하세요')
+        self.assertEqual(turn.remaining_credits, loaded - 2)
+        self.assertEqual(turn.remaining_credits, UserCredit.objects.get(user=self.user).free_credits)
+        self.assertEqual(credits.balance(self.user.pk), loaded - 2)
+
+    def test_turn_after_stale_refund_debits_again(self):
+        conversation = chat_turn.load_conversation(self.conversation.pk, self.user)
+        turn = chat_turn.prepare_turn(conversation, '안녕하세요')
+        before = UserCredit.objects.get(user=self.user).free_credits
+        # 응답이 늦는 사이 미정산 예약 환불이 먼저 돌려줌
+        self.assertEqual(credits.refund_stale_reservations(older_than=timedelta(0)), 1)
+
+        chat_turn.finish_turn(turn, '응답', {})
+        self.assertEqual(UserCredit.objects.get(user=self.user).free_credits, before)
+        self.assertTrue(
+            CreditLedgerEntry.objects.filter(user=self.user, kind='debit', amount=-1).exists()
+        )
+        self.assertEqual(self.conversation.messages.count(), 2)
+
+    def test_turn_after_stale_refund_without_credits_is_not_saved(self):
+        conversation = chat_turn.load_conversation(self.conversation.pk, self.user)
+        turn = chat_turn.prepare_turn(conversation, '안녕하세요')
+        credits.refund_stale_reservations(older_than=timedelta(0))
+        UserCredit.objects.filter(user=self.user).update(free_credits=0)
+
+        with self.assertRaises(chat_turn.ReservationLost):
+            chat_turn.finish_turn(turn, '응답', {})
+        self.assertFalse(self.conversation.messages.exists())
+        self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 0)
+
+    def test_stream_disconnect_before_first_chunk_refunds(self):
+        before = UserCredit.objects.get(user=self.user).free_credits
+        response = self.client.post(
+            reverse('characters:send_message_stream', args=[self.conversation.pk]),
+            json.dumps({'message': '안녕하세요'}),
+            content_type='application/json', secure=True,
+        )
+        self.assertTrue(response.streaming)
+        # 첫 이벤트를 읽기 전에 연결 종료
+        response.close()
+
+        self.assertEqual(UserCredit.objects.get(user=self.user).free_credits, before)
+        self.assertEqual(
+            sorted(
+                CreditLedgerEntry.objects.filter(user=self.user, kind__in=['reserve', 'refund'])
+                .values_list('kind', 'amount')
+            ),
+            [('refund', 1), ('reserve', -1)],
+        )
+        self.assertFalse(self.conversation.messages.exists())
+
+    def test_insufficient_credits_skips_reservation(self):
+        UserCredit.objects.filter(user=self.user).update(free_credits=0)
+        data = self.send('안녕하세요')
+        self.assertFalse(data['success'])
+        self.assertFalse(self.conversation.messages.exists())
+        self.assertFalse(CreditLedgerEntry.objects.filter(user=self.user, kind='reserve').exists())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class IdempotentSendTests(TestCase):
+    """Idempotency-Key 재전송: 처리 중 / 저장된 응답 재사용 / 캐시가 비었을 때 DB 유일 제약"""
+
+    KEY = 'test-key-0001'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('retrier', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.character = Character.objects.create(
+            name='하루', creator=cls.user, description='설명', personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=genre, tags='위로',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.original_backend = gemini_service.backend
+        self.original_initialised = gemini_service._initialised
+        gemini_service.backend = StubBackend(
+            latency='fixed', latency_ms=0, first_token_ms=0, chunk_delay_ms=0, seed=1
+        )
+        gemini_service._initialised = False
+        self.conversation = Conversation.objects.create(user=self.user, character=self.character)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        gemini_service.backend = self.original_backend
+        gemini_service._initialised = self.original_initialised
+
+    def post(self, name, message='안녕하세요', key=KEY):
+        return self.client.post(
+            reverse(f'characters:{name}', args=[self.conversation.pk]),
+            json.dumps({'message': message}),
+            content_type='application/json', secure=True, HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def balance(self):
+        return UserCredit.objects.get(user=self.user).free_credits
+
+    def test_json_retry_replays_stored_response(self):
+        first = self.post('send_message').json()
+        before = self.balance()
+        second = self.post('send_message').json()
+
+        self.assertTrue(second['success'])
+        self.assertTrue(second['replayed'])
+        self.assertEqual(second['ai_response'], first['ai_response'])
+        self.assertEqual(self.balance(), before)
+        self.assertEqual(self.conversation.messages.count(), 2)
+
+    def test_stream_retry_replays_done_event(self):
+        first = b''.join(self.post('send_message_stream').streaming_content).decode()
+        second = b''.join(self.post('send_message_stream').streaming_content).decode()
+
+        self.assertIn('event: done', first)
+        self.assertTrue(second.startswith('event: done'))
+        self.assertIn('"replayed": true', second)
+        self.assertNotIn('event: chunk', second)
+        self.assertEqual(self.conversation.messages.count(), 2)
+
+    def test_retry_while_pending_is_rejected(self):
+        idempotency.claim(self.user.pk, self.conversation.pk, self.KEY)
+        data = self.post('send_message').json()
+        self.assertFalse(data['success'])
+        self.assertTrue(data['pending'])
+        self.assertFalse(CreditLedgerEntry.objects.filter(user=self.user, kind='reserve').exists())
+
+    def test_failed_turn_releases_key(self):
+        gemini_service.backend.error_rate = 1.0
+        self.assertFalse(self.post('send_message').json()['success'])
+        gemini_service.backend.error_rate = 0.0
+        self.assertTrue(self.post('send_message').json()['success'])
+        self.assertEqual(self.conversation.messages.count(), 2)
+
+    def test_duplicate_save_refunds_and_returns_first_reply(self):
+        first = self.post('send_message').json()
+        before = self.balance()
+        # 캐시의 선점 기록이 사라진 경우: 두 번째 저장은 유일 제약에 걸림
+        cache.clear()
+        second = self.post('send_message').json()
+
+        self.assertTrue(second['success'])
+        self.assertTrue(second['replayed'])
+        self.assertEqual(second['ai_response'], first['ai_response'])
+        self.assertEqual(second['credits_used'], 0)
+        self.assertEqual(self.balance(), before)
+        self.assertEqual(self.conversation.messages.count(), 2)
+        self.assertEqual(
+            CreditLedgerEntry.objects.filter(user=self.user, kind='refund').count(), 1
+        )
+
+    def test_invalid_key_is_rejected(self):
+        data = self.post('send_message', key='bad key!').json()
+        self.assertFalse(data['success'])
+        self.assertFalse(self.conversation.messages.exists())
+
+
+class CoalescedGenerationTests(SimpleTestCase):
+    """같은 프롬프트의 동시 생성은 업스트림 호출 한 번을 공유"""
+
+    class CountingStub(StubBackend):
+        calls = 0
+
+        def generate(self, *args, **kwargs):
+            type(self).calls += 1
+            return super().generate(*args, **kwargs)
+
+    def setUp(self):
+        self.original_backend = gemini_service.backend
+        self.original_initialised = gemini_service._initialised
+        self.CountingStub.calls = 0
+        gemini_service.backend = self.CountingStub(
+            latency='fixed', latency_ms=200, first_token_ms=0, chunk_delay_ms=0, seed=1
+        )
+        gemini_service._initialised = False
+
+    def tearDown(self):
+        gemini_service.backend = self.original_backend
+        gemini_service._initialised = self.original_initialised
+
+    def test_followers_share_result_with_zero_usage(self):
+        character = Character(name='하루', personality='다정함', genre=Genre(name='일상'))
+        contents = [{'role': 'user', 'parts': ['안녕하세요']}]
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(gemini_service.generate_text(character, contents)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.CountingStub.calls, 1)
+        self.assertEqual(len({text for text, _ in results}), 1)
+        leaders = [meta for _, meta in results if not meta.get('coalesced')]
+        followers = [meta for _, meta in results if meta.get('coalesced')]
+        self.assertEqual(len(leaders), 1)
+        self.assertGreater(leaders[0]['input_tokens'], 0)
+        self.assertEqual(len(followers), 3)
+        for meta in followers:
+            self.assertEqual(meta['input_tokens'], 0)
+            self.assertEqual(meta['output_tokens'], 0)
+        self.assertEqual(len(gemini_service.inflight), 0)
+
+
+class SingleFlightCancellationTests(SimpleTestCase):
+    """한 요청의 취소(연결 끊김)가 같은 키를 기다리는 다른 요청에 번지지 않음"""
+
+    def test_cancelled_follower_leaves_others_untouched(self):
+        async def scenario():
+            flight = SingleFlight()
+            release = asyncio.Event()
+
+            async def call():
+                await release.wait()
+                return 'reply'
+
+            leader = asyncio.create_task(flight.ado('k', call))
+            await asyncio.sleep(0)
+            gone, waiting = (asyncio.create_task(flight.ado('k', call)) for _ in range(2))
+            await asyncio.sleep(0)
+            gone.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(leader, waiting)
+            with self.assertRaises(asyncio.CancelledError):
+                await gone
+            return results, len(flight)
+
+        results, pending = asyncio.run(scenario())
+        self.assertEqual(results, [('reply', False), ('reply', True)])
+        self.assertEqual(pending, 0)
+
+    def test_cancelled_leader_hands_the_call_to_a_follower(self):
+        async def scenario():
+            flight = SingleFlight()
+            calls = []
+
+            async def call():
+                calls.append(1)
+                if len(calls) == 1:
+                    await asyncio.Event().wait()
+                await asyncio.sleep(0.05)
+                return 'reply'
+
+            leader = asyncio.create_task(flight.ado('k', call))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.ado('k', call)) for _ in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return results, len(calls), len(flight)
+
+        results, calls, pending = asyncio.run(scenario())
+        self.assertEqual(calls, 2)
+        self.assertEqual(sorted(results), [('reply', False), ('reply', True)])
+        self.assertEqual(pending, 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CounterTests(TestCase):
+    """대화/캐릭터 카운터의 원자적 증가와 버퍼 모드"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('counter', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.character = Character.objects.create(
+            name='하루', creator=cls.user, description='설명', personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=genre, tags='위로',
+        )
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create(user=self.user, character=self.character)
+
+    def test_increment_updates_row_in_place(self):
+        before = Conversation.objects.get(pk=self.conversation.pk).updated_at
+        counters.increment(
+            Conversation, self.conversation.pk, {'message_count': 3}, touch=True,
+            assign={'title': '제목'},
+        )
+        counters.increment(Conversation, self.conversation.pk, {'message_count': 2})
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual(conversation.message_count, 5)
+        self.assertEqual(conversation.title, '제목')
+        self.assertGreater(conversation.updated_at, before)
+
+    def test_record_turn_updates_rows_and_loaded_objects(self):
+        conversation = Conversation.objects.select_related('character').get(pk=self.conversation.pk)
+        counters.record_turn(conversation, user_messages=1, other_messages=1, title='첫 인사')
+        self.assertEqual(conversation.message_count, 2)
+        self.assertEqual(conversation.character.total_conversations, 1)
+
+        stored = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual((stored.message_count, stored.title), (2, '첫 인사'))
+        self.assertEqual(Character.objects.get(pk=self.character.pk).total_conversations, 1)
+
+    def test_buffered_increments_merge_until_flush(self):
+        buffer = counters.CounterBuffer(flush_interval=3600)
+        self.addCleanup(buffer.stop)
+        with mock.patch.object(counters, 'counter_buffer', buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    counters.increment(Conversation, self.conversation.pk, {'message_count': 2})
+            self.assertEqual(buffer.pending(), 1)
+            self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 0)
+
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 6)
+
+    def test_reconcile_fixes_drift(self):
+        Message.objects.create(conversation=self.conversation, sender='user', content='안녕')
+        Conversation.objects.filter(pk=self.conversation.pk).update(message_count=7)
+        call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 1)
+        self.assertEqual(Character.objects.get(pk=self.character.pk).total_conversations, 1)
+
+    @override_settings(COUNTER_BUFFERING=True)
+    def test_reconcile_refuses_while_workers_may_hold_deltas(self):
+        Conversation.objects.filter(pk=self.conversation.pk).update(message_count=7)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 7)
+
+        call_command('reconcile_counters', '--workers-drained', stdout=io.StringIO())
+        self.assertEqual(Conversation.objects.get(pk=self.conversation.pk).message_count, 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RatingAggregateTests(TestCase):
+    """평점 생성/수정/이동/삭제가 캐릭터 rating_sum/rating_count 에 증분 반영"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rater', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.first, cls.second = (
+            Character.objects.create(
+                name=name, creator=cls.user, description='설명', personality='다정함',
+                background_story='배경', speaking_style='존댓말', genre=genre,
+            )
+            for name in ('하루', '이틀')
+        )
+
+    def aggregates(self, character):
+        character = Character.objects.get(pk=character.pk)
+        return character.rating_sum, character.rating_count
+
+    def test_create_update_move_delete(self):
+        other = User.objects.create_user('rater2', password='pw')
+        CharacterRating.objects.create(user=other, character=self.first, rating=2)
+        rating = CharacterRating.objects.create(user=self.user, character=self.first, rating=4)
+        self.assertEqual(self.aggregates(self.first), (6, 2))
+
+        rating.rating = 5
+        rating.save()
+        self.assertEqual(self.aggregates(self.first), (7, 2))
+
+        # DB 에서 다시 읽은 평점 (from_db 로 저장 시점 값 기억)
+        rating = CharacterRating.objects.get(pk=rating.pk)
+        rating.character = self.second
+        rating.rating = 3
+        rating.save()
+        self.assertEqual(self.aggregates(self.first), (2, 1))
+        self.assertEqual(self.aggregates(self.second), (3, 1))
+
+        rating.delete()
+        self.assertEqual(self.aggregates(self.second), (0, 0))
+        self.assertEqual(self.aggregates(self.first), (2, 1))
+
+    def test_loaded_character_follows_delta(self):
+        rating = CharacterRating(user=self.user, character=self.first, rating=4)
+        rating.save()
+        self.assertEqual((self.first.rating_sum, self.first.rating_count), (4, 1))
+        self.assertEqual(self.first.average_rating, 4.0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CharacterFragmentCacheTests(TestCase):
+    """만든 사람 닉네임을 보여주는 조각은 프로필이 바뀌면 다시 렌더링"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('maker', email='maker@example.com', password='pw')
+        cls.user.profile.nickname = '처음이름'
+        cls.user.profile.save()
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.character = Character.objects.create(
+            name='하루', creator=cls.user, description='설명', personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=genre, tags='위로',
+            status='active', visibility='public',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def rename_and_fetch(self, url):
+        self.assertContains(self.client.get(url, secure=True), '처음이름')
+        profile = self.user.profile
+        profile.nickname = '바뀐이름'
+        profile.save()
+        return self.client.get(url, secure=True)
+
+    def test_detail_header_follows_creator_nickname(self):
+        response = self.rename_and_fetch(reverse('characters:character_detail', args=[self.character.pk]))
+        self.assertContains(response, '바뀐이름')
+        self.assertNotContains(response, '처음이름')
+
+    def test_list_card_follows_creator_nickname(self):
+        response = self.rename_and_fetch(reverse('characters:character_list'))
+        self.assertContains(response, '바뀐이름')
+        self.assertNotContains(response, '처음이름')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CharacterListCacheTests(TestCase):
+    """캐시된 첫 페이지에서도 비공개 전환/삭제한 캐릭터는 바로 빠짐"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lister', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.shown, cls.hidden = (
+            Character.objects.create(
+                name=name, creator=cls.user, description='설명', personality='다정함',
+                background_story='배경', speaking_style='존댓말', genre=genre,
+                status='active', visibility='public',
+            )
+            for name in ('보이는캐릭터', '숨길캐릭터')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('characters:character_list')
+
+    def names(self):
+        response = self.client.get(self.url, secure=True)
+        return [ch.name for ch in response.context['page_obj']]
+
+    def test_private_and_deleted_characters_leave_cached_page(self):
+        self.assertCountEqual(self.names(), ['보이는캐릭터', '숨길캐릭터'])
+
+        self.hidden.visibility = 'private'
+        self.hidden.save()
+        self.assertEqual(self.names(), ['보이는캐릭터'])
+
+        self.shown.delete()
+        self.assertEqual(self.names(), [])
+
+    def test_rows_are_fresh_while_order_is_cached(self):
+        self.names()
+        Character.objects.filter(pk=self.shown.pk).update(name='새이름')
+        self.assertIn('새이름', self.names())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TestCase):
+    """커서 페이지네이션: 앞/뒤 왕복, 동점 키, NULL 키, 잘못된 커서, 이전 메시지 API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pager', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        # 대화 수 동점이 여럿 (마지막 키 id 로만 구분)
+        for i, total in enumerate([3, 1, 3, 2, 3, 1, 2]):
+            Character.objects.create(
+                name=f'캐릭터{i}', creator=cls.user, description='설명', personality='다정함',
+                background_story='배경', speaking_style='존댓말', genre=genre,
+                total_conversations=total,
+            )
+        cls.conversation = Conversation.objects.create(
+            user=cls.user, character=Character.objects.first()
+        )
+        for i, seconds in enumerate([None, 1.0, None, 2.0, 1.0, None, 0.5]):
+            Message.objects.create(
+                conversation=cls.conversation, sender='character', content=f'메시지{i}',
+                generation_time=seconds,
+            )
+
+    def walk(self, paginator):
+        """첫 페이지부터 next 로 끝까지, 다시 previous 로 처음까지 (각 방향의 페이지 목록)"""
+        forward = [paginator.page()]
+        while forward[-1].has_next:
+            forward.append(paginator.page(forward[-1].next_cursor))
+        backward = [forward[-1]]
+        while backward[-1].has_previous:
+            backward.append(paginator.page(backward[-1].previous_cursor))
+        ids = lambda pages: [[obj.pk for obj in page] for page in pages]
+        return ids(forward), ids(reversed(backward))
+
+    def assert_round_trip(self, queryset, ordering, expected, per_page=2):
+        forward, backward = self.walk(KeysetPaginator(queryset, ordering, per_page))
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+
+    def test_ties_on_sort_key(self):
+        characters = list(Character.objects.all())
+        expected = [c.pk for c in sorted(characters, key=lambda c: (-c.total_conversations, -c.pk))]
+        self.assert_round_trip(Character.objects.all(), ('-total_conversations', '-id'), expected)
+        expected = [c.pk for c in sorted(characters, key=lambda c: (c.total_conversations, -c.pk))]
+        self.assert_round_trip(Character.objects.all(), ('total_conversations', '-id'), expected, per_page=3)
+
+    def test_nullable_key_sorts_null_first(self):
+        messages = list(Message.objects.filter(conversation=self.conversation))
+        smallest_first = lambda m: (m.generation_time is not None, m.generation_time or 0)
+        ascending = sorted(messages, key=lambda m: (smallest_first(m), m.pk))
+        self.assert_round_trip(
+            Message.objects.filter(conversation=self.conversation),
+            ('generation_time', 'id'), [m.pk for m in ascending],
+        )
+        descending = sorted(messages, key=lambda m: (smallest_first(m), m.pk), reverse=True)
+        self.assert_round_trip(
+            Message.objects.filter(conversation=self.conversation),
+            ('-generation_time', '-id'), [m.pk for m in descending], per_page=3,
+        )
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Character.objects.all(), ('-total_conversations', '-id'), 3)
+        first = [c.pk for c in paginator.page()]
+        for cursor in ('not-a-cursor', encode_cursor([1], 'next'),
+                       encode_cursor([1, 2], 'sideways'), encode_cursor(['x', 'y'], 'next')):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([c.pk for c in paginator.page(cursor)], first)
+
+    def test_conversation_messages_pages_backwards_in_time(self):
+        self.client.force_login(self.user)
+        url = reverse('characters:conversation_messages', args=[self.conversation.pk])
+        seen, cursor = [], None
+        with mock.patch('characters.views.MESSAGES_PER_PAGE', 3):
+            while True:
+                params = {'cursor': cursor} if cursor else {}
+                data = self.client.get(url, params, secure=True).json()
+                ids = [m['id'] for m in data['messages']]
+                # 한 페이지 안은 시간순, 다음 페이지는 더 오래된 메시지
+                self.assertEqual(ids, sorted(ids))
+                seen = ids + seen
+                cursor = data['older_cursor']
+                if cursor is None:
+                    break
+        self.assertEqual(
+            seen, list(self.conversation.messages.order_by('timestamp', 'id').values_list('id', flat=True))
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CharacterSearchTests(TestCase):
+    """FTS5 음절 2-gram 구문 검색과 색인 동기화 (테스트 DB 는 SQLite)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('seeker', password='pw')
+        cls.genre = Genre.objects.create(name='일상', description='일상')
+        cls.cat = cls.make('고양이집사', description='고양이를 돌보는 집사', tags='반려동물')
+        cls.greeting = cls.make('인사봇', description='안녕 하세요 라고 띄어 말함', tags='인사')
+        cls.swapped = cls.make('하세요안녕', description='거꾸로 인사', tags='')
+
+    @classmethod
+    def make(cls, name, description, tags):
+        return Character.objects.create(
+            name=name, creator=cls.user, description=description, personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=cls.genre, tags=tags,
+        )
+
+    def found(self, query):
+        qs, ranked = search(Character.objects.all(), query)
+        return set(qs.values_list('name', flat=True)), ranked
+
+    def test_bigram_phrase_matches_substrings_only(self):
+        self.assertEqual(self.found('양이집'), ({'고양이집사'}, True))
+        # 2-gram 이 모두 있어도 이어져 있지 않으면 (띄어 쓴 "안녕 하세요", 순서가 바뀐 이름) 제외
+        self.assertEqual(self.found('안녕하세'), (set(), True))
+        self.assertEqual(self.found('안녕'), ({'인사봇', '하세요안녕'}, True))
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.found('고양이 집사'), ({'고양이집사'}, True))
+        self.assertEqual(self.found('고양이 인사'), (set(), True))
+
+    def test_name_match_ranks_above_description_match(self):
+        self.make('집사', description='평범한 설명', tags='')
+        self.make('정원사', description='집사 일을 돕는 정원사', tags='')
+        qs, ranked = search(Character.objects.all(), '집사')
+        names = list(qs.order_by('-search_rank').values_list('name', flat=True))
+        self.assertTrue(ranked)
+        self.assertLess(names.index('집사'), names.index('정원사'))
+
+    def test_single_syllable_query_falls_back_to_icontains(self):
+        self.assertEqual(self.found('묘'), (set(), False))
+        self.assertEqual(self.found('봇'), ({'인사봇'}, False))
+
+    def test_index_follows_save_and_delete(self):
+        self.cat.name = '강아지집사'
+        self.cat.description = '강아지를 돌보는 집사'
+        self.cat.save()
+        self.assertEqual(self.found('고양이')[0], set())
+        self.assertIn('강아지집사', self.found('강아지')[0])
+
+        pk = self.cat.pk
+        self.cat.delete()
+        self.assertEqual(self.found('강아지')[0], set())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE rowid = %s', [pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_counter_only_saves_skip_reindexing(self):
+        with mock.patch('characters.search.index_character') as index:
+            self.cat.save(update_fields=['total_conversations'])
+            index.assert_not_called()
+            self.cat.save(update_fields=['name', 'total_conversations'])
+            index.assert_called_once_with(self.cat)
+
+
+class PromptBudgeterTests(SimpleTestCase):
+    """토큰 예산 안에서 요약 턴이 최근 메시지보다 먼저 자리를 잡는지 (한글 1글자 = 1토큰, 메시지당 +4)"""
+
+    PERSONA = '가' * 10                                # 10
+    USER_MESSAGE = '나' * 6                            # 10
+    RECENT = [('user', '하나' * 3), ('character', '두울' * 3), ('user', '세엣' * 3)]  # 각 10
+
+    def fit(self, budget, summary_turn):
+        history, used = PromptBudgeter(budget).fit(self.PERSONA, self.RECENT, self.USER_MESSAGE, summary_turn)
+        return [turn['content'] for turn in history], used
+
+    def test_summary_then_newest_messages_within_budget(self):
+        self.assertEqual(self.fit(50, '요' * 6), (['요' * 6, '두울' * 3, '세엣' * 3], 50))
+        self.assertEqual(self.fit(1000, ''), ([content for _, content in self.RECENT], 50))
+
+    def test_recent_messages_are_dropped_before_the_summary(self):
+        self.assertEqual(self.fit(39, '요' * 6), (['요' * 6], 30))
+
+    def test_summary_dropped_when_it_alone_overflows(self):
+        # 요약(44) 이 들어갈 자리가 없으면 요약을 빼고 최근 메시지로 채움
+        self.assertEqual(self.fit(45, '요' * 40), (['두울' * 3, '세엣' * 3], 40))
+
+    def test_persona_over_budget_keeps_only_the_new_message(self):
+        with self.assertLogs('characters.token_usage', 'WARNING'):
+            self.assertEqual(self.fit(15, '요' * 6), ([], 20))
+
+
+class SummaryScheduleTests(SimpleTestCase):
+
+    def test_is_due_after_recent_window_plus_interval_turns(self):
+        threshold = summaries.RECENT_WINDOW + 2 * 5
+        self.assertFalse(summaries.is_due(threshold - 1))
+        self.assertTrue(summaries.is_due(threshold))
+
+    @override_settings(CONVERSATION_SUMMARY_INTERVAL=2)
+    def test_threshold_follows_interval_setting(self):
+        self.assertEqual(summaries.history_limit(), summaries.RECENT_WINDOW + 4)
+        self.assertFalse(summaries.is_due(summaries.RECENT_WINDOW + 3))
+        self.assertTrue(summaries.is_due(summaries.RECENT_WINDOW + 4))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConversationSummaryTests(TestCase):
+    """창 밖 메시지를 요약으로 접는 summarize_conversation (스텁 complete 는 입력 앞부분을 돌려줌)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('summarizer', password='pw')
+        genre = Genre.objects.create(name='일상', description='일상')
+        cls.character = Character.objects.create(
+            name='하루', creator=cls.user, description='설명', personality='다정함',
+            background_story='배경', speaking_style='존댓말', genre=genre, tags='위로',
+        )
+
+    def setUp(self):
+        self.original_backend = gemini_service.backend
+        self.original_initialised = gemini_service._initialised
+        gemini_service.backend = StubBackend(latency='fixed', latency_ms=0, seed=1)
+        gemini_service._initialised = False
+        self.conversation = Conversation.objects.create(user=self.user, character=self.character)
+
+    def tearDown(self):
+        gemini_service.backend = self.original_backend
+        gemini_service._initialised = self.original_initialised
+
+    def add_messages(self, count):
+        return [
+            Message.objects.create(
+                conversation=self.conversation, sender='user' if i % 2 == 0 else 'character',
+                content=f'메시지 {i}',
+            )
+            for i in range(count)
+        ]
+
+    def test_folds_messages_outside_the_recent_window(self):
+        messages = self.add_messages(summaries.RECENT_WINDOW + 3)
+        self.assertTrue(summaries.summarize_conversation(self.conversation.pk))
+
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual(conversation.summary_last_message_id, messages[2].pk)
+        self.assertIn('사용자: 메시지 0', conversation.summary)
+        self.assertNotIn('메시지 3', conversation.summary)
+        self.assertEqual(len(summaries.recent_messages(conversation)), summaries.RECENT_WINDOW)
+
+    def test_nothing_to_fold_within_the_recent_window(self):
+        self.add_messages(summaries.RECENT_WINDOW)
+        with mock.patch.object(gemini_service, 'complete_text') as complete:
+            self.assertFalse(summaries.summarize_conversation(self.conversation.pk))
+        complete.assert_not_called()
+
+    def test_concurrent_summary_wins_the_conditional_update(self):
+        messages = self.add_messages(summaries.RECENT_WINDOW + 3)
+
+        def concurrent_run_commits_first(system_instruction, contents):
+            # 같은 대화의 다른 요약 작업이 먼저 저장함
+            Conversation.objects.filter(pk=self.conversation.pk).update(
+                summary='먼저 저장된 요약', summary_last_message_id=messages[1].pk,
+            )
+            return '늦게 계산된 요약'
+
+        with mock.patch.object(gemini_service, 'complete_text', side_effect=concurrent_run_commits_first):
+            self.assertFalse(summaries.summarize_conversation(self.conversation.pk))
+
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertEqual(
+            (conversation.summary, conversation.summary_last_message_id),
+            ('먼저 저장된 요약', messages[1].pk),
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CreditReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('payer', password='pw')
+        UserCredit.objects.filter(user=self.user).update(free_credits=5)
+
+    def balance(self):
+        return UserCredit.objects.get(user=self.user).free_credits
+
+    def test_settlement_happens_once(self):
+        reservation = credits.reserve(self.user.pk, 1)
+        self.assertTrue(credits.commit(reservation))
+        self.assertFalse(credits.commit(reservation))
+        self.assertFalse(credits.refund(reservation))
+        self.assertEqual(self.balance(), 4)
+
+        reservation = credits.reserve(self.user.pk, 1)
+        self.assertTrue(credits.refund(reservation))
+        self.assertFalse(credits.refund(reservation))
+        self.assertFalse(credits.commit(reservation))
+        self.assertEqual(self.balance(), 4)
+
+    def test_stale_reservations_are_refunded(self):
+        stale = credits.reserve(self.user.pk, 1)
+        fresh = credits.reserve(self.user.pk, 1)
+        settled = credits.reserve(self.user.pk, 1)
+        credits.commit(settled)
+        CreditLedgerEntry.objects.filter(pk__in=[stale.pk, settled.pk]).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(credits.refund_stale_reservations(timedelta(minutes=15), dry_run=True), 1)
+        self.assertEqual(credits.refund_stale_reservations(timedelta(minutes=15)), 1)
+        self.assertEqual(self.balance(), 3)
+        self.assertTrue(stale.settlements.filter(kind='refund').exists())
+        self.assertFalse(fresh.settlements.exists())
+        # 이미 환불된 예약은 다시 대상이 되지 않음
+        self.assertEqual(credits.refund_stale_reservations(timedelta(minutes=15)), 0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConcurrentReservationTests(TransactionTestCase):
+    def test_concurrent_reserve_never_overdraws(self):
+        cache.clear()
+        user = User.objects.create_user('racer', password='pw')
+        UserCredit.objects.filter(user=user).update(free_credits=3)
+        workers = 8
+        barrier = threading.Barrier(workers)
+        results = []
+
+        def reserve():
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        results.append(credits.reserve(user.pk, 1) is not None)
+                        return
+                    except OperationalError:
+                        # 테스트용 메모리 SQLite 는 잠금을 기다리지 않고 바로 실패 (파일 DB 의 busy timeout 대신 재시도)
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(UserCredit.objects.get(user=user).free_credits, 0)
+        self.assertEqual(CreditLedgerEntry.objects.filter(user=user, kind='reserve').count(), 3)
+
+
+class PersonaContextCacheTests(SimpleTestCase):
+    """LocalContextCacheBackend 로 본 페르소나 컨텍스트 캐시 수명 (시계는 고정)"""
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('characters.context_cache.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.backend = LocalContextCacheBackend(model_factory=lambda handle: handle.name)
+        self.cache = PersonaContextCache(
+            self.backend, ttl_seconds=3600, refresh_margin=60, retry_after=600, maxsize=2,
+        )
+
+    def character(self, pk, personality='다정함'):
+        return SimpleNamespace(
+            pk=pk, name=f'캐릭터{pk}', genre_id=1, personality=personality,
+            background_story='배경', speaking_style='존댓말',
+        )
+
+    def model_for(self, character, persona='페르소나'):
+        return self.cache.model_for(character, persona, 'models/stub', {}, None)
+
+    def test_reuses_handle_until_persona_version_changes(self):
+        first = self.model_for(self.character(1))
+        self.assertEqual(self.model_for(self.character(1)), first)
+        self.assertEqual(len(self.backend.created), 1)
+
+        second = self.model_for(self.character(1, personality='냉정함'))
+        self.assertNotEqual(second, first)
+        self.assertEqual([handle.name for handle in self.backend.deleted], [first])
+
+    def test_refreshes_within_margin_of_expiry(self):
+        first = self.model_for(self.character(1))
+        self.now += 3600 - 61
+        self.assertEqual(self.model_for(self.character(1)), first)
+        self.now += 2
+        self.assertNotEqual(self.model_for(self.character(1)), first)
+        self.assertEqual(len(self.backend.created), 2)
+
+    def test_failed_upload_is_not_retried_until_retry_window_passes(self):
+        self.backend.min_chars = 100
+        self.assertIsNone(self.model_for(self.character(1)))
+        self.backend.min_chars = 0
+
+        self.now += 599
+        self.assertIsNone(self.model_for(self.character(1)))
+        self.assertEqual(len(self.backend.created), 0)
+        # 실패 기록은 캐릭터 버전 단위라 수정된 페르소나는 바로 시도
+        self.assertIsNotNone(self.model_for(self.character(1, personality='냉정함')))
+
+        self.now += 2
+        self.assertIsNotNone(self.model_for(self.character(1)))
+        self.assertEqual(len(self.backend.created), 2)
+
+    def test_eviction_deletes_the_oldest_handle(self):
+        first = self.model_for(self.character(1))
+        second = self.model_for(self.character(2))
+        self.model_for(self.character(1))  # 1 을 최근 사용으로
+        self.model_for(self.character(3))
+        self.assertEqual([handle.name for handle in self.backend.deleted], [second])
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.model_for(self.character(1)), first)
+
+        self.cache.clear()
+        self.assertEqual(len(self.backend.deleted), 3)
+        self.assertTrue(all(handle.deleted for handle in self.backend.created))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_transient_failures(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, cooldown=60)
+        breaker.record(resilience.TRANSIENT)
+        breaker.record(None)  # 성공이 연속 실패 수를 초기화
+        breaker.record(resilience.TRANSIENT)
+        self.assertEqual(breaker.state, resilience.CLOSED)
+        breaker.record(resilience.TRANSIENT)
+        self.assertEqual(breaker.state, resilience.OPEN)
+        with self.assertRaises(resilience.CircuitOpen):
+            breaker.allow()
+
+    def test_rate_limits_and_permanent_errors_do_not_trip(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record(resilience.RATE_LIMITED)
+        breaker.record(resilience.PERMANENT)
+        self.assertEqual(breaker.state, resilience.CLOSED)
+
+    def test_late_success_does_not_close_open_circuit(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=2, cooldown=60)
+        breaker.record(resilience.TRANSIENT)
+        breaker.record(resilience.TRANSIENT)
+        breaker.record(None)
+        self.assertEqual(breaker.state, resilience.OPEN)
+
+    def test_half_open_allows_one_probe(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record(resilience.TRANSIENT)
+        self.assertEqual(breaker.state, resilience.HALF_OPEN)
+        breaker.allow()
+        with self.assertRaises(resilience.CircuitOpen):
+            breaker.allow()
+        # 판단할 수 없는 결과면 시험 자리만 돌려받음
+        breaker.record(resilience.RATE_LIMITED)
+        breaker.allow()
+
+    def test_half_open_probe_success_closes_and_failure_reopens(self):
+        breaker = resilience.CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record(resilience.TRANSIENT)
+        breaker.allow()
+        breaker.record(None)
+        self.assertEqual(breaker.state, resilience.CLOSED)
+
+        breaker = resilience.CircuitBreaker(failure_threshold=1, cooldown=60)
+        breaker.record(resilience.TRANSIENT)
+        breaker.cooldown = 0
+        breaker.allow()
+        breaker.cooldown = 60
+        breaker.record(resilience.TRANSIENT)
+        self.assertEqual(breaker.state, resilience.OPEN)
+
+    def test_classify(self):
+        from .llm_backends import StubBackendError
+        self.assertEqual(resilience.classify(StubBackendError('x', code=429)), resilience.RATE_LIMITED)
+        self.assertEqual(resilience.classify(StubBackendError('x', code=503)), resilience.TRANSIENT)
+        self.assertEqual(resilience.classify(TimeoutError()), resilience.TRANSIENT)
+        self.assertEqual(resilience.classify(RuntimeError('500 Internal')), resilience.TRANSIENT)
+        self.assertEqual(resilience.classify(RuntimeError('empty_response')), resilience.PERMANENT)
+        self.assertEqual(resilience.classify(ValueError('contains 5 things')), resilience.PERMANENT)
+
+
+class CancelledUpstreamCallTests(SimpleTestCase):
+    """취소된 업스트림 호출은 서킷/동시 호출 상한에 성공으로 세지 않음"""
+
+    def setUp(self):
+        self.service = GeminiChatService(backend=StubBackend(latency='fixed', latency_ms=0))
+        # 서킷을 연 뒤 cooldown 0 으로 바로 half-open
+        for _ in range(self.service.breaker.failure_threshold):
+            self.service.breaker.record_failure()
+        self.service.breaker.cooldown = 0
+        self.limit = self.service.limiter.limit
+
+    def assert_untouched(self):
+        self.assertEqual(self.service.breaker.state, resilience.HALF_OPEN)
+        # 시험 호출 자리가 돌아와 다음 요청이 다시 시험할 수 있음
+        self.service.breaker.allow()
+        self.assertEqual(self.service.limiter.limit, self.limit)
+        self.assertEqual(self.service.limiter.inflight, 0)
+
+    def test_cancelled_async_probe_is_neutral(self):
+        async def call():
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.service._acall_upstream(call))
+        self.assert_untouched()
+
+    def test_interrupted_sync_probe_is_neutral(self):
+        def call():
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.service._call_upstream(call)
+        self.assert_untouched()
+
+
+class AIMDLimiterTests(SimpleTestCase):
+    def test_fast_successes_increase_limit(self):
+        limiter = resilience.AIMDLimiter(initial=4, max_limit=6, latency_target=1.0)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.01, None)
+        self.assertEqual(limiter.limit, 6)
+        self.assertEqual(limiter.inflight, 0)
+
+    def test_rate_limit_halves_limit_once_per_window(self):
+        limiter = resilience.AIMDLimiter(initial=8, latency_target=60)
+        limiter.acquire()
+        limiter.release(0.01, resilience.RATE_LIMITED)
+        self.assertEqual(limiter.limit, 4)
+        limiter.acquire()
+        limiter.release(0.01, resilience.RATE_LIMITED)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_slow_call_decreases_limit_down_to_minimum(self):
+        limiter = resilience.AIMDLimiter(initial=2, min_limit=1, latency_target=0)
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(1.0, None)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_full_limiter_raises_overloaded(self):
+        limiter = resilience.AIMDLimiter(initial=1, queue_timeout=0)
+        limiter.acquire()
+        with self.assertRaises(resilience.Overloaded):
+            limiter.acquire()
+        limiter.release(0.01, None)
+        limiter.acquire()
@@ -0,0 +1,67 @@
+"""
+텍스트 정규화 / 한국어 음절 n-gram
+
+검색 색인, 감정 키워드 매칭, 태그가 같은 규칙으로 문자열을 비교하도록 한곳에 모아 둔다.
+- normalize: NFKC(자모 조합형/전각 문자 통일) + 소문자 + 연속 공백 하나로
+- syllable_ngrams: 형태소 분석기 없이 쓰는 음절 2-gram ("고양이" -> "고양", "양이")
+- normalize_tag / parse_tags: 쉼표로 구분된 태그 입력 -> 정규화된 태그 목록
+"""
+import re
+import unicodedata
+from typing import List
+
+NGRAM_SIZE = 2
+TAG_MAX_LENGTH = 50
+
+_WORD_RE = re.compile(r'\w+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """비교용 정규화 (NFKC + 소문자 + 공백 정리)"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def words(text: str) -> List[str]:
+    """정규화된 단어(문자/숫자 연속) 목록"""
+    return _WORD_RE.findall(normalize(text))
+
+
+def syllable_ngrams(word: str, n: int = NGRAM_SIZE) -> List[str]:
+    """단어 하나의 음절 n-gram 목록 (n 글자보다 짧은 단어는 그대로)"""
+    if len(word) < n:
+        return [word]
+    return [word[i:i + n] for i in range(len(word) - n + 1)]
+
+
+def ngram_text(text: str) -> str:
+    """색인용 텍스트: 단어들을 음절 n-gram 으로 펼쳐 공백으로 연결"""
+    return ' '.join(gram for word in words(text) for gram in syllable_ngrams(word))
+
+
+def query_ngrams(query: str) -> List[List[str]]:
+    """검색어 -> 단어별 n-gram 목록 (n 글자 미만 단어는 제외, 중복 제거)"""
+    phrases = []
+    for word in words(query):
+        if len(word) < NGRAM_SIZE:
+            continue
+        grams = syllable_ngrams(word)
+        if grams not in phrases:
+            phrases.append(grams)
+    return phrases
+
+
+def normalize_tag(tag: str) -> str:
+    """태그 하나 정규화 (앞의 # 제거, 길이 제한)"""
+    return normalize(tag).lstrip('#').strip()[:TAG_MAX_LENGTH]
+
+
+def parse_tags(raw: str) -> List[str]:
+    """쉼표로 구분된 태그 입력 -> 정규화된 태그 목록 (입력 순서 유지, 중복 제거)"""
+    tags = []
+    for part in (raw or '').split(','):
+        tag = normalize_tag(part)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
@@ -0,0 +1,116 @@
+"""
+토큰 사용량 집계 / 프롬프트 토큰 예산
+
+- record_usage: 턴 하나의 토큰 수를 TokenUsageDaily(일자, 사용자, 캐릭터) 행에 누적.
+  INSERT ... ON CONFLICT DO UPDATE 한 번으로 처리해 턴당 쿼리 1번 (SQLite/PostgreSQL)
+- PromptBudgeter: 페르소나 + 요약 + 최근 메시지 + 이번 메시지의 추정 토큰이
+  CONVERSATION_PROMPT_TOKEN_BUDGET 을 넘지 않도록 오래된 메시지부터 덜어냄.
+  추정은 llm_backends.estimate_tokens (API 호출 없음), 실제 사용량은 백엔드 usage_metadata 로 기록
+"""
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .llm_backends import estimate_tokens
+from .models import TokenUsageDaily
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cached_tokens')
+# 메시지 하나의 역할/구분자 몫
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# -----------------------------
+# 집계
+# -----------------------------
+def _upsert_sql() -> str:
+    table = TokenUsageDaily._meta.db_table
+    columns = ('date', 'user_id', 'character_id', 'turns') + USAGE_FIELDS
+    updates = ', '.join(f'{c} = {table}.{c} + excluded.{c}' for c in ('turns',) + USAGE_FIELDS)
+    return (
+        f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT (date, user_id, character_id) DO UPDATE SET {updates}'
+    )
+
+
+def record_usage(user_id: int, character_id: int, meta: Dict, date=None):
+    """생성 메타데이터(input/output/cached_tokens)를 일별 집계에 더함"""
+    date = date or timezone.localdate()
+    values = [int(meta.get(field) or 0) for field in USAGE_FIELDS]
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(), [date, user_id, character_id, 1, *values])
+        return
+
+    # 그 외 DB: 조건부 UPDATE, 행이 없으면 생성 (동시 생성 충돌 시 UPDATE 재시도)
+    increments = {'turns': F('turns') + 1}
+    increments.update({field: F(field) + value for field, value in zip(USAGE_FIELDS, values)})
+    rows = TokenUsageDaily.objects.filter(date=date, user_id=user_id, character_id=character_id)
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            TokenUsageDaily.objects.create(
+                date=date, user_id=user_id, character_id=character_id, turns=1,
+                **dict(zip(USAGE_FIELDS, values)),
+            )
+    except IntegrityError:
+        rows.update(**increments)
+
+
+# -----------------------------
+# 프롬프트 예산
+# -----------------------------
+@lru_cache(maxsize=512)
+def persona_tokens(persona: str) -> int:
+    """페르소나 추정 토큰 (캐릭터가 수정되기 전까지 같은 문자열이므로 캐시)"""
+    return estimate_tokens(persona)
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptBudgeter:
+    """추정 토큰 예산 안에서 프롬프트 히스토리 구성"""
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = getattr(settings, 'CONVERSATION_PROMPT_TOKEN_BUDGET', 3000) if budget is None else budget
+
+    def fit(self, persona: str, recent: Sequence[Tuple[str, str]], user_message: str,
+            summary_turn: str = '') -> Tuple[List[Dict], int]:
+        """
+        (build_chat_contents 에 넘길 히스토리, 추정 토큰 수) 반환.
+        - 페르소나와 이번 메시지는 항상 포함
+        - 요약 턴(summary_turn)은 최근 메시지보다 먼저 자리를 잡고, 그것도 넘치면 뺌
+        - 최근 메시지는 최신부터 예산이 허락하는 만큼
+        """
+        used = persona_tokens(persona) + message_tokens(user_message)
+        if used > self.budget:
+            logger.warning("페르소나만으로 프롬프트 예산 초과 | persona=%d budget=%d",
+                           persona_tokens(persona), self.budget)
+
+        summary_cost = message_tokens(summary_turn) if summary_turn else 0
+        if summary_turn and used + summary_cost > self.budget:
+            summary_turn, summary_cost = '', 0
+
+        kept: List[Dict] = []
+        for sender, content in reversed(recent):
+            cost = message_tokens(content)
+            if used + summary_cost + cost > self.budget:
+                break
+            used += cost
+            kept.append({'sender': sender, 'content': content})
+        kept.reverse()
+
+        if summary_turn:
+            # 요약은 첫 사용자 턴으로 (페르소나 system_instruction 은 캐릭터별로 캐시되므로 넣지 않음)
+            kept.insert(0, {'sender': 'user', 'content': summary_turn})
+            used += summary_cost
+        return kept, used
@@ -21,5 +21,7 @@ urlpatterns = [
     # 대화 관련
     path('<int:character_id>/chat/', views.start_conversation, name='start_conversation'),
     path('chat/<int:conversation_id>/', views.conversation_view, name='conversation'),
+    path('chat/<int:conversation_id>/messages/', views.conversation_messages, name='conversation_messages'),
     path('chat/<int:conversation_id>/send/', views.send_message, name='send_message'),
+    path('chat/<int:conversation_id>/stream/', views.send_message_stream, name='send_message_stream'),
 ]
@@ -1,24 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, F, Case, When, FloatField
+from django.conf import settings
+import asyncio
 import json
 
-from .models import Character, Conversation, Message, UserCredit
+from .models import Character, Conversation, UserCredit
 from .forms import CharacterCreateForm
+from . import chat_turn, idempotency
 from .services import gemini_service
-from emotions.models import Emotion, Genre, EmotionKeyword
+from .resilience import LLMUnavailable
+from .recommendations import rank_by_recommendation
+from .pagination import CURSOR_PARAM, KeysetPage, KeysetPaginator
+from .search import search
+from .tagging import filter_by_tag, popular_tags
+from emotions import reference
+from hungry_jackie.cache import get_or_compute
+
+INSUFFICIENT_CREDITS_MESSAGE = '크레딧이 부족합니다. 관리자에게 문의하세요.'
+GENERATION_ERROR_MESSAGE = '죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요.'
+INVALID_REQUEST_MESSAGE = '잘못된 요청입니다.'
+PENDING_MESSAGE = '이전에 보낸 메시지를 처리하고 있습니다. 잠시만 기다려 주세요.'
+DEGRADED_MESSAGE = '지금은 캐릭터가 답장을 보내기 어려운 상태예요. 잠시 후 다시 말을 걸어 주세요. (크레딧은 차감되지 않았습니다)'
+
+CHARACTERS_PER_PAGE = 12
+# 대화 화면에 처음 보여 주는 / 위로 스크롤할 때 더 불러오는 메시지 수
+MESSAGES_PER_PAGE = 50
+MESSAGE_ORDERING = ('-timestamp', '-id')
+
 
 def generate_character_guide(emotion, genre):
     """감정-장르 조합에 따른 캐릭터 생성 가이드"""
     
     # 감정별 키워드 가져오기
-    emotion_keywords = list(EmotionKeyword.objects.filter(
-        emotion=emotion
-    ).order_by('-weight')[:8])
+    emotion_keywords = list(reference.snapshot().keywords_for(emotion.pk)[:8])
     
     # 감정-장르 조합별 가이드 데이터
     guide_templates = {
@@ -228,10 +245,10 @@ def character_create(request):
     # 감정과 장르가 모두 제공된 경우 가이드 생성
     if emotion_id and genre_id:
         try:
-            emotion = get_object_or_404(Emotion, id=emotion_id, is_active=True)
-            genre = get_object_or_404(Genre, id=genre_id)
+            emotion = reference.get_emotion_or_404(emotion_id)
+            genre = reference.get_genre_or_404(genre_id)
             character_guide = generate_character_guide(emotion, genre)
-        except (ValueError, Emotion.DoesNotExist, Genre.DoesNotExist):
+        except ValueError:
             # 잘못된 ID인 경우 무시하고 일반 생성 모드로
             pass
 
@@ -311,81 +328,103 @@ def my_characters(request):
     """내 캐릭터 목록 + 검색/정렬/공개범위 필터"""
     qs = Character.objects.filter(creator=request.user).select_related('genre')
 
-    # 검색
+    # 검색 (전문 검색 색인)
     q = request.GET.get('search', '').strip()
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q) |
-            Q(description__icontains=q) |
-            Q(tags__icontains=q)
-        )
+        qs, _ = search(qs, q)
 
     # 공개범위 필터 (public / private)
     vis = request.GET.get('visibility', '')
     if vis in ('public', 'private'):
         qs = qs.filter(visibility=vis)
 
-    # 정렬 (rating / created / updated)
+    # 정렬 (rating / created / updated) - 마지막 키는 id (커서 페이지네이션용 유일 키)
     sort = request.GET.get('sort', 'created_desc')
-    if sort == 'rating_desc':
-        qs = qs.order_by('-rating_count', '-rating_sum', '-created_at')
-    elif sort == 'rating_asc':
-        qs = qs.order_by('rating_count', 'rating_sum', '-created_at')
-    elif sort == 'created_asc':
-        qs = qs.order_by('created_at')
-    elif sort == 'updated_desc':
-        qs = qs.order_by('-updated_at')
-    elif sort == 'updated_asc':
-        qs = qs.order_by('updated_at')
-    else:
-        # 기본: 생성일 내림차순
-        qs = qs.order_by('-created_at')
+    orderings = {
+        'rating_desc': ('-rating_count', '-rating_sum', '-created_at', '-id'),
+        'rating_asc': ('rating_count', 'rating_sum', '-created_at', '-id'),
+        'created_asc': ('created_at', 'id'),
+        'updated_desc': ('-updated_at', '-id'),
+        'updated_asc': ('updated_at', 'id'),
+    }
+    # 기본: 생성일 내림차순
+    ordering = orderings.get(sort, ('-created_at', '-id'))
 
-    paginator = Paginator(qs, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = KeysetPaginator(qs, ordering, CHARACTERS_PER_PAGE).page(
+        request.GET.get(CURSOR_PARAM)
+    )
 
     return render(request, 'characters/my_characters.html', {
         'page_obj': page_obj,
-        'total_count': qs.count(),
         'search_query': q,
         'visibility_filter': vis,
         'sort': sort,
     })
 
 
+def _cached_first_page(cache_key, characters, paginator):
+    """
+    첫 페이지의 정렬 결과(id 와 커서)만 LISTING_CACHE_TTL 동안 캐시하고 행은 매번 다시 조회.
+    그 사이 비공개로 바뀌거나 삭제된 캐릭터는 다시 조회할 때 조건에 걸려 빠진다
+    """
+    def compute():
+        page = paginator.page()
+        return [obj.pk for obj in page], page.next_cursor, page.previous_cursor
+
+    ids, next_cursor, previous_cursor = get_or_compute(
+        cache_key, compute, getattr(settings, 'LISTING_CACHE_TTL', 30)
+    )
+    rows = characters.in_bulk(ids)
+    return KeysetPage(
+        object_list=[rows[pk] for pk in ids if pk in rows],
+        next_cursor=next_cursor,
+        previous_cursor=previous_cursor,
+    )
+
+
 def character_list(request):
     """공개 캐릭터 목록"""
     characters = Character.objects.filter(
         status='active',
         visibility='public'
-    ).select_related('creator', 'genre').annotate(
-        conversation_count=Count('conversation')
-    ).order_by('-total_conversations', '-created_at')
+    ).select_related('creator__profile', 'genre')
 
     # 장르 필터
     genre_id = request.GET.get('genre')
     if genre_id:
         characters = characters.filter(genre_id=genre_id)
 
-    # 검색
+    # 태그 필터 (정규화된 태그 정확히 일치)
+    tag = request.GET.get('tag', '').strip()
+    if tag:
+        characters = filter_by_tag(characters, tag)
+
+    # 검색 (전문 검색 색인, 검색 중에는 관련도순)
+    ordering = ('-total_conversations', '-created_at', '-id')
     search_query = request.GET.get('search', '').strip()
     if search_query:
-        characters = characters.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(tags__icontains=search_query)
+        characters, ranked = search(characters, search_query)
+        if ranked:
+            ordering = ('-search_rank', '-id')
+
+    cursor = request.GET.get(CURSOR_PARAM)
+    paginator = KeysetPaginator(characters, ordering, CHARACTERS_PER_PAGE)
+    genre = reference.snapshot().genre(genre_id) if genre_id else None
+    if not (cursor or tag or search_query) and (genre or not genre_id):
+        # 검색/태그 없는 첫 페이지(전체 또는 장르별)는 가장 많이 열리므로 정렬 결과만 공유 캐시에 잠깐 보관
+        page_obj = _cached_first_page(
+            f'character_list_ids:{genre.pk if genre else "all"}', characters, paginator
         )
-
-    paginator = Paginator(characters, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    else:
+        page_obj = paginator.page(cursor)
 
     return render(request, 'characters/character_list.html', {
         'page_obj': page_obj,
-        'genres': Genre.objects.all(),
-        'emotions': Emotion.objects.filter(is_active=True),
+        'genres': reference.snapshot().genres,
+        'emotions': reference.snapshot().active_emotions,
         'current_genre': genre_id,
+        'current_tag': tag,
+        'popular_tags': popular_tags(),
         'search_query': search_query,
     })
 
@@ -393,7 +432,7 @@ def character_list(request):
 def character_detail(request, character_id):
     """캐릭터 상세 페이지"""
     character = get_object_or_404(
-        Character.objects.select_related('creator', 'genre'),
+        Character.objects.select_related('creator__profile', 'genre'),
         id=character_id
     )
 
@@ -452,8 +491,11 @@ def conversation_view(request, conversation_id):
         user=request.user
     )
 
-    # 대화 메시지 목록
-    chat_messages = conversation.messages.order_by('timestamp')
+    # 최근 메시지 한 페이지만 (이전 메시지는 스크롤 시 conversation_messages 로 불러옴)
+    page = KeysetPaginator(
+        conversation.messages.all(), MESSAGE_ORDERING, MESSAGES_PER_PAGE
+    ).page()
+    chat_messages = page.object_list[::-1]
 
     # 사용자 크레딧 정보 (없으면 생성)
     user_credit, _ = UserCredit.objects.get_or_create(user=request.user)
@@ -461,22 +503,61 @@ def conversation_view(request, conversation_id):
     return render(request, 'characters/conversation.html', {
         'conversation': conversation,
         'chat_messages': chat_messages,  # ← 충돌 피하기 위해 이름 변경
+        'older_cursor': page.next_cursor,
         'user_credit': user_credit,
         'credit_cost': gemini_service.credit_cost,
     })
 
 
+@login_required
+@require_http_methods(["GET"])
+def conversation_messages(request, conversation_id):
+    """이전 메시지 불러오기 API (커서 기준으로 더 오래된 메시지, 시간순)"""
+    conversation = get_object_or_404(Conversation, id=conversation_id, user=request.user)
+
+    page = KeysetPaginator(
+        conversation.messages.only('id', 'sender', 'content', 'timestamp'),
+        MESSAGE_ORDERING,
+        MESSAGES_PER_PAGE,
+    ).page(request.GET.get(CURSOR_PARAM))
+
+    return JsonResponse({
+        'success': True,
+        'messages': [
+            {
+                'id': m.id,
+                'sender': m.sender,
+                'content': m.content,
+                'timestamp': m.timestamp.isoformat(),
+            }
+            for m in reversed(page.object_list)
+        ],
+        'older_cursor': page.next_cursor,
+    })
+
+
 @login_required
 @require_http_methods(["POST"])
-def send_message(request, conversation_id):
-    """메시지 전송 API"""
+async def send_message(request, conversation_id):
+    """메시지 전송 API (async)
+
+    Gemini 호출 대기 동안 워커를 점유하지 않도록 ORM 호출과 생성 모두 비동기로 처리한다.
+    DB 작업은 생성 전(대화/잔액 조회, 크레딧 예약, 히스토리)과 생성 후(메시지 저장,
+    통계, 예약 확정 트랜잭션)로 모아 처리한다 (chat_turn 참고).
+    Idempotency-Key 헤더가 있으면 같은 키의 재전송은 처리 중 응답 또는 저장된 응답을 받는다.
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+
     try:
-        conversation = get_object_or_404(
-            Conversation,
-            id=conversation_id,
-            user=request.user,
-            status='active'
-        )
+        key = idempotency.request_key(request)
+    except idempotency.InvalidKey:
+        return JsonResponse({'success': False, 'error': INVALID_REQUEST_MESSAGE})
+
+    claimed = False
+    try:
+        user = await request.auser()
+        conversation = await chat_turn.aload_conversation(conversation_id, user)
 
         data = json.loads(request.body)
         user_message = data.get('message', '').strip()
@@ -486,48 +567,224 @@ def send_message(request, conversation_id):
         if not is_valid:
             return JsonResponse({'success': False, 'error': error_message})
 
-        # 사용자 메시지 저장
-        Message.objects.create(
-            conversation=conversation,
-            sender='user',
-            content=user_message
-        )
+        # 프로바이더 장애로 서킷이 열려 있으면 예약/생성 없이 바로 안내
+        if not gemini_service.is_available():
+            return JsonResponse(dict(_degraded(gemini_service.retry_after()), success=False))
+
+        # 같은 키의 재전송
+        if key:
+            state, result = await idempotency.aclaim(user.pk, conversation.pk, key)
+            if state == idempotency.DONE:
+                return JsonResponse(dict(result, success=True, replayed=True))
+            if state == idempotency.PENDING:
+                return JsonResponse({'success': False, 'pending': True, 'error': PENDING_MESSAGE})
+            claimed = True
+
+        # 크레딧 예약 + 히스토리 준비
+        turn = await chat_turn.aprepare_turn(conversation, user_message, key)
+        if turn is None:
+            return JsonResponse({'success': False, 'error': INSUFFICIENT_CREDITS_MESSAGE})
+
+        # AI 응답 생성 (트랜잭션 밖)
+        try:
+            ai_response, metadata = await gemini_service.agenerate_text(
+                conversation.character, turn.contents
+            )
+        except LLMUnavailable as e:
+            await chat_turn.aabort_turn(turn)
+            return JsonResponse(dict(_degraded(e.retry_after), success=False))
+        except Exception as e:
+            await chat_turn.aabort_turn(turn)
+            logger.error(f"AI 응답 생성 오류: {str(e)}")
+            return JsonResponse({'success': False, 'error': GENERATION_ERROR_MESSAGE})
+        except asyncio.CancelledError:
+            # 클라이언트 연결이 끊겨 요청이 취소됨: 예약을 돌려주고 취소는 그대로 전달
+            await chat_turn.aabort_turn(turn)
+            raise
+
+        # 사용자/AI 메시지 저장 + 통계 + 크레딧 확정
+        try:
+            await chat_turn.afinish_turn(turn, ai_response, metadata)
+        except chat_turn.DuplicateTurn as duplicate:
+            result = _duplicate_result(turn, duplicate)
+        except chat_turn.ReservationLost:
+            return JsonResponse({'success': False, 'error': INSUFFICIENT_CREDITS_MESSAGE})
+        else:
+            result = {
+                'ai_response': ai_response,
+                'credits_used': metadata.get('credits_used', 0),
+                'remaining_credits': turn.remaining_credits,
+            }
+        if claimed:
+            await idempotency.acomplete(user.pk, conversation.pk, key, result)
+            claimed = False
+        return JsonResponse(dict(result, success=True))
 
-        # AI 응답 생성
-        ai_response, metadata = gemini_service.generate_response(conversation, user_message)
+    except Exception as e:
+        logger.error(f"메시지 전송 오류: {str(e)}")
+        return JsonResponse({'success': False, 'error': '메시지 전송 중 오류가 발생했습니다.'})
+    finally:
+        # 저장까지 가지 못했으면 같은 키로 다시 보낼 수 있게 선점 해제
+        if claimed:
+            await idempotency.arelease(user.pk, conversation.pk, key)
+
+
+def _duplicate_result(turn, duplicate):
+    """같은 키의 턴이 먼저 저장된 경우의 응답 (이번 예약은 환불됨)"""
+    return {
+        'ai_response': duplicate.reply or '',
+        'credits_used': 0,
+        'remaining_credits': turn.remaining_credits - turn.reservation.amount,
+        'replayed': True,
+    }
 
-        # 에러 처리
-        if 'error' in metadata:
-            return JsonResponse({'success': False, 'error': ai_response})
 
-        # AI 응답 저장
-        Message.objects.create(
-            conversation=conversation,
-            sender='character',
-            content=ai_response,
-            ai_model_used=metadata.get('ai_model_used', ''),
-            generation_time=metadata.get('generation_time')
-        )
+def _degraded(retry_after):
+    """LLM 보호 장치(서킷/동시 호출 상한)가 호출을 막았을 때의 안내 응답 본문"""
+    return {'error': DEGRADED_MESSAGE, 'degraded': True, 'retry_after': round(retry_after, 1)}
+
+
+def _sse(event, data):
+    """Server-Sent Events 한 건 직렬화"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-        # 대화 제목 자동 생성 (첫 쌍 교환 시)
-        if conversation.message_count == 2:
-            conversation.auto_generate_title()
 
-        # 안전하게 남은 크레딧 계산
-        user_credit, _ = UserCredit.objects.get_or_create(user=request.user)
+def _event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx 버퍼링 방지
+    return response
 
-        return JsonResponse({
-            'success': True,
-            'ai_response': ai_response,
-            'credits_used': metadata.get('credits_used', 0),
-            'remaining_credits': user_credit.total_credits
-        })
 
+def _stream_chat_events(turn):
+    """AI 응답 청크를 SSE로 흘려보내고, 완료되면 메시지를 저장"""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    conversation = turn.conversation
+    key = turn.idempotency_key
+    finished = False
+    try:
+        for event in gemini_service.stream_text(conversation.character, turn.contents):
+            if event['type'] == 'chunk':
+                yield _sse('chunk', {'text': event['text']})
+                continue
+
+            metadata = event['meta']
+            try:
+                chat_turn.finish_turn(turn, event['text'], metadata)
+            except chat_turn.DuplicateTurn as duplicate:
+                result = _duplicate_result(turn, duplicate)
+            except chat_turn.ReservationLost:
+                # 예약은 이미 환불됨: 저장 없이 안내 (멱등 키는 finally 에서 해제)
+                yield _sse('error', {'error': INSUFFICIENT_CREDITS_MESSAGE})
+                return
+            else:
+                result = {
+                    'ai_response': event['text'],
+                    'credits_used': metadata.get('credits_used', 0),
+                    'remaining_credits': turn.remaining_credits,
+                    'generation_time': metadata.get('generation_time'),
+                    'first_token_time': metadata.get('first_token_time'),
+                }
+            finished = True
+            if key:
+                idempotency.complete(conversation.user_id, conversation.pk, key, result)
+
+            yield _sse('done', result)
+    except GeneratorExit:
+        # 클라이언트가 응답 완료 전에 연결을 끊은 경우
+        if not finished:
+            chat_turn.abort_turn(turn)
+        raise
+    except LLMUnavailable as e:
+        if not finished:
+            chat_turn.abort_turn(turn)
+        yield _sse('error', _degraded(e.retry_after))
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"메시지 전송 오류: {str(e)}")
-        return JsonResponse({'success': False, 'error': '메시지 전송 중 오류가 발생했습니다.'})
+        if not finished:
+            chat_turn.abort_turn(turn)
+        logger.error(f"스트리밍 전송 오류: {str(e)}")
+        yield _sse('error', {'error': GENERATION_ERROR_MESSAGE})
+    finally:
+        if key and not finished:
+            idempotency.release(conversation.user_id, conversation.pk, key)
+
+
+class _ChatEventStream:
+    """
+    _stream_chat_events 를 감싼 응답 이터레이터.
+    첫 이벤트를 꺼내기 전에 연결이 끊기면 제너레이터가 시작되지 않아 그 안의
+    환불 처리가 실행되지 않으므로, 응답 close() 에서 예약 환불과 멱등 키 해제를 대신 한다
+    """
+
+    def __init__(self, turn):
+        self.turn = turn
+        self.started = False
+        self._events = _stream_chat_events(turn)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.started = True
+        return next(self._events)
+
+    def close(self):
+        if not self.started:
+            conversation = self.turn.conversation
+            chat_turn.abort_turn(self.turn)
+            if self.turn.idempotency_key:
+                idempotency.release(conversation.user_id, conversation.pk, self.turn.idempotency_key)
+            self.started = True
+        self._events.close()
+
+
+@login_required
+@require_http_methods(["POST"])
+def send_message_stream(request, conversation_id):
+    """메시지 전송 API (SSE 스트리밍)
+
+    검증 오류는 send_message와 같은 JSON으로, 정상 응답은
+    chunk / done / error 이벤트로 이루어진 text/event-stream으로 반환한다.
+    같은 Idempotency-Key 의 재전송이 이미 끝났으면 저장된 응답을 done 이벤트 하나로 돌려준다.
+    """
+    conversation = chat_turn.load_conversation(conversation_id, request.user)
+
+    try:
+        key = idempotency.request_key(request)
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': INVALID_REQUEST_MESSAGE})
+    user_message = data.get('message', '').strip()
+
+    is_valid, error_message = gemini_service.validate_user_message(user_message)
+    if not is_valid:
+        return JsonResponse({'success': False, 'error': error_message})
+
+    if not gemini_service.is_available():
+        return JsonResponse(dict(_degraded(gemini_service.retry_after()), success=False))
+
+    if key:
+        state, result = idempotency.claim(request.user.pk, conversation.pk, key)
+        if state == idempotency.DONE:
+            return _event_stream_response(iter([_sse('done', dict(result, replayed=True))]))
+        if state == idempotency.PENDING:
+            return JsonResponse({'success': False, 'pending': True, 'error': PENDING_MESSAGE})
+
+    try:
+        turn = chat_turn.prepare_turn(conversation, user_message, key)
+    except Exception:
+        if key:
+            idempotency.release(request.user.pk, conversation.pk, key)
+        raise
+    if turn is None:
+        if key:
+            idempotency.release(request.user.pk, conversation.pk, key)
+        return JsonResponse({'success': False, 'error': INSUFFICIENT_CREDITS_MESSAGE})
+
+    return _event_stream_response(_ChatEventStream(turn))
+
 
 def recommended_characters(request):
     """감정-장르 기반 캐릭터 추천"""
@@ -539,52 +796,42 @@ def recommended_characters(request):
         messages.error(request, '감정과 장르 정보가 필요합니다.')
         return redirect('emotions:emotion_selection')
 
-    emotion = get_object_or_404(Emotion, id=emotion_id, is_active=True)
-    genre = get_object_or_404(Genre, id=genre_id)
+    emotion = reference.get_emotion_or_404(emotion_id)
+    genre = reference.get_genre_or_404(genre_id)
 
     # 해당 장르의 활성 캐릭터들
     characters_qs = Character.objects.filter(
         genre=genre,
         status='active',
         visibility='public'
-    ).select_related('creator', 'genre').annotate(
-        conversation_count=Count('conversation')
-    )
+    ).select_related('creator', 'genre')
 
-    # 정렬 방식에 따른 처리
+    # 정렬 방식에 따른 처리 (모두 DB 정렬 + 커서 페이지네이션, 마지막 키는 유일한 id)
     if sort_type == 'recommended':
-        # 추천순: 감정 키워드 매칭 + 개인화 점수
-        characters_with_scores = []
-        
-        for character in characters_qs:
-            score = calculate_recommendation_score(character, emotion, request.user)
-            characters_with_scores.append((character, score))
-        
-        # 점수순 정렬
-        characters_with_scores.sort(key=lambda x: x[1], reverse=True)
-        characters = [item[0] for item in characters_with_scores]
-        
+        # 추천순: 사전 계산된 감정 키워드 점수 + 개인화 점수
+        characters = rank_by_recommendation(characters_qs, emotion, genre, request.user)
+        ordering = ('-recommendation_score', '-created_at', '-id')
+
     elif sort_type == 'rating':
         # 평점순
-        characters = characters_qs.order_by('-rating_count', '-rating_sum', '-created_at')
-        
+        characters = characters_qs
+        ordering = ('-rating_count', '-rating_sum', '-created_at', '-id')
+
     elif sort_type == 'popular':
         # 인기순 (대화수 기준)
-        characters = characters_qs.order_by('-total_conversations', '-created_at')
-        
+        characters = characters_qs
+        ordering = ('-total_conversations', '-created_at', '-id')
+
     else:
         # 기본값
-        characters = characters_qs.order_by('-created_at')
+        characters = characters_qs
+        ordering = ('-created_at', '-id')
 
-    # 페이지네이션
-    paginator = Paginator(characters, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cursor = request.GET.get(CURSOR_PARAM)
+    page_obj = KeysetPaginator(characters, ordering, CHARACTERS_PER_PAGE).page(cursor)
 
     # 감정 키워드 정보 (UI에 표시용)
-    emotion_keywords = EmotionKeyword.objects.filter(
-        emotion=emotion
-    ).order_by('-weight')[:5]  # 상위 5개 키워드만
+    emotion_keywords = reference.snapshot().keywords_for(emotion.pk)[:5]  # 상위 5개 키워드만
 
     context = {
         'emotion': emotion,
@@ -592,86 +839,8 @@ def recommended_characters(request):
         'page_obj': page_obj,
         'sort_type': sort_type,
         'emotion_keywords': emotion_keywords,
-        'total_count': len(characters) if sort_type == 'recommended' else characters_qs.count(),
+        # 전체 개수는 첫 페이지에서만 계산
+        'total_count': None if cursor else characters_qs.count(),
     }
 
     return render(request, 'characters/recommended_characters.html', context)
-
-
-def calculate_recommendation_score(character, emotion, user):
-    """캐릭터 추천 점수 계산"""
-    score = 0.0
-    
-    # 1. 감정 키워드 매칭 점수 (40%)
-    keyword_score = calculate_keyword_match_score(character, emotion)
-    score += keyword_score * 0.4
-    
-    # 2. 사용자 선호도 점수 (30%)
-    if user.is_authenticated:
-        preference_score = calculate_user_preference_score(character, user)
-        score += preference_score * 0.3
-    
-    # 3. 평점 점수 (20%)
-    rating_score = character.average_rating / 5.0  # 0-1로 정규화
-    score += rating_score * 0.2
-    
-    # 4. 인기도 점수 (10%)
-    max_conversations = Character.objects.aggregate(
-        max_conv=Count('conversation')
-    )['max_conv'] or 1
-    popularity_score = character.total_conversations / max_conversations
-    score += popularity_score * 0.1
-    
-    return score
-
-
-def calculate_keyword_match_score(character, emotion):
-    """감정 키워드 매칭 점수 계산"""
-    keywords = EmotionKeyword.objects.filter(emotion=emotion)
-    score = 0.0
-    max_possible_score = sum(kw.weight for kw in keywords)
-    
-    if max_possible_score == 0:
-        return 0.0
-    
-    # 캐릭터의 텍스트 필드들
-    text_fields = [
-        character.description or '',
-        character.personality or '',
-        character.background_story or '',
-        character.speaking_style or '',
-        character.tags or ''
-    ]
-    
-    combined_text = ' '.join(text_fields).lower()
-    
-    for keyword in keywords:
-        if keyword.keyword in combined_text:
-            score += keyword.weight
-    
-    # 0-1 범위로 정규화
-    return score / max_possible_score
-
-
-def calculate_user_preference_score(character, user):
-    """사용자 선호도 점수 계산"""
-    # 사용자의 대화 이력 기반 점수 계산
-    user_conversations = Conversation.objects.filter(
-        user=user,
-        status='active'
-    ).select_related('character__genre')
-    
-    if not user_conversations.exists():
-        return 0.5  # 중간값
-    
-    # 같은 장르 대화 비율
-    total_conversations = user_conversations.count()
-    same_genre_conversations = user_conversations.filter(
-        character__genre=character.genre
-    ).count()
-    
-    genre_preference = same_genre_conversations / total_conversations
-    
-    # 비슷한 캐릭터와의 대화 만족도 (평가가 있다면)
-    # 현재는 간단하게 장르 선호도만 반영
-    return genre_preference
\ No newline at end of file
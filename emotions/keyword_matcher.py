@@ -0,0 +1,180 @@
+"""
+감정 키워드 다중 패턴 매칭 (Aho-Corasick)
+
+감정별 EmotionKeyword 목록을 하나의 오토마톤으로 컴파일해 두고,
+캐릭터 텍스트를 한 번만 훑어서 모든 키워드의 등장 여부/횟수와 가중치를 구한다.
+컴파일된 매처는 프로세스 내에 캐시하며 키워드가 바뀌면 시그널로 무효화한다.
+(다른 워커 프로세스는 EMOTION_MATCHER_TTL 이 지나면 다시 컴파일)
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from characters.text import normalize
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    weight: float
+    count: int
+
+
+class KeywordMatch(NamedTuple):
+    hits: List[KeywordHit]
+    score: float  # 매칭된 키워드 가중치 합 / 전체 가중치 합 (0-1)
+
+
+class KeywordMatcher:
+    """(키워드, 가중치) 목록으로 만든 Aho-Corasick 오토마톤"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, float]]):
+        self.keywords: List[str] = []
+        self.weights: List[float] = []
+        for keyword, weight in keywords:
+            keyword = normalize(keyword)
+            if keyword:
+                self.keywords.append(keyword)
+                self.weights.append(float(weight))
+        self.total_weight = sum(self.weights)
+
+        # 상태 0 이 루트. goto[s][ch] -> 다음 상태, out[s] -> 상태 s 에서 끝나는 키워드 인덱스
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, keyword in enumerate(self.keywords):
+            self._insert(keyword, index)
+        self._build_failure_links()
+
+    def _insert(self, keyword: str, index: int):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(index)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                # 접미사로 끝나는 키워드도 함께 출력되도록 병합
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def counts(self, text: str) -> List[int]:
+        """키워드 인덱스별 등장 횟수 (text 는 text.normalize 로 정규화된 상태여야 함)"""
+        counts = [0] * len(self.keywords)
+        if not counts:
+            return counts
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                counts[index] += 1
+        return counts
+
+    def match(self, text: str) -> KeywordMatch:
+        """키워드별 적중 내역과 정규화 점수"""
+        counts = self.counts(text)
+        hits = [
+            KeywordHit(self.keywords[i], self.weights[i], count)
+            for i, count in enumerate(counts) if count
+        ]
+        return KeywordMatch(hits, self._normalise(counts))
+
+    def score(self, text: str) -> float:
+        return self._normalise(self.counts(text))
+
+    def _normalise(self, counts: List[int]) -> float:
+        if self.total_weight == 0:
+            return 0.0
+        matched = sum(weight for weight, count in zip(self.weights, counts) if count)
+        return matched / self.total_weight
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+class MatcherCache:
+    """emotion_id -> (컴파일 시각, KeywordMatcher)"""
+
+    def __init__(self, ttl_seconds: Optional[float] = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[float, KeywordMatcher]] = {}
+        # 컴파일 도중 무효화가 일어나면 그 결과는 캐시에 넣지 않음
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, emotion_id: int) -> KeywordMatcher:
+        return self.get_many([emotion_id])[emotion_id]
+
+    def get_many(self, emotion_ids: Optional[Iterable[int]] = None) -> Dict[int, KeywordMatcher]:
+        """
+        여러 감정의 매처를 한 번에 반환 (없거나 만료된 것만 한 쿼리로 컴파일).
+        emotion_ids 가 None 이면 키워드가 있는 모든 감정.
+        """
+        from .models import EmotionKeyword
+
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            if emotion_ids is None:
+                fresh = {}
+                missing = None
+            else:
+                emotion_ids = list(emotion_ids)
+                fresh = {}
+                for emotion_id in emotion_ids:
+                    entry = self._entries.get(emotion_id)
+                    if entry is not None and not self._expired(entry, now):
+                        fresh[emotion_id] = entry[1]
+                missing = [emotion_id for emotion_id in emotion_ids if emotion_id not in fresh]
+                if not missing:
+                    return fresh
+
+        qs = EmotionKeyword.objects.all()
+        if missing is not None:
+            qs = qs.filter(emotion_id__in=missing)
+        grouped: Dict[int, List[Tuple[str, float]]] = {emotion_id: [] for emotion_id in missing or []}
+        for emotion_id, keyword, weight in qs.values_list('emotion_id', 'keyword', 'weight'):
+            grouped.setdefault(emotion_id, []).append((keyword, weight))
+
+        compiled = {emotion_id: KeywordMatcher(keywords) for emotion_id, keywords in grouped.items()}
+        with self._lock:
+            if generation == self._generation:
+                for emotion_id, matcher in compiled.items():
+                    self._entries[emotion_id] = (now, matcher)
+        fresh.update(compiled)
+        return fresh
+
+    def _expired(self, entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry[0] > self.ttl_seconds
+
+    def invalidate(self, emotion_id: int):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(emotion_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+emotion_matchers = MatcherCache(ttl_seconds=getattr(settings, 'EMOTION_MATCHER_TTL', 300))
@@ -1,6 +1,8 @@
 # emotions/management/commands/setup_emotion_keywords.py
 from django.core.management.base import BaseCommand
 from emotions.models import Emotion, EmotionKeyword
+from characters.recommendations import deferred_rescoring
+from emotions.reference import reference_data
 
 
 class Command(BaseCommand):
@@ -19,6 +21,13 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # 키워드 저장마다 추천 점수를 다시 계산하지 않도록 끝날 때 감정별로 한 번만 재계산
+        with deferred_rescoring():
+            self.setup_keywords(options)
+        # 저장마다 시그널로도 무효화되지만, 다른 워커가 중간 상태 스냅샷을 들고 있지 않도록 마지막에 한 번 더
+        reference_data.invalidate()
+
+    def setup_keywords(self, options):
         if options['reset']:
             self.stdout.write(
                 self.style.WARNING('기존 감정 키워드를 삭제합니다...')
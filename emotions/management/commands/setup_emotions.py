@@ -1,6 +1,7 @@
 # emotions/management/commands/setup_emotions.py
 from django.core.management.base import BaseCommand
 from emotions.models import Emotion, Genre, EmotionGenreRecommendation
+from emotions.reference import reference_data
 
 
 class Command(BaseCommand):
@@ -254,6 +255,9 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f'✓ {emotion_name} → {genre_name} ({priority}순위) 매핑 생성됨')
                 )
 
+        # 저장마다 시그널로도 무효화되지만, 다른 워커가 중간 상태 스냅샷을 들고 있지 않도록 마지막에 한 번 더
+        reference_data.invalidate()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n성공적으로 초기 데이터가 설정되었습니다!\n'
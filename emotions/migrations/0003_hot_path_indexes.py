@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotions', '0002_emotionkeyword'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emotionkeyword',
+            index=models.Index(fields=['emotion', '-weight', 'keyword'], name='emotion_keyword_weight_idx'),
+        ),
+    ]
@@ -49,6 +49,9 @@ class EmotionKeyword(models.Model):
         verbose_name_plural = "감정 키워드들"
         unique_together = ['emotion', 'keyword']
         ordering = ['emotion', '-weight', 'keyword']
+        indexes = [
+            models.Index(fields=['emotion', '-weight', 'keyword'], name='emotion_keyword_weight_idx'),
+        ]
     
     def __str__(self):
         return f"{self.emotion.name} - {self.keyword} ({self.weight})"
@@ -110,4 +113,33 @@ class Work(models.Model):
         ordering = ['-rating', 'title']
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+# Signal: 키워드가 바뀌면 컴파일된 키워드 매처 무효화
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=EmotionKeyword)
+@receiver(post_delete, sender=EmotionKeyword)
+def invalidate_keyword_matcher(sender, instance, **kwargs):
+    from .keyword_matcher import emotion_matchers
+    emotion_matchers.invalidate(instance.emotion_id)
+
+
+# Signal: 기준 데이터가 바뀌면 스냅샷 캐시 무효화 (다음 조회 때 다시 읽음)
+@receiver(post_save, sender=Emotion)
+@receiver(post_delete, sender=Emotion)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=EmotionKeyword)
+@receiver(post_delete, sender=EmotionKeyword)
+@receiver(post_save, sender=EmotionGenreRecommendation)
+@receiver(post_delete, sender=EmotionGenreRecommendation)
+def invalidate_reference_data(sender, instance, **kwargs):
+    from django.db import transaction
+    from .reference import reference_data
+    reference_data.invalidate()
+    # 커밋 전에 다른 워커가 옛 데이터로 스냅샷을 다시 만들 수 있으므로 커밋 후 한 번 더
+    transaction.on_commit(reference_data.invalidate)
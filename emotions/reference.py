@@ -0,0 +1,163 @@
+"""
+기준 데이터(감정/장르/감정 키워드/감정-장르 추천) 스냅샷 캐시
+
+거의 모든 페이지가 읽지만 관리자만 바꾸는 작은 테이블들을 한 번에 읽어 버전이 붙은
+스냅샷으로 만들고, 프로세스 메모리와 공유 캐시(Django cache) 두 단계로 보관한다.
+- 공유 캐시에는 버전 번호와 버전별 스냅샷을 둔다 (다른 워커가 DB 를 다시 읽지 않도록)
+- 프로세스 메모리의 스냅샷은 REFERENCE_DATA_VERSION_CHECK 초마다 공유 버전과 비교
+- 모델 저장/삭제 시그널과 setup_emotions / setup_emotion_keywords 명령이 버전을 올려 무효화
+
+스냅샷의 모델 객체는 여러 요청이 공유하므로 수정하지 말 것 (필요하면 copy 후 사용).
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from hungry_jackie.cache import get_or_compute
+
+VERSION_KEY = 'reference_data:version'
+SNAPSHOT_KEY = 'reference_data:snapshot:{version}'
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    version: int
+    emotions: Tuple  # 전체 감정 (order, name 순)
+    genres: Tuple  # 전체 장르 (name 순)
+    keywords: Dict[int, Tuple] = field(default_factory=dict)  # emotion_id -> 키워드 (가중치 높은 순)
+    recommendations: Dict[int, Tuple] = field(default_factory=dict)  # emotion_id -> 추천 (priority 순, genre 포함)
+    emotions_by_id: Dict[int, object] = field(default_factory=dict)
+    genres_by_id: Dict[int, object] = field(default_factory=dict)
+
+    @property
+    def active_emotions(self) -> Tuple:
+        return tuple(e for e in self.emotions if e.is_active)
+
+    def emotion(self, emotion_id) -> Optional[object]:
+        return self.emotions_by_id.get(_as_int(emotion_id))
+
+    def genre(self, genre_id) -> Optional[object]:
+        return self.genres_by_id.get(_as_int(genre_id))
+
+    def keywords_for(self, emotion_id) -> Tuple:
+        return self.keywords.get(_as_int(emotion_id), ())
+
+    def recommendations_for(self, emotion_id) -> Tuple:
+        return self.recommendations.get(_as_int(emotion_id), ())
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_snapshot(version: int) -> ReferenceSnapshot:
+    """DB 에서 기준 데이터 전체를 읽어 스냅샷 생성 (쿼리 4번)"""
+    from .models import Emotion, EmotionGenreRecommendation, EmotionKeyword, Genre
+
+    emotions = tuple(Emotion.objects.order_by('order', 'name'))
+    genres = tuple(Genre.objects.order_by('name'))
+    emotions_by_id = {e.pk: e for e in emotions}
+    genres_by_id = {g.pk: g for g in genres}
+
+    # 관계 객체는 이미 읽은 감정/장르를 연결 (select_related 없이, 템플릿 접근 시 추가 쿼리 없음)
+    keywords: Dict[int, list] = {}
+    for keyword in EmotionKeyword.objects.order_by('emotion_id', '-weight', 'keyword'):
+        keyword.emotion = emotions_by_id[keyword.emotion_id]
+        keywords.setdefault(keyword.emotion_id, []).append(keyword)
+
+    recommendations: Dict[int, list] = {}
+    for rec in EmotionGenreRecommendation.objects.order_by('emotion_id', 'priority'):
+        rec.emotion = emotions_by_id[rec.emotion_id]
+        rec.genre = genres_by_id[rec.genre_id]
+        recommendations.setdefault(rec.emotion_id, []).append(rec)
+
+    return ReferenceSnapshot(
+        version=version,
+        emotions=emotions,
+        genres=genres,
+        keywords={k: tuple(v) for k, v in keywords.items()},
+        recommendations={k: tuple(v) for k, v in recommendations.items()},
+        emotions_by_id=emotions_by_id,
+        genres_by_id=genres_by_id,
+    )
+
+
+class ReferenceDataCache:
+    """프로세스 로컬 스냅샷 + 공유 캐시 버전 확인"""
+
+    def __init__(self, version_check_seconds: float = 5.0, shared_ttl: float = 3600):
+        self.version_check_seconds = version_check_seconds
+        self.shared_ttl = shared_ttl
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _shared_version(self) -> int:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, 1, None)
+            version = cache.get(VERSION_KEY, 1)
+        return version
+
+    def get(self) -> ReferenceSnapshot:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.version_check_seconds:
+            return snapshot
+
+        with self._lock:
+            version = self._shared_version()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                # 버전이 바뀌면 키도 바뀌므로 오래된 값은 둘 필요 없음 (stale_ttl=0)
+                snapshot = get_or_compute(
+                    SNAPSHOT_KEY.format(version=version),
+                    lambda: load_snapshot(version),
+                    self.shared_ttl,
+                    stale_ttl=0,
+                )
+                self._snapshot = snapshot
+            self._checked_at = now
+            return snapshot
+
+    def invalidate(self):
+        """버전을 올려 모든 프로세스의 스냅샷을 무효화"""
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, None)
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+
+
+reference_data = ReferenceDataCache(
+    version_check_seconds=getattr(settings, 'REFERENCE_DATA_VERSION_CHECK', 5),
+    shared_ttl=getattr(settings, 'REFERENCE_DATA_CACHE_TTL', 3600),
+)
+
+
+def snapshot() -> ReferenceSnapshot:
+    return reference_data.get()
+
+
+def get_emotion_or_404(emotion_id, active_only: bool = True):
+    emotion = snapshot().emotion(emotion_id)
+    if emotion is None or (active_only and not emotion.is_active):
+        raise Http404('감정을 찾을 수 없습니다.')
+    return emotion
+
+
+def get_genre_or_404(genre_id):
+    genre = snapshot().genre(genre_id)
+    if genre is None:
+        raise Http404('장르를 찾을 수 없습니다.')
+    return genre
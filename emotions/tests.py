@@ -1,3 +1,75 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from .keyword_matcher import KeywordMatcher, MatcherCache
+from .models import Emotion, EmotionKeyword
+
+
+def naive_count(text, keyword):
+    """겹치는 등장까지 세는 단순 부분 문자열 횟수"""
+    return sum(text.startswith(keyword, i) for i in range(len(text)))
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    """Aho-Corasick 매칭 결과는 키워드별 단순 부분 문자열 횟수와 같아야 함"""
+
+    def assertMatchesNaive(self, keywords, text):
+        matcher = KeywordMatcher((keyword, 1.0) for keyword in keywords)
+        self.assertEqual(
+            matcher.counts(text), [naive_count(text, keyword) for keyword in keywords], text
+        )
+
+    def test_overlapping_occurrences(self):
+        self.assertMatchesNaive(['aa', 'aba'], 'aaaababa')
+        self.assertMatchesNaive(['하하', '하하하'], '하하하하 웃음')
+
+    def test_suffix_and_nested_keywords(self):
+        # "he", "she", "hers" 처럼 다른 키워드의 접미사/부분인 키워드도 빠짐없이 출력
+        self.assertMatchesNaive(['he', 'she', 'his', 'hers'], 'ushers and she said his hers')
+        self.assertMatchesNaive(['슬픔', '픔', '깊은 슬픔'], '깊은 슬픔과 또 다른 슬픔')
+
+    def test_failure_links_after_partial_match(self):
+        self.assertMatchesNaive(['abcd', 'bce', 'c'], 'abcebcdabcd')
+
+    def test_score_is_matched_weight_share(self):
+        matcher = KeywordMatcher([('행복', 3), ('기쁨', 1), ('', 5)])
+        self.assertEqual(len(matcher), 2)
+        match = matcher.match('행복한 하루, 행복')
+        self.assertEqual([(hit.keyword, hit.count) for hit in match.hits], [('행복', 2)])
+        self.assertEqual(match.score, 0.75)
+        self.assertEqual(KeywordMatcher([]).score('아무 텍스트'), 0.0)
+
+
+class MatcherCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.emotion = Emotion.objects.create(name='기쁨', emoji='😊')
+        EmotionKeyword.objects.create(emotion=cls.emotion, keyword='행복', weight=1.0)
+
+    def test_compiled_matcher_is_reused_until_invalidated(self):
+        cache = MatcherCache(ttl_seconds=None)
+        first = cache.get(self.emotion.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(cache.get(self.emotion.pk), first)
+        cache.invalidate(self.emotion.pk)
+        self.assertIsNot(cache.get(self.emotion.pk), first)
+
+    def test_invalidation_during_compile_discards_the_result(self):
+        cache = MatcherCache(ttl_seconds=None)
+        compile_matcher = KeywordMatcher
+
+        def compile_then_change(keywords):
+            # 옛 키워드 목록으로 컴파일하는 사이에 키워드가 추가되고 무효화됨
+            matcher = compile_matcher(keywords)
+            EmotionKeyword.objects.create(emotion=self.emotion, keyword='기쁨', weight=1.0)
+            cache.invalidate(self.emotion.pk)
+            return matcher
+
+        with mock.patch('emotions.keyword_matcher.KeywordMatcher', side_effect=compile_then_change):
+            stale = cache.get(self.emotion.pk)
+        self.assertEqual(stale.keywords, ['행복'])
+
+        # 무효화 전에 읽은 결과는 캐시에 남지 않으므로 다음 조회는 새 키워드를 반영
+        self.assertEqual(sorted(cache.get(self.emotion.pk).keywords), ['기쁨', '행복'])
@@ -7,16 +7,26 @@ from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from datetime import date, datetime
 from django.core.paginator import Paginator
+import copy
 import json
 import calendar
 
-from .models import Emotion, Genre, EmotionGenreRecommendation, UserEmotionEntry
+from . import reference
+from .models import Emotion, Genre, UserEmotionEntry
 from characters.models import Conversation
+from characters.preferences import genre_affinity
+
+
+def _month_bounds(year, month):
+    """해당 월의 [1일, 다음 달 1일) 범위 (date 인덱스를 타는 범위 조건용)"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
 
 
 def emotion_selection(request):
     """감정 선택 페이지"""
-    emotions = Emotion.objects.filter(is_active=True).order_by('order', 'name')
+    emotions = reference.snapshot().active_emotions
     
     # 오늘 이미 기록된 감정이 있는지 확인
     today_entry = None
@@ -38,12 +48,16 @@ def emotion_selection(request):
 @login_required
 def get_recommendations(request, emotion_id):
     """선택된 감정에 대한 장르 추천"""
-    emotion = get_object_or_404(Emotion, id=emotion_id, is_active=True)
+    emotion = reference.get_emotion_or_404(emotion_id)
     
-    # 해당 감정에 대한 추천 장르들 가져오기 (우선순위 순)
-    recommendations = EmotionGenreRecommendation.objects.filter(
-        emotion=emotion
-    ).select_related('genre').order_by('priority')
+    # 해당 감정에 대한 추천 장르들 (우선순위 순). 스냅샷 객체는 공유되므로 복사해서 표시용 값 추가
+    recommendations = [copy.copy(rec) for rec in reference.snapshot().recommendations_for(emotion.pk)]
+    
+    # 캐릭터 대화 이력 기반 장르 선호도 (같은 순위면 선호 장르 우선)
+    affinity = genre_affinity(request.user)
+    for recommendation in recommendations:
+        recommendation.user_affinity = round(affinity.get(recommendation.genre_id, 0.0) * 100)
+    recommendations.sort(key=lambda rec: (rec.priority, -rec.user_affinity))
     
     # 사용자의 과거 선택 이력 고려 (향후 개인화를 위한 기반)
     user_history = UserEmotionEntry.objects.filter(
@@ -124,10 +138,11 @@ def emotion_calendar(request):
     month = int(request.GET.get('month', datetime.now().month))
     
     # 해당 월의 감정 기록들 가져오기
+    month_start, month_end = _month_bounds(year, month)
     entries = UserEmotionEntry.objects.filter(
         user=request.user,
-        date__year=year,
-        date__month=month
+        date__gte=month_start,
+        date__lt=month_end
     ).select_related('emotion').order_by('date')
     
     # 날짜별로 정리
@@ -305,11 +320,11 @@ def user_emotion_history(request):
         ).order_by('-count').first()
         
         # 이번 달 기록 수
-        current_month = datetime.now().month
-        current_year = datetime.now().year
+        now = datetime.now()
+        month_start, month_end = _month_bounds(now.year, now.month)
         this_month_count = entries.filter(
-            date__month=current_month,
-            date__year=current_year
+            date__gte=month_start,
+            date__lt=month_end
         ).count()
     else:
         most_common_emotion = None
@@ -329,7 +344,7 @@ def user_emotion_history(request):
 # API 엔드포인트들 (기존 유지)
 def api_emotions(request):
     """감정 목록 API (AJAX용)"""
-    emotions = Emotion.objects.filter(is_active=True).order_by('order', 'name')
+    emotions = reference.snapshot().active_emotions
     data = []
     
     for emotion in emotions:
@@ -347,10 +362,8 @@ def api_emotions(request):
 
 def api_recommendations(request, emotion_id):
     """추천 결과 API (AJAX용)"""
-    emotion = get_object_or_404(Emotion, id=emotion_id, is_active=True)
-    recommendations = EmotionGenreRecommendation.objects.filter(
-        emotion=emotion
-    ).select_related('genre').order_by('priority')
+    emotion = reference.get_emotion_or_404(emotion_id)
+    recommendations = reference.snapshot().recommendations_for(emotion.pk)
     
     data = {
         'emotion': {
@@ -0,0 +1,118 @@
+"""
+공유 캐시 도우미 (캐시 스탬피드 방지)
+
+get_or_compute(key, compute, ttl) 는 캐시에 값이 없거나 오래되었을 때 한 요청만 다시 계산하고
+나머지는 기다리거나 직전 값을 쓰게 한다.
+- single-flight: cache.add 로 잡는 계산 잠금. 잠금을 못 잡은 요청은 값이 생길 때까지 잠깐 기다림
+- TTL 지터: 만료 시각을 ttl 의 ±CACHE_TTL_JITTER 비율만큼 흩어 여러 키가 동시에 만료되지 않게 함
+- stale-while-revalidate: 신선 기간이 지나도 stale_ttl 동안은 보관해 두고,
+  잠금을 잡은 요청 하나가 다시 계산하는 동안 다른 요청은 오래된 값을 바로 반환
+
+캐시에는 (값, 신선 만료 시각) 쌍을 저장하므로 같은 키를 cache.get 으로 직접 읽지 말 것.
+CACHE_BACKEND=file 이면 add 가 원자적이지 않아 드물게 두 요청이 함께 계산할 수 있다 (결과는 같음).
+"""
+import logging
+import random
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = '{key}:lock'
+# 잠금을 기다리는 요청의 확인 간격(초)
+POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def jittered(ttl: float, jitter: Optional[float] = None) -> float:
+    """ttl 을 ±jitter 비율 안에서 무작위로 흩음"""
+    jitter = _setting('CACHE_TTL_JITTER', 0.1) if jitter is None else jitter
+    if ttl <= 0 or jitter <= 0:
+        return ttl
+    return ttl * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _store(backend, key: str, value, ttl: float, stale_ttl: float):
+    fresh_for = jittered(ttl)
+    backend.set(key, (value, time.time() + fresh_for), fresh_for + stale_ttl)
+
+
+def _release(backend, lock_key: str, token: str):
+    # 다른 요청이 잠금 만료 후 새로 잡은 잠금은 지우지 않음
+    if backend.get(lock_key) == token:
+        backend.delete(lock_key)
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    ttl: float,
+    stale_ttl: Optional[float] = None,
+    lock_timeout: Optional[float] = None,
+    wait: Optional[float] = None,
+    alias: str = 'default',
+):
+    """
+    캐시된 값을 반환하고, 없거나 신선 기간이 지났으면 한 요청만 compute() 로 다시 계산.
+
+    ttl: 신선 기간(초, 지터 적용). stale_ttl: 신선 기간 이후 오래된 값을 내줄 수 있는 기간.
+    lock_timeout: 계산 잠금 유지 시간. wait: 값이 없을 때 다른 요청의 계산을 기다리는 최대 시간
+    (넘으면 직접 계산).
+    """
+    backend = caches[alias]
+    stale_ttl = _setting('CACHE_STALE_TTL', 60) if stale_ttl is None else stale_ttl
+    lock_timeout = _setting('CACHE_LOCK_TIMEOUT', 10) if lock_timeout is None else lock_timeout
+    wait = _setting('CACHE_LOCK_WAIT', 2) if wait is None else wait
+
+    entry = backend.get(key)
+    stale = _MISSING
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            return value
+        stale = value
+
+    lock_key = LOCK_KEY.format(key=key)
+    token = uuid.uuid4().hex
+    if not backend.add(lock_key, token, lock_timeout):
+        if stale is not _MISSING:
+            # 다른 요청이 갱신 중: 오래된 값을 그대로 사용
+            return stale
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = backend.get(key)
+            if entry is not None:
+                return entry[0]
+        logger.warning("캐시 계산 대기 시간 초과, 직접 계산 | key=%s", key)
+        value = compute()
+        _store(backend, key, value, ttl, stale_ttl)
+        return value
+
+    try:
+        value = compute()
+    except Exception:
+        if stale is not _MISSING:
+            # 갱신 실패 시 오래된 값으로 버팀 (다음 요청이 다시 시도)
+            logger.exception("캐시 갱신 실패, 오래된 값 사용 | key=%s", key)
+            return stale
+        raise
+    else:
+        _store(backend, key, value, ttl, stale_ttl)
+        return value
+    finally:
+        _release(backend, lock_key, token)
+
+
+def invalidate(key: str, alias: str = 'default'):
+    """get_or_compute 로 저장한 값 삭제 (다음 조회 때 다시 계산)"""
+    caches[alias].delete(key)
@@ -86,6 +86,45 @@ DATABASES = {
     }
 }
 
+# Cache (워커 간 공유)
+# CACHE_BACKEND: db(기본, 같은 SQLite DB 의 캐시 테이블) / redis(redis 패키지 필요)
+#   / memcached(pymemcache 필요) / file / locmem
+# db 캐시는 처음 한 번 캐시 테이블을 만들어야 한다: python manage.py createcachetable
+# (테스트 DB 에는 테스트 실행 시 자동 생성)
+# CACHE_LOCATION 으로 캐시 테이블 이름, 디렉터리 또는 서버 주소 변경
+# get_or_compute 계산 잠금과 멱등 키 선점은 cache.add 에 기대므로 add 가 원자적인 db/redis/memcached 를 쓸 것
+# (db 캐시의 add 는 유일 키 INSERT). file 캐시의 add 는 확인 후 쓰기라 여러 프로세스에서 겹칠 수 있다
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'db')
+CACHE_BACKENDS = {
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'hungry_jackie_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'hungry-jackie'),
+}
+_cache_class, _cache_location = CACHE_BACKENDS[CACHE_BACKEND]
+CACHES = {
+    'default': {
+        'BACKEND': _cache_class,
+        'LOCATION': os.getenv('CACHE_LOCATION', _cache_location),
+        # DB 별로 키를 나눠 다른 DB 로 띄운 서버끼리 캐시 값(기준 데이터, 잔액, 목록)을 섞지 않음
+        'KEY_PREFIX': os.getenv(
+            'CACHE_KEY_PREFIX', f"hungry_jackie:{Path(DATABASES['default']['NAME']).stem}"
+        ),
+        'TIMEOUT': 300,
+    }
+}
+if CACHE_BACKEND in ('db', 'file', 'locmem'):
+    # 항목 수가 넘치면 일부 키를 지우므로 (db 는 만료 항목부터) 멱등 키 보관 기간을 감안해 넉넉히
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000'))}
+
+# get_or_compute (hungry_jackie/cache.py): TTL 지터 비율, 만료 후 오래된 값을 내줄 수 있는 시간(초),
+# 계산 잠금 유지 시간(초), 다른 요청의 계산을 기다리는 최대 시간(초)
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', '0.1'))
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', '60'))
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', '10'))
+CACHE_LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', '2'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -196,6 +235,99 @@ SOCIALACCOUNT_LOGIN_ON_GET = False
 SOCIALACCOUNT_QUERY_EMAIL = True
 SOCIALACCOUNT_STORE_TOKENS = False
 
+# AI 캐릭터 대화 설정
+# 생성 백엔드: 'gemini' | 'stub' (오프라인 부하 테스트용) | 클래스 dotted path
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+
+# 스텁 백엔드 동작 (지연 분포 ms, 오류율, 스트리밍 청크 타이밍)
+LLM_STUB_OPTIONS = {
+    'latency': os.getenv('LLM_STUB_LATENCY', 'lognormal'),  # fixed / uniform / normal / lognormal
+    'latency_ms': float(os.getenv('LLM_STUB_LATENCY_MS', '800')),
+    'latency_spread': float(os.getenv('LLM_STUB_LATENCY_SPREAD', '0.5')),
+    'first_token_ms': float(os.getenv('LLM_STUB_FIRST_TOKEN_MS', '250')),
+    'chunk_delay_ms': float(os.getenv('LLM_STUB_CHUNK_DELAY_MS', '40')),
+    'chunk_chars': int(os.getenv('LLM_STUB_CHUNK_CHARS', '8')),
+    'error_rate': float(os.getenv('LLM_STUB_ERROR_RATE', '0')),
+    'rate_limit_rate': float(os.getenv('LLM_STUB_RATE_LIMIT_RATE', '0')),
+    'seed': int(os.getenv('LLM_STUB_SEED')) if os.getenv('LLM_STUB_SEED') else None,
+}
+
+# 캐릭터별로 재사용할 생성 모델 객체 수 (LRU)
+GEMINI_MODEL_CACHE_SIZE = int(os.getenv('GEMINI_MODEL_CACHE_SIZE', '128'))
+
+# 페르소나 컨텍스트 캐싱 (provider-side). 'local' 백엔드는 네트워크 없이 동작하는 스텁
+GEMINI_CONTEXT_CACHE = os.getenv('GEMINI_CONTEXT_CACHE', 'False') == 'True'
+GEMINI_CONTEXT_CACHE_BACKEND = os.getenv('GEMINI_CONTEXT_CACHE_BACKEND', 'gemini')
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv('GEMINI_CONTEXT_CACHE_TTL', '3600'))
+# provider 최소 토큰 제한보다 짧은 페르소나는 업로드 시도 자체를 생략
+GEMINI_CONTEXT_CACHE_MIN_CHARS = int(os.getenv('GEMINI_CONTEXT_CACHE_MIN_CHARS', '2000'))
+
+# 캐릭터 추천 설정
+# 추천 점수 가중치 (키워드 매칭 / 사용자 장르 선호도 / 평점 / 인기도)
+RECOMMENDATION_WEIGHTS = {
+    'keyword': float(os.getenv('RECOMMENDATION_WEIGHT_KEYWORD', '0.4')),
+    'preference': float(os.getenv('RECOMMENDATION_WEIGHT_PREFERENCE', '0.3')),
+    'rating': float(os.getenv('RECOMMENDATION_WEIGHT_RATING', '0.2')),
+    'popularity': float(os.getenv('RECOMMENDATION_WEIGHT_POPULARITY', '0.1')),
+}
+
+# 사용자 장르 선호도 프로필 캐시 시간(초). 대화 생성/상태 변경 시 즉시 무효화
+USER_PREFERENCE_CACHE_TTL = int(os.getenv('USER_PREFERENCE_CACHE_TTL', '600'))
+# 컴파일된 감정 키워드 매처 유지 시간(초). 같은 프로세스의 키워드 변경은 시그널로 즉시 반영
+EMOTION_MATCHER_TTL = int(os.getenv('EMOTION_MATCHER_TTL', '300'))
+
+# 대화/캐릭터 통계 카운터
+# 버퍼 모드: 증가분을 메모리에 모아 COUNTER_FLUSH_INTERVAL 초마다 일괄 반영 (꺼져 있으면 즉시 반영)
+# 버퍼 모드에서 reconcile_counters 는 웹 워커를 멈춘 뒤 --workers-drained 와 함께 실행
+COUNTER_BUFFERING = os.getenv('COUNTER_BUFFERING', 'False') == 'True'
+COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', '5'))
+COUNTER_MAX_PENDING = int(os.getenv('COUNTER_MAX_PENDING', '1000'))
+
+# 대화 요약 (characters/summaries.py)
+# 요약 이후 메시지가 최근 창 + INTERVAL 턴만큼 쌓이면 백그라운드에서 요약 갱신 (ASYNC=False 면 요청 안에서)
+CONVERSATION_SUMMARY_INTERVAL = int(os.getenv('CONVERSATION_SUMMARY_INTERVAL', '5'))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv('CONVERSATION_SUMMARY_MAX_CHARS', '600'))
+CONVERSATION_SUMMARY_ASYNC = os.getenv('CONVERSATION_SUMMARY_ASYNC', 'True') == 'True'
+CONVERSATION_SUMMARY_WORKERS = int(os.getenv('CONVERSATION_SUMMARY_WORKERS', '2'))
+# 페르소나 + 요약 + 최근 메시지 + 이번 메시지의 추정 토큰 상한 (characters/token_usage.py)
+CONVERSATION_PROMPT_TOKEN_BUDGET = int(os.getenv('CONVERSATION_PROMPT_TOKEN_BUDGET', '3000'))
+
+# LLM 호출 보호 (characters/resilience.py, 프로세스 단위)
+# 서킷 브레이커: 일시 오류(5xx/타임아웃)가 연속 FAILURES 번이면 COOLDOWN 초 동안 호출 없이 바로 안내 응답,
+# 이후 시험 호출 하나로 복구 확인
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+# 동시 호출 상한(AIMD): 지연 목표(초) 안의 성공이면 천천히 늘리고, 429/목표 초과면 절반으로.
+# 자리가 QUEUE_TIMEOUT 초 안에 안 나면 바로 안내 응답
+LLM_CONCURRENCY_INITIAL = int(os.getenv('LLM_CONCURRENCY_INITIAL', '8'))
+LLM_CONCURRENCY_MIN = int(os.getenv('LLM_CONCURRENCY_MIN', '1'))
+LLM_CONCURRENCY_MAX = int(os.getenv('LLM_CONCURRENCY_MAX', '64'))
+LLM_LATENCY_TARGET = float(os.getenv('LLM_LATENCY_TARGET', '8'))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '2'))
+
+# 메시지 전송 멱등 키 (Idempotency-Key 헤더, characters/idempotency.py)
+# 완료된 응답 보관 시간(초)과, 처리 중 표시가 풀리는 시간(초, LLM 응답 최대 시간보다 길게)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+IDEMPOTENCY_PENDING_TTL = int(os.getenv('IDEMPOTENCY_PENDING_TTL', '120'))
+# 같은 프롬프트의 생성이 진행 중이면 새로 호출하지 않고 결과 공유 (프로세스 단위)
+LLM_COALESCE_INFLIGHT = os.getenv('LLM_COALESCE_INFLIGHT', 'True') == 'True'
+
+# 표시용 크레딧 잔액 캐시 시간(초). 차감/환불 시 캐시 값도 함께 증감
+CREDIT_BALANCE_CACHE_TTL = int(os.getenv('CREDIT_BALANCE_CACHE_TTL', '60'))
+# 이 시간(분)이 지나도 확정/환불되지 않은 크레딧 예약은 refund_stale_reservations 명령이 환불
+# (가장 긴 LLM 응답 시간보다 충분히 길게)
+CREDIT_RESERVATION_TIMEOUT_MINUTES = int(os.getenv('CREDIT_RESERVATION_TIMEOUT_MINUTES', '15'))
+
+# 기준 데이터(감정/장르/키워드/추천 매핑) 스냅샷 캐시
+# 공유 캐시 보관 시간(초)과, 프로세스 메모리 스냅샷이 공유 버전을 다시 확인하는 간격(초)
+REFERENCE_DATA_CACHE_TTL = int(os.getenv('REFERENCE_DATA_CACHE_TTL', '3600'))
+REFERENCE_DATA_VERSION_CHECK = float(os.getenv('REFERENCE_DATA_VERSION_CHECK', '5'))
+
+# 목록/추천 화면 캐시 시간(초): 공개 캐릭터 목록 페이지, 인기 태그, 인기도 정규화 기준값
+LISTING_CACHE_TTL = int(os.getenv('LISTING_CACHE_TTL', '30'))
+# 템플릿 조각 캐시(캐릭터 카드/상세 섹션/소개 화면) 유지 시간(초). 키에 수정 시각과 카운터가 들어가므로 길게 둬도 됨
+FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', '600'))
+
 # Security settings (프로덕션에서 활성화)
 if not DEBUG:
     SECURE_SSL_REDIRECT = True